@@ -1,30 +1,105 @@
 from __future__ import annotations
 
 import os
+from typing import Optional
 import streamlit as st
 
 from hr_rag_assistant.config import get_settings
+from hr_rag_assistant.embeddings.cache import open_embedding_cache
+from hr_rag_assistant.embeddings.embedders import create_embedder
+from hr_rag_assistant.embeddings.query_cache import open_query_cache
 from hr_rag_assistant.retrieval.retriever import HRRetriever
+from hr_rag_assistant.generation.answer_cache import (
+    ExactAnswerCache,
+    PresetAnswerStore,
+    SemanticAnswerCache,
+    open_answer_cache,
+    open_exact_answer_cache,
+    open_preset_store,
+)
 from hr_rag_assistant.generation.answerer import HRAnswerer
-from hr_rag_assistant.generation.citations import format_sources_block
-
-HR_QUESTIONS = [
-    "How many days per week am I allowed to work remotely?",
-    "Do I need manager approval for remote work?",
-    "Can my remote work privileges be revoked? If so, why?",
-    "How many days of annual leave do employees receive per year?",
-    "How far in advance do I need to request annual leave?",
-    "Do I need a medical certificate if I am sick for several days?",
-    "Can I carry unused leave days into the next year?",
-    "What health insurance benefits are provided to employees?",
-    "Does the company contribute to a pension plan?",
-    "Is there a budget for training or professional development?",
-    "How long is the probation period for new employees?",
-    "What training must be completed during onboarding?",
-    "Is there a buddy assigned to new employees?",
-    "What happens if an employee violates the code of conduct?",
-    "Under what conditions can disciplinary action lead to termination?",
-]
+from hr_rag_assistant.generation.citations import chunk_label, format_source_list
+from hr_rag_assistant.generation.gating import (
+    REFUSAL,
+    gate_retrieval,
+    gated,
+    thresholds_from_settings,
+)
+from hr_rag_assistant.generation.presets import (
+    HR_QUESTIONS,
+    PRESET_MAX_CONTEXT_TOKENS,
+    PRESET_TOP_K,
+    preset_scope,
+    refresh_presets_in_background,
+)
+
+
+@st.cache_resource(show_spinner=False)
+def load_retriever() -> HRRetriever:
+    """
+    One retriever per server process, shared by all sessions. It follows newly
+    published index versions in the background (INDEX_RELOAD_INTERVAL), so
+    re-running ingestion does not require restarting the app.
+    """
+    s = get_settings()
+    embedding_cache = open_embedding_cache(s.embedding_cache_path, s.embedding_cache_max_entries)
+    return HRRetriever(
+        index_dir=s.index_dir,
+        embedder=create_embedder(
+            s.embedding_backend,
+            model=s.embedding_model,
+            api_key=s.openai_api_key,
+            dimension=s.local_embedding_dim,
+        ),
+        embedding_cache=embedding_cache,
+        index_load_mode=s.index_load_mode,
+        nprobe=s.index_nprobe,
+        ef_search=s.index_ef_search,
+        rescore_multiplier=s.rescore_multiplier,
+        shard_dirs=s.index_shards,
+        reload_interval=s.index_reload_interval,
+        # Preset questions are asked over and over: keep their embeddings in memory
+        query_cache=open_query_cache(
+            s.query_cache_max_entries,
+            s.query_cache_ttl_seconds,
+            shared=embedding_cache if s.query_cache_shared else None,
+        ),
+        retrieval_mode=s.retrieval_mode,
+        lexical_fast_path=s.lexical_fast_path,
+        merge_overlaps=s.merge_overlapping_chunks,
+        mmr_lambda=s.mmr_lambda,
+        mmr_fetch_k=s.mmr_fetch_k,
+    )
+
+
+@st.cache_resource(show_spinner=False)
+def load_answer_cache() -> Optional[SemanticAnswerCache]:
+    """Answers of near-duplicate questions are shared by all sessions (and workers)."""
+    s = get_settings()
+    return open_answer_cache(
+        s.answer_cache_path,
+        threshold=s.answer_cache_threshold,
+        min_chunk_overlap=s.answer_cache_min_overlap,
+        max_entries=s.answer_cache_max_entries,
+        ttl_seconds=s.answer_cache_ttl_seconds,
+    )
+
+
+@st.cache_resource(show_spinner=False)
+def load_exact_answer_cache() -> Optional[ExactAnswerCache]:
+    """Answers of identical requests, shared by all sessions (and workers)."""
+    s = get_settings()
+    return open_exact_answer_cache(
+        s.exact_answer_cache_path,
+        max_entries=s.exact_answer_cache_max_entries,
+        ttl_seconds=s.answer_cache_ttl_seconds,
+    )
+
+
+@st.cache_resource(show_spinner=False)
+def load_preset_store() -> Optional[PresetAnswerStore]:
+    """Precomputed answers of HR_QUESTIONS (scripts/warm_presets.py)."""
+    return open_preset_store(get_settings().preset_answers_path)
 
 
 def main() -> None:
@@ -164,16 +239,25 @@ def main() -> None:
     # Sidebar controls
     with st.sidebar:
         st.header("Controls")
-        top_k = st.slider("Top-K retrieved chunks", min_value=1, max_value=12, value=5, step=1)
-        max_context_chars = st.slider("Max context characters", min_value=1000, max_value=12000, value=6000, step=500)
+        top_k = st.slider(
+            "Top-K retrieved chunks", min_value=1, max_value=12, value=PRESET_TOP_K, step=1
+        )
+        max_context_tokens = st.slider(
+            "Max context tokens",
+            min_value=250,
+            max_value=3000,
+            value=PRESET_MAX_CONTEXT_TOKENS,
+            step=250,
+        )
         temperature = st.slider("Temperature", min_value=0.0, max_value=1.0, value=0.0, step=0.1)
         show_context = st.checkbox("Show retrieved context", value=False)
 
         st.divider()
         st.text("Index")
-        st.code(s.index_dir, language="text")
+        st.code("\n".join(s.index_shards) or s.index_dir, language="text")
         st.text("Models")
-        st.code(f"Embeddings: {s.embedding_model}\nChat: {chat_model}", language="text")
+        embeddings = s.embedding_model if s.embedding_backend == "openai" else s.embedding_backend
+        st.code(f"Embeddings: {embeddings}\nChat: {chat_model}", language="text")
 
     # Handle Refresh BEFORE creating widgets (safe state clear)
     if st.session_state.get("refresh_trigger"):
@@ -213,16 +297,51 @@ def main() -> None:
     # Echo the exact question used, to remove ambiguity between preset/custom
     st.markdown(f"_Question used_: **{final_question}**")
     try:
-        retriever = HRRetriever(
-            index_dir=s.index_dir,
-            openai_api_key=s.openai_api_key,
-            embedding_model=s.embedding_model,
-        )
+        retriever = load_retriever()
     except Exception as e:
         st.error(f"Could not load FAISS index. Did you run ingestion?\n\n{e}")
         st.stop()
 
-    answerer = HRAnswerer(openai_api_key=s.openai_api_key, chat_model=chat_model)
+    answer_cache = load_answer_cache()
+    exact_cache = load_exact_answer_cache()
+    answerer = HRAnswerer(
+        openai_api_key=s.openai_api_key,
+        chat_model=chat_model,
+        answer_cache=answer_cache,
+        exact_cache=exact_cache,
+        compression_neighbors=(
+            s.context_compression_neighbors if s.context_compression else None
+        ),
+    )
+
+    # Preset questions are answered from the precomputed store (no embedding,
+    # search or chat call); after the index changed they are recomputed in the
+    # background and served live meanwhile.
+    preset_store = load_preset_store()
+    if preset_store is not None:
+        gate = thresholds_from_settings(s) if s.strict_grounded else None
+        refresh_presets_in_background(
+            retriever=retriever, answerer=answerer, store=preset_store, gate=gate
+        )
+        version = retriever.index_version
+        preset = None
+        if not custom_q.strip() and version is not None:
+            scope = preset_scope(
+                answerer,
+                retriever,
+                gate=gate,
+                top_k=top_k,
+                max_context_tokens=max_context_tokens,
+                temperature=temperature,
+            )
+            preset = preset_store.get(scope=scope, index_version=version, question=final_question)
+        if preset is not None:
+            st.subheader("Answer")
+            st.write(preset.answer)
+            st.caption(f"Precomputed answer (index version {version})")
+            st.subheader("Sources")
+            st.code(format_source_list(preset.sources), language="text")
+            return
 
     # Retrieve
     with st.spinner("Retrieving relevant HR policy context..."):
@@ -231,28 +350,84 @@ def main() -> None:
     # Optionally show retrieval details
     if show_context:
         st.subheader("Retrieved context")
+        st.caption(f"Retrieval mode: {retrieval.mode}")
         if not retrieval.results:
             st.warning("No chunks retrieved.")
         else:
             for i, hit in enumerate(retrieval.results, start=1):
                 c = hit.chunk
-                with st.expander(f"[{i}] {c.source} — chunk_{c.chunk_index:04d} — score={hit.score:.4f}", expanded=(i <= 2)):
+                with st.expander(
+                    f"[{i}] {c.source} — {chunk_label(c)} — score={hit.score:.4f}",
+                    expanded=(i <= 2),
+                ):
                     st.write(c.text)
 
-    # Generate answer
-    with st.spinner("Generating grounded answer..."):
-        ans = answerer.answer(
-            question=final_question,
-            hits=retrieval.results,
-            max_context_chars=max_context_chars,
-            temperature=temperature,
-        )
+    # Confidence gate: refuse out-of-scope questions without a chat call
+    if s.strict_grounded:
+        decision = gate_retrieval(retrieval, thresholds_from_settings(s))
+        if not decision.answer:
+            st.subheader("Answer")
+            st.write(REFUSAL)
+            detail = decision.reason
+            if decision.top_score is not None:
+                detail += f", best similarity {decision.top_score:.3f}"
+            st.caption(f"Answered without calling the model ({detail})")
+            st.subheader("Sources")
+            st.code(format_source_list([]), language="text")
+            return
+        retrieval = gated(retrieval, decision)
 
+    # Generate answer (rendered token by token as it streams in)
     st.subheader("Answer")
-    st.write(ans.answer)
+    stream = answerer.stream_answer(
+        question=final_question,
+        hits=retrieval.results,
+        max_context_tokens=max_context_tokens,
+        temperature=temperature,
+        query_vector=retrieval.query_vector,
+        index_version=retrieval.index_version,
+    )
+    st.write_stream(stream)
+    ans = stream.result
+    if ans.cache_hit == "exact":
+        st.caption("Answer replayed from the cache (identical request)")
+    elif ans.cached_from is not None:
+        st.caption(f"Answer reused from a similar question: _{ans.cached_from}_")
+    elif ans.generation_seconds is not None:
+        st.caption(
+            f"First token after {ans.ttft_seconds or 0.0:.2f}s, "
+            f"answer in {ans.generation_seconds:.2f}s "
+            f"({ans.prompt_tokens or '?'} prompt / "
+            f"{ans.completion_tokens or '?'} completion tokens)"
+        )
+    if ans.context_tokens is not None:
+        st.caption(
+            f"Context: {ans.context_tokens} tokens from {ans.chunks_used} chunks "
+            f"({ans.chunks_truncated} truncated, {ans.chunks_dropped} dropped)"
+        )
 
     st.subheader("Sources")
-    st.code(format_sources_block(retrieval.results), language="text")
+    st.code(format_source_list(ans.sources), language="text")
+
+    if retriever.query_cache is not None:
+        qs = retriever.query_cache.stats()
+        st.caption(
+            f"Query embedding cache: {qs.hit_rate:.0%} hit rate "
+            f"({qs.hits} local, {qs.shared_hits} shared, {qs.misses} API calls; "
+            f"{qs.entries} entries)"
+        )
+    if answer_cache is not None:
+        acs = answer_cache.stats()
+        st.caption(
+            f"Answer cache: {acs.hit_rate:.0%} hit rate "
+            f"({acs.hits} hits, {acs.misses} misses; {acs.entries} entries)"
+        )
+    if exact_cache is not None:
+        ecs = exact_cache.stats()
+        st.caption(
+            f"Exact answer cache: {ecs.hit_rate:.0%} hit rate "
+            f"({ecs.hits} hits, {ecs.misses} misses; {ecs.entries} entries)"
+        )
 
 
 if __name__ == "__main__":
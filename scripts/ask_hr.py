@@ -4,9 +4,21 @@ import argparse
 import os
 
 from hr_rag_assistant.config import get_settings
+from hr_rag_assistant.embeddings.cache import open_embedding_cache
+from hr_rag_assistant.embeddings.embedders import create_embedder
+from hr_rag_assistant.embeddings.query_cache import open_query_cache
+from hr_rag_assistant.retrieval.filters import MetadataFilter
 from hr_rag_assistant.retrieval.retriever import HRRetriever
+from hr_rag_assistant.retrieval.sharded import ShardedVectorStore
+from hr_rag_assistant.generation.answer_cache import open_answer_cache, open_exact_answer_cache
 from hr_rag_assistant.generation.answerer import HRAnswerer
-from hr_rag_assistant.generation.citations import format_sources_block
+from hr_rag_assistant.generation.citations import format_source_list
+from hr_rag_assistant.generation.gating import (
+    REFUSAL,
+    gate_retrieval,
+    gated,
+    thresholds_from_settings,
+)
 
 
 def _print_hits(result, max_chars: int = 350) -> None:
@@ -30,34 +42,103 @@ def main() -> None:
     parser.add_argument("question", type=str, help="HR question to answer")
     parser.add_argument("--top-k", type=int, default=5, help="Number of chunks to retrieve")
     parser.add_argument("--show-context", action="store_true", help="Print retrieved chunks")
-    parser.add_argument("--max-context-chars", type=int, default=None, help="Max characters of context fed to the model")
+    parser.add_argument(
+        "--max-context-chars",
+        type=int,
+        default=None,
+        help="Max characters of context fed to the model",
+    )
+    parser.add_argument(
+        "--max-context-tokens",
+        type=int,
+        default=None,
+        help="Token budget of the context fed to the model (0 = use the character limit)",
+    )
     parser.add_argument("--temperature", type=float, default=0.0, help="Model temperature")
+    parser.add_argument(
+        "--source", action="append", default=None, help="Only search this document (repeatable)"
+    )
+    parser.add_argument(
+        "--path-prefix",
+        action="append",
+        default=None,
+        help="Only search documents under this folder",
+    )
 
     args = parser.parse_args()
 
     s = get_settings()
     chat_model = os.getenv("CHAT_MODEL", "gpt-4.1-mini")
-    strict_grounded = os.getenv("STRICT_GROUNDED", "true").strip().lower() in {"1", "true", "yes", "y"}
     max_context_chars = args.max_context_chars if args.max_context_chars is not None else int(
         os.getenv("MAX_CONTEXT_CHARS", "6000")
     )
+    max_context_tokens = (
+        args.max_context_tokens
+        if args.max_context_tokens is not None
+        else int(os.getenv("MAX_CONTEXT_TOKENS", "1500"))
+    ) or None
 
     print("== HR RAG (FAISS) ==")
-    print(f"Using INDEX_DIR: {s.index_dir}")
-    print(f"Embedding model: {s.embedding_model}")
+    print(f"Using INDEX_DIR: {', '.join(s.index_shards) or s.index_dir}")
     print(f"Chat model:      {chat_model}")
     print(f"Top-K:           {args.top_k}")
-    print(f"Strict grounded: {strict_grounded}")
-    print(f"Max context:     {max_context_chars} chars")
+    print(f"Retrieval:       {s.retrieval_mode} (keyword fast path: {s.lexical_fast_path})")
+    print(f"Strict grounded: {s.strict_grounded}")
+    print(
+        "Max context:     "
+        + (f"{max_context_tokens} tokens" if max_context_tokens else f"{max_context_chars} chars")
+    )
+    print(
+        "Compression:     "
+        + (f"{s.context_compression_neighbors} neighbours" if s.context_compression else "off")
+    )
 
     # 1) Retrieve
+    embedding_cache = open_embedding_cache(s.embedding_cache_path, s.embedding_cache_max_entries)
     retriever = HRRetriever(
         index_dir=s.index_dir,
-        openai_api_key=s.openai_api_key,
-        embedding_model=s.embedding_model,
+        embedder=create_embedder(
+            s.embedding_backend,
+            model=s.embedding_model,
+            api_key=s.openai_api_key,
+            dimension=s.local_embedding_dim,
+        ),
+        embedding_cache=embedding_cache,
+        index_load_mode=s.index_load_mode,
+        nprobe=s.index_nprobe,
+        ef_search=s.index_ef_search,
+        rescore_multiplier=s.rescore_multiplier,
+        shard_dirs=s.index_shards,
+        query_cache=open_query_cache(
+            s.query_cache_max_entries,
+            s.query_cache_ttl_seconds,
+            shared=embedding_cache if s.query_cache_shared else None,
+        ),
+        retrieval_mode=s.retrieval_mode,
+        lexical_fast_path=s.lexical_fast_path,
+        merge_overlaps=s.merge_overlapping_chunks,
+        mmr_lambda=s.mmr_lambda,
+        mmr_fetch_k=s.mmr_fetch_k,
     )
-
-    retrieval = retriever.retrieve(args.question, top_k=args.top_k)
+    print(f"Embeddings:      {retriever.embedding_model} ({retriever.embedder.backend})")
+
+    stores = retriever.store.shards if isinstance(retriever.store, ShardedVectorStore) else None
+    for name, store in (stores or {"": retriever.store}).items():
+        ls = store.load_stats
+        print(
+            f"Index load:      {ls.load_mode}, {ls.load_seconds:.3f}s, "
+            f"private RSS +{ls.private_rss_delta_bytes / 1e6:.1f} MB"
+            + (f" [{name}]" if name else "")
+        )
+
+    filters = MetadataFilter(sources=args.source, path_prefixes=args.path_prefix)
+    retrieval = retriever.retrieve(args.question, top_k=args.top_k, filters=filters)
+    print(f"Retrieved via:   {retrieval.mode}")
+    if retrieval.mode == "lexical":
+        print("Query embedding: skipped (keyword query)")
+    elif retriever.query_cache is not None:
+        qs = retriever.query_cache.stats()
+        print(f"Query embedding: {'cached' if qs.hits or qs.shared_hits else 'embeddings API'}")
 
     print("\nQuestion:")
     print(retrieval.query)
@@ -66,28 +147,78 @@ def main() -> None:
         _print_hits(retrieval)
 
     # Optional strict gating:
-    # If nothing retrieved, or similarity is too low, refuse.
-    if strict_grounded:
-        if not retrieval.results:
+    # If nothing retrieved, or similarity is too low, refuse without a chat call.
+    if s.strict_grounded:
+        decision = gate_retrieval(retrieval, thresholds_from_settings(s))
+        profile = (
+            f" (top-1 {decision.top_score:.3f}, margin {decision.margin:.3f})"
+            if decision.top_score is not None
+            else ""
+        )
+        print(f"\nGate:            {decision.reason}{profile}")
+        if not decision.answer:
             print("\nAnswer:")
-            print("I don't know based on the provided HR documents.")
-            print("\nSources:\n- (none)")
+            print(REFUSAL)
+            print("\n" + format_source_list([]))
             return
+        retrieval = gated(retrieval, decision)
 
     # 2) Answer (grounded)
-    answerer = HRAnswerer(openai_api_key=s.openai_api_key, chat_model=chat_model)
-    ans = answerer.answer(
+    answer_cache = open_answer_cache(
+        s.answer_cache_path,
+        threshold=s.answer_cache_threshold,
+        min_chunk_overlap=s.answer_cache_min_overlap,
+        max_entries=s.answer_cache_max_entries,
+        ttl_seconds=s.answer_cache_ttl_seconds,
+    )
+    exact_cache = open_exact_answer_cache(
+        s.exact_answer_cache_path,
+        max_entries=s.exact_answer_cache_max_entries,
+        ttl_seconds=s.answer_cache_ttl_seconds,
+    )
+    answerer = HRAnswerer(
+        openai_api_key=s.openai_api_key,
+        chat_model=chat_model,
+        answer_cache=answer_cache,
+        exact_cache=exact_cache,
+        compression_neighbors=(
+            s.context_compression_neighbors if s.context_compression else None
+        ),
+    )
+    stream = answerer.stream_answer(
         question=retrieval.query,
         hits=retrieval.results,
         max_context_chars=max_context_chars,
+        max_context_tokens=max_context_tokens,
         temperature=args.temperature,
+        query_vector=retrieval.query_vector,
+        index_version=retrieval.index_version,
     )
-
     print("\nAnswer:")
-    print(ans.answer)
+    for delta in stream:
+        print(delta, end="", flush=True)
+    print()
+    ans = stream.result
+
+    if answer_cache is not None or exact_cache is not None:
+        print(
+            "\nAnswer cache:    "
+            + (f"{ans.cache_hit} hit ({ans.cached_from!r})" if ans.cache_hit else "miss")
+        )
+    if ans.generation_seconds is not None:
+        print(
+            f"Generation:      first token {ans.ttft_seconds or 0.0:.2f}s, "
+            f"total {ans.generation_seconds:.2f}s, "
+            f"tokens {ans.prompt_tokens or '?'} prompt / {ans.completion_tokens or '?'} completion"
+        )
+    if ans.context_tokens is not None:
+        print(
+            f"Context:         {ans.context_tokens} tokens, {ans.chunks_used} chunks "
+            f"({ans.chunks_truncated} truncated, {ans.chunks_dropped} dropped)"
+        )
 
     # 3) Sources (human-facing)
-    print("\n" + format_sources_block(retrieval.results))
+    print("\n" + format_source_list(ans.sources))
 
 
 if __name__ == "__main__":
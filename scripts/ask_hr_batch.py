@@ -0,0 +1,110 @@
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import time
+from pathlib import Path
+
+from hr_rag_assistant.config import get_settings
+from hr_rag_assistant.embeddings.cache import open_embedding_cache
+from hr_rag_assistant.embeddings.embedders import create_embedder
+from hr_rag_assistant.embeddings.query_cache import open_query_cache
+from hr_rag_assistant.generation.answer_cache import open_answer_cache, open_exact_answer_cache
+from hr_rag_assistant.generation.answerer import HRAnswerer
+from hr_rag_assistant.generation.citations import format_source_list
+from hr_rag_assistant.generation.pipeline import AsyncHRPipeline
+from hr_rag_assistant.retrieval.retriever import HRRetriever
+
+
+async def run(args: argparse.Namespace) -> None:
+    s = get_settings()
+    lines = Path(args.questions).read_text(encoding="utf-8").splitlines()
+    questions = [q.strip() for q in lines if q.strip()]
+
+    embedding_cache = open_embedding_cache(s.embedding_cache_path, s.embedding_cache_max_entries)
+    # The index is opened while the first query embeddings are in flight
+    retriever = HRRetriever(
+        index_dir=s.index_dir,
+        embedder=create_embedder(
+            s.embedding_backend,
+            model=s.embedding_model,
+            api_key=s.openai_api_key,
+            dimension=s.local_embedding_dim,
+        ),
+        embedding_cache=embedding_cache,
+        index_load_mode=s.index_load_mode,
+        nprobe=s.index_nprobe,
+        ef_search=s.index_ef_search,
+        rescore_multiplier=s.rescore_multiplier,
+        shard_dirs=s.index_shards,
+        query_cache=open_query_cache(
+            s.query_cache_max_entries,
+            s.query_cache_ttl_seconds,
+            shared=embedding_cache if s.query_cache_shared else None,
+        ),
+        retrieval_mode=s.retrieval_mode,
+        lexical_fast_path=s.lexical_fast_path,
+        merge_overlaps=s.merge_overlapping_chunks,
+        mmr_lambda=s.mmr_lambda,
+        mmr_fetch_k=s.mmr_fetch_k,
+        lazy_load=True,
+    )
+    answerer = HRAnswerer(
+        openai_api_key=s.openai_api_key,
+        chat_model=os.getenv("CHAT_MODEL", "gpt-4.1-mini"),
+        answer_cache=open_answer_cache(
+            s.answer_cache_path,
+            threshold=s.answer_cache_threshold,
+            min_chunk_overlap=s.answer_cache_min_overlap,
+            max_entries=s.answer_cache_max_entries,
+            ttl_seconds=s.answer_cache_ttl_seconds,
+        ),
+        exact_cache=open_exact_answer_cache(
+            s.exact_answer_cache_path,
+            max_entries=s.exact_answer_cache_max_entries,
+            ttl_seconds=s.answer_cache_ttl_seconds,
+        ),
+        compression_neighbors=(
+            s.context_compression_neighbors if s.context_compression else None
+        ),
+    )
+    pipeline = AsyncHRPipeline(
+        retriever=retriever,
+        answerer=answerer,
+        top_k=args.top_k,
+        max_context_chars=int(os.getenv("MAX_CONTEXT_CHARS", "6000")),
+        max_context_tokens=int(os.getenv("MAX_CONTEXT_TOKENS", "1500")) or None,
+        max_concurrency=args.concurrency,
+    )
+
+    t0 = time.perf_counter()
+    results = await pipeline.ask_many(questions)
+    elapsed = time.perf_counter() - t0
+
+    for r in results:
+        print(f"\nQ: {r.answer.question}")
+        print(f"A: {r.answer.answer}")
+        print(format_source_list(r.answer.sources))
+        print(f"   (retrieve {r.retrieve_seconds:.2f}s, answer {r.answer_seconds:.2f}s)")
+
+    print(
+        f"\n{len(results)} questions in {elapsed:.2f}s "
+        f"({len(results) / max(elapsed, 1e-9):.1f} questions/s, concurrency {args.concurrency})"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="HR RAG Assistant — answer many questions concurrently (asyncio)"
+    )
+    parser.add_argument("questions", type=str, help="Text file with one question per line")
+    parser.add_argument("--top-k", type=int, default=5, help="Number of chunks to retrieve")
+    parser.add_argument(
+        "--concurrency", type=int, default=64, help="Questions answered at the same time"
+    )
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
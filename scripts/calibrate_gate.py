@@ -0,0 +1,103 @@
+from __future__ import annotations
+
+import argparse
+import json
+from pathlib import Path
+from typing import List
+
+from hr_rag_assistant.config import get_settings
+from hr_rag_assistant.embeddings.cache import open_embedding_cache
+from hr_rag_assistant.embeddings.embedders import create_embedder
+from hr_rag_assistant.generation.gating import (
+    CalibrationSample,
+    calibrate_thresholds,
+    hit_similarity,
+    score_profile,
+)
+from hr_rag_assistant.retrieval.retriever import HRRetriever
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="HR RAG Assistant — derive confidence gate thresholds from labelled questions"
+    )
+    parser.add_argument(
+        "questions",
+        type=str,
+        help='JSONL file: {"question": ..., "answerable": true|false, "sources": [optional]}',
+    )
+    parser.add_argument("--top-k", type=int, default=5, help="Number of chunks to retrieve")
+    parser.add_argument(
+        "--target-recall",
+        type=float,
+        default=0.98,
+        help="Share of answerable questions that must still reach the model",
+    )
+    args = parser.parse_args()
+
+    s = get_settings()
+    # Same retrieval as the app, minus the keyword fast path: the gate reads
+    # dense similarities, so every question is embedded.
+    retriever = HRRetriever(
+        index_dir=s.index_dir,
+        embedder=create_embedder(
+            s.embedding_backend,
+            model=s.embedding_model,
+            api_key=s.openai_api_key,
+            dimension=s.local_embedding_dim,
+        ),
+        embedding_cache=open_embedding_cache(
+            s.embedding_cache_path, s.embedding_cache_max_entries
+        ),
+        index_load_mode=s.index_load_mode,
+        nprobe=s.index_nprobe,
+        ef_search=s.index_ef_search,
+        rescore_multiplier=s.rescore_multiplier,
+        shard_dirs=s.index_shards,
+        retrieval_mode=s.retrieval_mode,
+        lexical_fast_path=False,
+        merge_overlaps=s.merge_overlapping_chunks,
+        mmr_lambda=s.mmr_lambda,
+        mmr_fetch_k=s.mmr_fetch_k,
+    )
+
+    lines = Path(args.questions).read_text(encoding="utf-8").splitlines()
+    labelled = [json.loads(line) for line in lines if line.strip()]
+    questions = [item["question"] for item in labelled]
+    retrievals = retriever.retrieve_many(questions, top_k=args.top_k)
+
+    samples: List[CalibrationSample] = []
+    for item, retrieval in zip(labelled, retrievals):
+        top, margin = score_profile(retrieval)
+        if top is None:
+            continue
+        drop = None
+        sources = set(item.get("sources") or [])
+        relevant = [h for h in retrieval.results if h.chunk.source in sources]
+        sims = [sim for sim in (hit_similarity(h, retrieval) for h in relevant) if sim is not None]
+        if sims:
+            drop = top - min(sims)
+        samples.append(
+            CalibrationSample(
+                top_score=top,
+                margin=margin,
+                answerable=bool(item["answerable"]),
+                relevant_drop=drop,
+            )
+        )
+
+    report = calibrate_thresholds(samples, target_recall=args.target_recall)
+    t = report.thresholds
+    answerable = sum(sample.answerable for sample in samples)
+    print(f"Questions:       {len(samples)} ({answerable} answerable)")
+    print(f"Answered:        {report.recall:.1%} of answerable questions")
+    print(f"Refused:         {report.refusal_rate:.1%} of unanswerable questions (no chat call)")
+    print("\n# .env")
+    print(f"GATE_MIN_SCORE={t.min_score:.4f}")
+    print(f"GATE_MIN_MARGIN={t.min_margin:.4f}")
+    print(f"GATE_CONFIDENT_SCORE={t.confident_score:.4f}")
+    print(f"GATE_RELATIVE_CUTOFF={'' if t.relative_cutoff is None else f'{t.relative_cutoff:.4f}'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,71 +1,121 @@
 from __future__ import annotations
 
 from hr_rag_assistant.config import get_settings
-from hr_rag_assistant.ingestion.loaders import load_documents
-from hr_rag_assistant.ingestion.cleaner import clean_text
-from hr_rag_assistant.ingestion.chunker import chunk_documents
+from hr_rag_assistant.embeddings.cache import open_embedding_cache
+from hr_rag_assistant.embeddings.embedders import create_embedder
 from hr_rag_assistant.ingestion.index_builder import build_and_persist_faiss_index
+from hr_rag_assistant.ingestion.manifest import IndexManifest
+from hr_rag_assistant.ingestion.pipeline import IngestionStats, iter_corpus_chunks
+from hr_rag_assistant.retrieval.index_spec import IndexSpec
+from hr_rag_assistant.retrieval.versioning import resolve_index_dir
 
 
 def main() -> None:
     s = get_settings()
+    # Retries are handled by the embedding executor, not the client
+    embedder = create_embedder(
+        s.embedding_backend,
+        model=s.embedding_model,
+        api_key=s.openai_api_key,
+        dimension=s.local_embedding_dim,
+        max_retries=0,
+    )
 
     print("== HR RAG Ingestion (FAISS) ==")
     print(f"Raw docs dir : {s.raw_data_dir}")
     print(f"Index dir    : {s.index_dir}")
     print(f"Chunk size   : {s.chunk_size}")
     print(f"Overlap      : {s.chunk_overlap}")
-    print(f"Embeddings   : {s.embedding_model}")
-
-    # 1) Load docs
-    docs = load_documents(s.raw_data_dir)
-    print(f"\nLoaded documents: {len(docs)}")
-
-    # 2) Clean text
-    cleaned_docs = []
-    for d in docs:
-        cleaned_docs.append(
-            type(d)(
-                source=d.source,
-                text=clean_text(d.text),
-                metadata=d.metadata,
-            )
-        )
+    print(f"Embeddings   : {embedder.model} ({embedder.backend})")
+    print(f"CPU workers  : {s.ingest_workers or 1}")
+    print(f"Index type   : {s.index_type}")
+    print(f"Quantizer    : {s.index_quantizer} (exact copy: {s.index_store_vectors})")
+    print(f"BM25 index   : {s.index_bm25}")
+
+    spec = IndexSpec(
+        kind=s.index_type,
+        nlist=s.index_nlist,
+        pq_m=s.index_pq_m,
+        hnsw_m=s.index_hnsw_m,
+        quantizer=s.index_quantizer,
+        store_vectors=s.index_store_vectors,
+        **{
+            k: v
+            for k, v in (("nprobe", s.index_nprobe), ("ef_search", s.index_ef_search))
+            if v is not None
+        },
+    )
 
-    total_chars = sum(len(d.text) for d in cleaned_docs)
-    print(f"Total cleaned chars: {total_chars:,}")
-    print(">>> CLEANING DONE, STARTING CHUNKING")
-    
+    previous = IndexManifest.load(str(resolve_index_dir(s.index_dir)[0]))
 
-    # 3) Chunk
-    chunks = chunk_documents(
-        cleaned_docs,
+    # 1) Load -> clean -> chunk lazily; the index builder pulls chunks in batches
+    stats = IngestionStats()
+    chunks = iter_corpus_chunks(
+        s.raw_data_dir,
         chunk_size=s.chunk_size,
         chunk_overlap=s.chunk_overlap,
+        workers=s.ingest_workers,
+        stats=stats,
     )
-    print(f"Chunks created: {len(chunks)}")
-
-    if not chunks:
-        raise RuntimeError("No chunks created. Check your documents and chunk settings.")
-
-    avg_len = sum(len(c.text) for c in chunks) / len(chunks)
-    print(f"Avg chunk length: {avg_len:.1f} chars")
-    print(f"Example chunk id: {chunks[0].id}")
 
-    # 4) Build + persist FAISS index
-    print("\nBuilding FAISS index (calling embeddings)...")
-    build_and_persist_faiss_index(
+    # 2) Embed + build + persist FAISS index
+    print("\nBuilding FAISS index (streaming chunks into embeddings)...")
+    cache = open_embedding_cache(s.embedding_cache_path, s.embedding_cache_max_entries)
+    build = build_and_persist_faiss_index(
         chunks=chunks,
+        document_hashes=stats.document_hashes,
         index_dir=s.index_dir,
-        openai_api_key=s.openai_api_key,
-        embedding_model=s.embedding_model,
+        embedder=embedder,
+        embedding_cache=cache,
+        max_in_flight=s.embedding_max_in_flight,
+        requests_per_minute=s.embedding_requests_per_minute,
+        tokens_per_minute=s.embedding_tokens_per_minute,
+        index_spec=spec,
+        keep_versions=s.index_keep_versions,
+        lexical_index=s.index_bm25,
     )
 
-    print("\n✅ Done.")
-    print(f"Saved: {s.index_dir}/index.faiss")
-    print(f"Saved: {s.index_dir}/chunks.jsonl")
-    print(f"Saved: {s.index_dir}/meta.json")
+    print(f"\nLoaded documents: {stats.documents}")
+    print(f"Total cleaned chars: {stats.cleaned_chars:,}")
+    print(f"Chunks created: {stats.chunks}")
+    print(f"Avg chunk length: {stats.avg_chunk_len:.1f} chars")
+    print(f"Example chunk id: {stats.first_chunk_id}")
+    print(
+        f"Throughput: {stats.docs_per_sec:,.1f} docs/sec, {stats.chars_per_sec:,.0f} chars/sec "
+        f"({stats.elapsed:.1f}s incl. embedding)"
+    )
+
+    if previous is not None:
+        diff = previous.diff_hashes(stats.document_hashes)
+        print(
+            f"Docs vs manifest: {len(diff.added)} added, {len(diff.changed)} changed, "
+            f"{len(diff.removed)} removed, {len(diff.unchanged)} unchanged"
+        )
+        for src in diff.added + diff.changed + diff.removed:
+            print(f"  ~ {src}")
+
+    if build.recall is not None:
+        r = build.recall
+        print(
+            f"Recall@{r['k']} vs exact flat: {r['recall_at_k']:.4f} over {r['queries']} queries "
+            f"(p50 {r['latency_ms_p50']:.2f} ms, p95 {r['latency_ms_p95']:.2f} ms)"
+        )
+    print(f"Embedded: {build.embedded}  Reused: {build.reused}  Removed: {build.removed}")
+    if cache is not None:
+        cs = cache.stats()
+        print(f"Embedding cache: {cs.hits} hits, {cs.misses} misses, {cs.entries} entries")
 
+    print("\n✅ Done.")
+    print(f"Saved: {build.output_dir}/index.faiss")
+    print(f"Saved: {build.output_dir}/chunks.rows, chunks.txt, chunks.vidmap, chunks.tables.json")
+    if s.index_store_vectors:
+        print(f"Saved: {build.output_dir}/vectors.f16")
+    if s.index_bm25:
+        print(f"Saved: {build.output_dir}/bm25.terms.json, bm25.postings")
+    print(f"Saved: {build.output_dir}/meta.json")
+    print(f"Saved: {build.output_dir}/manifest.json")
+    print(f"Published version {build.version} ({s.index_dir}/CURRENT)")
+    print("Next: python scripts/warm_presets.py  (precomputes the app's preset answers)")
 
 
 if __name__ == "__main__":
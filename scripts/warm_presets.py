@@ -0,0 +1,91 @@
+from __future__ import annotations
+
+import argparse
+import os
+
+from hr_rag_assistant.config import get_settings
+from hr_rag_assistant.embeddings.cache import open_embedding_cache
+from hr_rag_assistant.embeddings.embedders import create_embedder
+from hr_rag_assistant.generation.answer_cache import (
+    open_answer_cache,
+    open_exact_answer_cache,
+    open_preset_store,
+)
+from hr_rag_assistant.generation.answerer import HRAnswerer
+from hr_rag_assistant.generation.gating import thresholds_from_settings
+from hr_rag_assistant.generation.presets import HR_QUESTIONS, warm_presets
+from hr_rag_assistant.retrieval.retriever import HRRetriever
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="HR RAG Assistant — precompute the preset answers (run after ingestion)"
+    )
+    parser.add_argument(
+        "--workers", type=int, default=8, help="Answers generated at the same time"
+    )
+    args = parser.parse_args()
+
+    s = get_settings()
+    store = open_preset_store(s.preset_answers_path)
+    if store is None:
+        raise SystemExit("PRESET_ANSWERS_PATH is empty: precomputed preset answers are disabled.")
+
+    # Same retrieval and answering setup as the app
+    embedding_cache = open_embedding_cache(s.embedding_cache_path, s.embedding_cache_max_entries)
+    retriever = HRRetriever(
+        index_dir=s.index_dir,
+        embedder=create_embedder(
+            s.embedding_backend,
+            model=s.embedding_model,
+            api_key=s.openai_api_key,
+            dimension=s.local_embedding_dim,
+        ),
+        embedding_cache=embedding_cache,
+        index_load_mode=s.index_load_mode,
+        nprobe=s.index_nprobe,
+        ef_search=s.index_ef_search,
+        rescore_multiplier=s.rescore_multiplier,
+        shard_dirs=s.index_shards,
+        retrieval_mode=s.retrieval_mode,
+        lexical_fast_path=s.lexical_fast_path,
+        merge_overlaps=s.merge_overlapping_chunks,
+        mmr_lambda=s.mmr_lambda,
+        mmr_fetch_k=s.mmr_fetch_k,
+    )
+    answerer = HRAnswerer(
+        openai_api_key=s.openai_api_key,
+        chat_model=os.getenv("CHAT_MODEL", "gpt-4.1-mini"),
+        answer_cache=open_answer_cache(
+            s.answer_cache_path,
+            threshold=s.answer_cache_threshold,
+            min_chunk_overlap=s.answer_cache_min_overlap,
+            max_entries=s.answer_cache_max_entries,
+            ttl_seconds=s.answer_cache_ttl_seconds,
+        ),
+        exact_cache=open_exact_answer_cache(
+            s.exact_answer_cache_path,
+            max_entries=s.exact_answer_cache_max_entries,
+            ttl_seconds=s.answer_cache_ttl_seconds,
+        ),
+        compression_neighbors=(
+            s.context_compression_neighbors if s.context_compression else None
+        ),
+    )
+
+    report = warm_presets(
+        retriever=retriever,
+        answerer=answerer,
+        store=store,
+        questions=HR_QUESTIONS,
+        gate=thresholds_from_settings(s) if s.strict_grounded else None,
+        workers=args.workers,
+    )
+    print(f"Index version:   {report.index_version}")
+    print(f"Presets:         {report.answered} answered, {report.refused} refused")
+    print(f"Warmup:          {report.seconds:.1f}s")
+    print(f"Saved:           {s.preset_answers_path}")
+
+
+if __name__ == "__main__":
+    main()
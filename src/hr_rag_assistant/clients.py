@@ -0,0 +1,48 @@
+from __future__ import annotations
+
+import asyncio
+import weakref
+from typing import Dict, Optional, Tuple
+
+import httpx
+from openai import AsyncOpenAI
+
+# Concurrent HTTP connections of the shared async client (per event loop).
+ASYNC_MAX_CONNECTIONS = 100
+
+# event loop -> {(api key, max connections, max retries): client}
+_async_clients: weakref.WeakKeyDictionary = weakref.WeakKeyDictionary()
+
+
+def shared_async_openai(
+    api_key: Optional[str] = None,
+    *,
+    max_connections: int = ASYNC_MAX_CONNECTIONS,
+    max_retries: Optional[int] = None,
+) -> AsyncOpenAI:
+    """
+    AsyncOpenAI client shared by all async embedding and chat requests of
+    the running event loop, so concurrent questions reuse one pool of
+    keep-alive connections (at most `max_connections`) instead of opening
+    their own. Pooled connections belong to the loop that opened them, hence
+    one client per loop; call this from a coroutine.
+    """
+    loop = asyncio.get_running_loop()
+    clients: Dict[Tuple[Optional[str], int, Optional[int]], AsyncOpenAI] = (
+        _async_clients.setdefault(loop, {})
+    )
+    key = (api_key, max_connections, max_retries)
+    client = clients.get(key)
+    if client is None:
+        http_client = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=max_connections, max_keepalive_connections=max_connections
+            ),
+            # The OpenAI SDK defaults
+            timeout=httpx.Timeout(600.0, connect=5.0),
+            follow_redirects=True,
+        )
+        kwargs = {"max_retries": max_retries} if max_retries is not None else {}
+        client = AsyncOpenAI(api_key=api_key, http_client=http_client, **kwargs)
+        clients[key] = client
+    return client
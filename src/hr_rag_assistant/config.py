@@ -2,31 +2,183 @@ from __future__ import annotations
 
 import os
 from dataclasses import dataclass
+from typing import List, Optional
 from dotenv import load_dotenv
 
 load_dotenv()
 
+# GATE_MIN_SCORE when unset, per embedding backend: cosine scales differ, and
+# 0.25 is only a sensible floor for the OpenAI embeddings. Other backends get
+# no score floor (-1 = any cosine passes) until scripts/calibrate_gate.py has
+# been run on them.
+GATE_MIN_SCORE_DEFAULTS = {"openai": 0.25}
+
 
 @dataclass(frozen=True)
 class Settings:
     openai_api_key: str
+    embedding_backend: str
     embedding_model: str
+    local_embedding_dim: int
     raw_data_dir: str
     index_dir: str
+    index_shards: List[str]
+    index_keep_versions: int
+    index_reload_interval: float
     chunk_size: int
     chunk_overlap: int
+    embedding_cache_path: str
+    embedding_cache_max_entries: int
+    query_cache_max_entries: int
+    query_cache_ttl_seconds: float
+    query_cache_shared: bool
+    embedding_max_in_flight: int
+    embedding_requests_per_minute: int
+    embedding_tokens_per_minute: int
+    ingest_workers: int
+    index_load_mode: str
+    index_type: str
+    index_nlist: int
+    index_pq_m: int
+    index_hnsw_m: int
+    index_nprobe: Optional[int]
+    index_ef_search: Optional[int]
+    index_quantizer: str
+    index_store_vectors: bool
+    rescore_multiplier: int
+    index_bm25: bool
+    retrieval_mode: str
+    lexical_fast_path: bool
+    merge_overlapping_chunks: bool
+    mmr_lambda: Optional[float]
+    mmr_fetch_k: int
+    answer_cache_path: str
+    answer_cache_threshold: float
+    answer_cache_min_overlap: float
+    answer_cache_max_entries: int
+    answer_cache_ttl_seconds: float
+    exact_answer_cache_path: str
+    exact_answer_cache_max_entries: int
+    preset_answers_path: str
+    context_compression: bool
+    context_compression_neighbors: int
+    strict_grounded: bool
+    gate_min_score: float
+    gate_min_margin: float
+    gate_confident_score: float
+    gate_relative_cutoff: Optional[float]
+
+
+def _optional_int(name: str) -> Optional[int]:
+    value = os.getenv(name, "").strip()
+    return int(value) if value else None
+
+
+def _optional_float(name: str) -> Optional[float]:
+    value = os.getenv(name, "").strip()
+    return float(value) if value else None
+
+
+def _gate_min_score(embedding_backend: str) -> float:
+    value = _optional_float("GATE_MIN_SCORE")
+    return value if value is not None else GATE_MIN_SCORE_DEFAULTS.get(embedding_backend, -1.0)
+
+
+def _bool(name: str, default: str) -> bool:
+    return os.getenv(name, default).strip().lower() in {"1", "true", "yes", "y"}
 
 
 def get_settings() -> Settings:
     api_key = os.getenv("OPENAI_API_KEY", "").strip()
-    if not api_key:
+    # openai | hashing (offline, CPU-only; no API key needed to ingest and retrieve)
+    embedding_backend = os.getenv("EMBEDDING_BACKEND", "openai").strip().lower()
+    if not api_key and embedding_backend == "openai":
         raise RuntimeError("OPENAI_API_KEY is missing. Set it in your .env file.")
 
     return Settings(
         openai_api_key=api_key,
+        embedding_backend=embedding_backend,
         embedding_model=os.getenv("EMBEDDING_MODEL", "text-embedding-3-small"),
+        # Vector size of local embedding backends
+        local_embedding_dim=int(os.getenv("LOCAL_EMBEDDING_DIM", "512")),
         raw_data_dir=os.getenv("RAW_DATA_DIR", "./data/raw"),
         index_dir=os.getenv("INDEX_DIR", "./data/indexes/hr_default"),
+        # Comma-separated index dirs searched together (e.g. one per region);
+        # overrides INDEX_DIR at query time
+        index_shards=[d.strip() for d in os.getenv("INDEX_SHARDS", "").split(",") if d.strip()],
+        # Index snapshots kept under INDEX_DIR/versions
+        # (older unused ones are deleted after ingestion)
+        index_keep_versions=int(os.getenv("INDEX_KEEP_VERSIONS", "2")),
+        # Seconds between checks for a newly published index in long-running servers (0 = never)
+        index_reload_interval=float(os.getenv("INDEX_RELOAD_INTERVAL", "5")),
         chunk_size=int(os.getenv("CHUNK_SIZE", "900")),
         chunk_overlap=int(os.getenv("CHUNK_OVERLAP", "150")),
+        # Empty EMBEDDING_CACHE_PATH disables the on-disk embedding cache
+        embedding_cache_path=os.getenv("EMBEDDING_CACHE_PATH", "./data/cache/embeddings.sqlite"),
+        embedding_cache_max_entries=int(os.getenv("EMBEDDING_CACHE_MAX_ENTRIES", "200000")),
+        # In-process query embedding cache (0 entries = off);
+        # SHARED also uses the on-disk cache across workers
+        query_cache_max_entries=int(os.getenv("QUERY_CACHE_MAX_ENTRIES", "1024")),
+        query_cache_ttl_seconds=float(os.getenv("QUERY_CACHE_TTL_SECONDS", "3600")),
+        query_cache_shared=_bool("QUERY_CACHE_SHARED", "true"),
+        # Ingestion-time embedding concurrency and per-minute budgets (0 = unlimited)
+        embedding_max_in_flight=int(os.getenv("EMBEDDING_MAX_IN_FLIGHT", "4")),
+        embedding_requests_per_minute=int(os.getenv("EMBEDDING_RPM", "0")),
+        embedding_tokens_per_minute=int(os.getenv("EMBEDDING_TPM", "0")),
+        # Processes for load/clean/chunk (0 or 1 = run in the ingestion process)
+        ingest_workers=int(os.getenv("INGEST_WORKERS", "0")),
+        # "mmap" shares index pages between serving workers; "heap" copies it per process
+        index_load_mode=os.getenv("INDEX_LOAD_MODE", "mmap").strip().lower(),
+        # FAISS index type (flat | ivf_flat | ivf_pq | hnsw) and build parameters
+        index_type=os.getenv("INDEX_TYPE", "flat").strip().lower(),
+        index_nlist=int(os.getenv("INDEX_NLIST", "1024")),
+        index_pq_m=int(os.getenv("INDEX_PQ_M", "16")),
+        index_hnsw_m=int(os.getenv("INDEX_HNSW_M", "32")),
+        # Query-time knobs; unset = use the values recorded in meta.json
+        index_nprobe=_optional_int("INDEX_NPROBE"),
+        index_ef_search=_optional_int("INDEX_EF_SEARCH"),
+        # Vector encoding (none | fp16 | int8); a float16 copy enables exact rescoring
+        index_quantizer=os.getenv("INDEX_QUANTIZER", "none").strip().lower(),
+        index_store_vectors=_bool("INDEX_STORE_VECTORS", "false"),
+        rescore_multiplier=int(os.getenv("RESCORE_MULTIPLIER", "4")),
+        # BM25 index over chunk text, built next to the FAISS index
+        index_bm25=_bool("INDEX_BM25", "true"),
+        # dense | hybrid (dense + BM25 with reciprocal-rank fusion)
+        retrieval_mode=os.getenv("RETRIEVAL_MODE", "hybrid").strip().lower(),
+        # Answer short keyword queries ("PTO", "medical certificate") from BM25 without embedding
+        lexical_fast_path=_bool("LEXICAL_FAST_PATH", "true"),
+        # Send overlapping/adjacent chunks of a document to the model as one span
+        merge_overlapping_chunks=_bool("MERGE_OVERLAPPING_CHUNKS", "true"),
+        # Maximal marginal relevance over MMR_FETCH_K candidates (unset = off;
+        # 1.0 = relevance only, lower values favour diverse evidence)
+        mmr_lambda=_optional_float("MMR_LAMBDA"),
+        mmr_fetch_k=int(os.getenv("MMR_FETCH_K", "20")),
+        # Reuse answers of near-duplicate questions (empty path = off): question cosine
+        # >= THRESHOLD, Jaccard overlap of retrieved chunks >= MIN_OVERLAP, same index version
+        answer_cache_path=os.getenv("ANSWER_CACHE_PATH", "./data/cache/answers.sqlite"),
+        answer_cache_threshold=float(os.getenv("ANSWER_CACHE_THRESHOLD", "0.93")),
+        answer_cache_min_overlap=float(os.getenv("ANSWER_CACHE_MIN_OVERLAP", "0.5")),
+        answer_cache_max_entries=int(os.getenv("ANSWER_CACHE_MAX_ENTRIES", "5000")),
+        answer_cache_ttl_seconds=float(os.getenv("ANSWER_CACHE_TTL_SECONDS", "604800")),
+        # Replay answers of identical requests at temperature 0 (same question, same
+        # retrieved chunks in order, same model/prompt/budget; empty path = off)
+        exact_answer_cache_path=os.getenv(
+            "EXACT_ANSWER_CACHE_PATH", "./data/cache/answers.sqlite"
+        ),
+        exact_answer_cache_max_entries=int(os.getenv("EXACT_ANSWER_CACHE_MAX_ENTRIES", "20000")),
+        # Precomputed answers of the app's preset questions (scripts/warm_presets.py;
+        # empty path = off)
+        preset_answers_path=os.getenv("PRESET_ANSWERS_PATH", "./data/cache/answers.sqlite"),
+        # Send only the sentences of each chunk that match the question, plus
+        # NEIGHBORS sentences on either side (cuts prompt size and latency)
+        context_compression=_bool("CONTEXT_COMPRESSION", "false"),
+        context_compression_neighbors=int(os.getenv("CONTEXT_COMPRESSION_NEIGHBORS", "1")),
+        # Refuse without a chat call when retrieval looks out of scope (see
+        # generation.gating; derive the thresholds with scripts/calibrate_gate.py;
+        # unset GATE_MIN_SCORE = GATE_MIN_SCORE_DEFAULTS for the embedding backend)
+        strict_grounded=_bool("STRICT_GROUNDED", "true"),
+        gate_min_score=_gate_min_score(embedding_backend),
+        gate_min_margin=float(os.getenv("GATE_MIN_MARGIN", "0")),
+        gate_confident_score=float(os.getenv("GATE_CONFIDENT_SCORE", "1")),
+        gate_relative_cutoff=_optional_float("GATE_RELATIVE_CUTOFF"),
     )
\ No newline at end of file
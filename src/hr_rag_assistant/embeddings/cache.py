@@ -0,0 +1,246 @@
+from __future__ import annotations
+
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Sequence
+
+import numpy as np
+
+from hr_rag_assistant.embeddings.embedders import as_embedder
+
+# SQLite's default limit on bound parameters is 999 on older builds.
+_SQL_BATCH = 500
+
+
+@dataclass(frozen=True)
+class CacheStats:
+    hits: int
+    misses: int
+    entries: int
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+
+def embedding_key(model: str, dimensions: Optional[int], text: str) -> str:
+    """Content address of an embedding: (model, dimensions, sha256(text))."""
+    text_hash = hashlib.sha256(text.encode("utf-8")).hexdigest()
+    return f"{model}:{dimensions or 0}:{text_hash}"
+
+
+class EmbeddingCache:
+    """
+    On-disk embedding cache shared by ingestion and querying.
+
+    - Backed by SQLite in WAL mode, so several processes can read and write
+      the same file concurrently (writers serialize on SQLite's lock).
+    - Bounded by `max_entries`; least-recently-used rows are evicted first.
+    - Vectors are stored as raw float32 bytes.
+    - `stats()` reports hits/misses seen by this process.
+    """
+
+    def __init__(self, path: str, max_entries: int = 200_000):
+        if max_entries <= 0:
+            raise ValueError("max_entries must be > 0")
+
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.max_entries = max_entries
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), timeout=30.0, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS embeddings (
+                key TEXT PRIMARY KEY,
+                dim INTEGER NOT NULL,
+                vector BLOB NOT NULL,
+                last_used REAL NOT NULL
+            )
+            """
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_embeddings_last_used ON embeddings(last_used)"
+        )
+        self._conn.commit()
+
+        self._hits = 0
+        self._misses = 0
+        self._approx_entries = self._count()
+
+    def _count(self) -> int:
+        return int(self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0])
+
+    def get_many(
+        self, model: str, dimensions: Optional[int], texts: Sequence[str]
+    ) -> List[Optional[np.ndarray]]:
+        keys = [embedding_key(model, dimensions, t) for t in texts]
+        found: Dict[str, np.ndarray] = {}
+
+        with self._lock:
+            for i in range(0, len(keys), _SQL_BATCH):
+                batch = keys[i : i + _SQL_BATCH]
+                marks = ",".join("?" * len(batch))
+                rows = self._conn.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({marks})", batch
+                ).fetchall()
+                for key, blob in rows:
+                    found[key] = np.frombuffer(blob, dtype="float32")
+
+            if found:
+                now = time.time()
+                self._conn.executemany(
+                    "UPDATE embeddings SET last_used = ? WHERE key = ?",
+                    [(now, k) for k in found],
+                )
+                self._conn.commit()
+
+            out = [found.get(k) for k in keys]
+            hits = sum(v is not None for v in out)
+            self._hits += hits
+            self._misses += len(out) - hits
+
+        return out
+
+    def put_many(
+        self,
+        model: str,
+        dimensions: Optional[int],
+        texts: Sequence[str],
+        vectors: np.ndarray,
+    ) -> None:
+        if len(texts) != len(vectors):
+            raise ValueError("texts and vectors must have the same length")
+
+        now = time.time()
+        rows = [
+            (
+                embedding_key(model, dimensions, t),
+                int(v.shape[0]),
+                np.asarray(v, dtype="float32").tobytes(),
+                now,
+            )
+            for t, v in zip(texts, vectors)
+        ]
+
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (key, dim, vector, last_used) "
+                "VALUES (?, ?, ?, ?)",
+                rows,
+            )
+            self._conn.commit()
+            self._approx_entries += len(rows)
+            if self._approx_entries > self.max_entries:
+                self._evict()
+
+    def _evict(self) -> None:
+        # Other processes insert too, so re-count before deleting. Evict a bit
+        # below the cap so we don't run this on every subsequent put.
+        count = self._count()
+        target = int(self.max_entries * 0.9)
+        excess = count - target
+        if count > self.max_entries and excess > 0:
+            self._conn.execute(
+                """
+                DELETE FROM embeddings WHERE key IN (
+                    SELECT key FROM embeddings ORDER BY last_used ASC LIMIT ?
+                )
+                """,
+                (excess,),
+            )
+            self._conn.commit()
+            count -= excess
+        self._approx_entries = count
+
+    def stats(self) -> CacheStats:
+        with self._lock:
+            return CacheStats(hits=self._hits, misses=self._misses, entries=self._count())
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+def open_embedding_cache(path: str, max_entries: int) -> Optional[EmbeddingCache]:
+    """Returns None when the cache is disabled (empty path)."""
+    if not path.strip():
+        return None
+    return EmbeddingCache(os.path.expanduser(path), max_entries=max_entries)
+
+
+def embed_texts(
+    oai,
+    *,
+    model: str,
+    texts: Sequence[str],
+    cache: Optional[EmbeddingCache] = None,
+    dimensions: Optional[int] = None,
+    requester: Optional[Callable[[Sequence[str]], np.ndarray]] = None,
+) -> np.ndarray:
+    """
+    Embeds `texts` (in order) as a float32 matrix, calling the embeddings API
+    only for texts that are not in `cache`. `requester` replaces the plain API
+    call (e.g. to add rate limiting and retries).
+
+    `oai` is an Embedder or an OpenAI client (embedding with `model`).
+    """
+    cached: List[Optional[np.ndarray]] = (
+        cache.get_many(model, dimensions, texts) if cache is not None else [None] * len(texts)
+    )
+    missing = [i for i, v in enumerate(cached) if v is None]
+
+    if missing:
+        missing_texts = [texts[i] for i in missing]
+        if requester is not None:
+            fresh = requester(missing_texts)
+        else:
+            fresh = as_embedder(oai, model, dimensions).embed(missing_texts)
+        if cache is not None:
+            cache.put_many(model, dimensions, missing_texts, fresh)
+        for row, i in enumerate(missing):
+            cached[i] = fresh[row]
+
+    return (
+        np.vstack(cached).astype("float32", copy=False)
+        if cached
+        else np.zeros((0, 0), dtype="float32")
+    )
+
+
+async def aembed_texts(
+    oai,
+    *,
+    model: str,
+    texts: Sequence[str],
+    cache: Optional[EmbeddingCache] = None,
+    dimensions: Optional[int] = None,
+) -> np.ndarray:
+    """`embed_texts` with the API request awaited (Embedder.aembed) instead of blocking."""
+    cached: List[Optional[np.ndarray]] = (
+        cache.get_many(model, dimensions, texts) if cache is not None else [None] * len(texts)
+    )
+    missing = [i for i, v in enumerate(cached) if v is None]
+
+    if missing:
+        missing_texts = [texts[i] for i in missing]
+        fresh = await as_embedder(oai, model, dimensions).aembed(missing_texts)
+        if cache is not None:
+            cache.put_many(model, dimensions, missing_texts, fresh)
+        for row, i in enumerate(missing):
+            cached[i] = fresh[row]
+
+    return (
+        np.vstack(cached).astype("float32", copy=False)
+        if cached
+        else np.zeros((0, 0), dtype="float32")
+    )
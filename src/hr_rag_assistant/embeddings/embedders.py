@@ -0,0 +1,221 @@
+from __future__ import annotations
+
+import asyncio
+import re
+import zlib
+from abc import ABC, abstractmethod
+from functools import lru_cache
+from typing import Any, Dict, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
+from openai import OpenAI
+
+from hr_rag_assistant.clients import shared_async_openai
+
+EMBEDDING_BACKENDS = ("openai", "hashing")
+
+
+def request_embeddings(
+    oai, *, model: str, texts: Sequence[str], dimensions: Optional[int] = None
+) -> np.ndarray:
+    """One embeddings API call; returns a float32 matrix in input order."""
+    kwargs = {"dimensions": dimensions} if dimensions else {}
+    emb = oai.embeddings.create(model=model, input=list(texts), **kwargs)
+    return _as_matrix(emb, len(texts))
+
+
+async def arequest_embeddings(
+    aoai, *, model: str, texts: Sequence[str], dimensions: Optional[int] = None
+) -> np.ndarray:
+    """`request_embeddings` on an AsyncOpenAI client."""
+    kwargs = {"dimensions": dimensions} if dimensions else {}
+    emb = await aoai.embeddings.create(model=model, input=list(texts), **kwargs)
+    return _as_matrix(emb, len(texts))
+
+
+def _as_matrix(emb: Any, n_texts: int) -> np.ndarray:
+    vectors = np.array([e.embedding for e in emb.data], dtype="float32")
+    if vectors.shape[0] != n_texts:
+        raise RuntimeError(f"Embedding returned {vectors.shape[0]} vectors for {n_texts} texts.")
+    return vectors
+
+
+class Embedder(ABC):
+    """
+    Turns texts into a float32 matrix (one row per text, in input order).
+
+    `model` names the vector space: it keys the embedding caches and is
+    recorded as meta.json["embedding_model"]. `identity()` is recorded as
+    meta.json["embedder"], and indexes are only served by an embedder with
+    the same identity (vectors of different backends are not comparable).
+    """
+
+    backend: str
+    model: str
+
+    @abstractmethod
+    def embed(self, texts: Sequence[str]) -> np.ndarray: ...
+
+    async def aembed(self, texts: Sequence[str]) -> np.ndarray:
+        """`embed` without blocking the event loop (default: in a worker thread)."""
+        return await asyncio.to_thread(self.embed, texts)
+
+    def identity(self) -> Dict[str, Any]:
+        return {"backend": self.backend, "model": self.model}
+
+
+class OpenAIEmbedder(Embedder):
+    """
+    OpenAI embeddings API (one request per `embed` call). `aembed` goes
+    through `async_client`, by default the event loop's shared AsyncOpenAI
+    client (same API key); with another kind of `client` it runs in a thread.
+    """
+
+    backend = "openai"
+
+    def __init__(
+        self,
+        *,
+        model: str,
+        api_key: Optional[str] = None,
+        client: Any = None,
+        async_client: Any = None,
+        dimensions: Optional[int] = None,
+        max_retries: Optional[int] = None,
+    ):
+        # `client` may be any object with an OpenAI-style `embeddings.create`.
+        if client is None:
+            kwargs = {"max_retries": max_retries} if max_retries is not None else {}
+            client = OpenAI(api_key=api_key, **kwargs)
+        self.client = client
+        self.async_client = async_client
+        self.model = model
+        self.dimensions = dimensions
+
+    def embed(self, texts: Sequence[str]) -> np.ndarray:
+        return request_embeddings(
+            self.client, model=self.model, texts=texts, dimensions=self.dimensions
+        )
+
+    async def aembed(self, texts: Sequence[str]) -> np.ndarray:
+        aoai = self.async_client
+        if aoai is None:
+            if not isinstance(self.client, OpenAI):
+                return await super().aembed(texts)
+            aoai = shared_async_openai(self.client.api_key, max_retries=self.client.max_retries)
+        return await arequest_embeddings(
+            aoai, model=self.model, texts=texts, dimensions=self.dimensions
+        )
+
+
+_WORD_RE = re.compile(r"\w+")
+
+
+class HashingEmbedder(Embedder):
+    """
+    Offline CPU embedder: signed feature hashing of words, word bigrams and
+    character trigrams into `dimension` buckets, with sublinear term
+    frequency, then L2 normalization. No model files and no network, so
+    ingestion and serving work in air-gapped environments and pipeline
+    benchmarks do not pay for API calls. Retrieval quality is lexical
+    (shared words and word pieces), well below a learned embedding model.
+    """
+
+    backend = "hashing"
+    VERSION = 1
+
+    def __init__(self, dimension: int = 512):
+        if dimension <= 0:
+            raise ValueError("dimension must be > 0")
+        self.dimension = dimension
+        self.model = f"hashing-v{self.VERSION}-{dimension}"
+        self._word_features = lru_cache(maxsize=100_000)(self._features_of_word)
+
+    def identity(self) -> Dict[str, Any]:
+        return {**super().identity(), "dimension": self.dimension, "version": self.VERSION}
+
+    def _bucket(self, feature: str) -> Tuple[int, float]:
+        h = zlib.crc32(feature.encode("utf-8"))
+        return h % self.dimension, 1.0 if (h // self.dimension) & 1 else -1.0
+
+    def _features_of_word(self, word: str) -> Tuple[Tuple[int, float], ...]:
+        # The word itself, plus its character trigrams at half weight, so
+        # inflections ("certificate" / "certificates") still overlap.
+        padded = f"#{word}#"
+        grams = [padded[i : i + 3] for i in range(len(padded) - 2)] if len(word) > 2 else []
+        weight = 0.5 / max(1, len(grams)) ** 0.5
+        features = [self._bucket("w:" + word)]
+        for gram in grams:
+            bucket, sign = self._bucket("c:" + gram)
+            features.append((bucket, sign * weight))
+        return tuple(features)
+
+    def embed(self, texts: Sequence[str]) -> np.ndarray:
+        out = np.zeros((len(texts), self.dimension), dtype="float32")
+        for row, text in enumerate(texts):
+            words = _WORD_RE.findall(text.casefold())
+            features = [f for w in words for f in self._word_features(w)]
+            features += [self._bucket(f"b:{a} {b}") for a, b in zip(words, words[1:])]
+            if not features:
+                continue
+            buckets = np.fromiter((b for b, _ in features), dtype="int64", count=len(features))
+            signs = np.fromiter((s for _, s in features), dtype="float32", count=len(features))
+            counts = np.bincount(buckets, weights=signs, minlength=self.dimension)
+            vec = np.sign(counts) * np.log1p(np.abs(counts))
+            norm = np.linalg.norm(vec)
+            if norm > 0:
+                out[row] = vec / norm
+        return out
+
+    async def aembed(self, texts: Sequence[str]) -> np.ndarray:
+        # A few queries take microseconds: cheaper inline than a thread hop.
+        if len(texts) <= 16:
+            return self.embed(texts)
+        return await super().aembed(texts)
+
+
+def as_embedder(
+    obj: Any, model: Optional[str] = None, dimensions: Optional[int] = None
+) -> Embedder:
+    """Embedders pass through; an OpenAI(-compatible) client is wrapped for `model`."""
+    if isinstance(obj, Embedder):
+        return obj
+    if model is None:
+        raise ValueError("model is required to embed with a client")
+    return OpenAIEmbedder(model=model, client=obj, dimensions=dimensions)
+
+
+def create_embedder(
+    backend: str,
+    *,
+    model: str,
+    api_key: Optional[str] = None,
+    dimension: int = 512,
+    max_retries: Optional[int] = None,
+) -> Embedder:
+    """Embedder for EMBEDDING_BACKEND (`dimension` only applies to local backends)."""
+    if backend == "openai":
+        return OpenAIEmbedder(model=model, api_key=api_key, max_retries=max_retries)
+    if backend == "hashing":
+        return HashingEmbedder(dimension=dimension)
+    raise ValueError(
+        f"Unknown embedding backend: {backend!r} (expected one of {EMBEDDING_BACKENDS})"
+    )
+
+
+def index_embedder(meta: Mapping[str, Any]) -> Dict[str, Any]:
+    """Embedder identity recorded in an index's meta.json (OpenAI before it was recorded)."""
+    recorded = meta.get("embedder")
+    if recorded:
+        return dict(recorded)
+    return {"backend": "openai", "model": meta.get("embedding_model")}
+
+
+def check_embedder(meta: Mapping[str, Any], expected: Mapping[str, Any], index_dir: Any) -> None:
+    """Refuses to serve an index with vectors from another embedder."""
+    recorded = index_embedder(meta)
+    if recorded != dict(expected):
+        raise RuntimeError(
+            f"Index {index_dir} was built with embedder {recorded}, but {dict(expected)} is "
+            "configured. Re-run ingestion or change EMBEDDING_BACKEND / EMBEDDING_MODEL."
+        )
@@ -0,0 +1,156 @@
+from __future__ import annotations
+
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Deque, Iterable, Iterator, List, Optional, Sequence
+
+import numpy as np
+import openai
+
+from hr_rag_assistant.embeddings.cache import EmbeddingCache, embed_texts
+from hr_rag_assistant.embeddings.embedders import Embedder, as_embedder
+from hr_rag_assistant.logging import get_logger
+
+logger = get_logger(__name__)
+
+
+def estimate_tokens(texts: Sequence[str]) -> int:
+    """Rough token count (~4 chars/token for English) used for TPM budgeting."""
+    return sum(len(t) // 4 + 1 for t in texts)
+
+
+class TokenBucket:
+    """
+    Thread-safe per-minute budget. `acquire(n)` blocks until `n` units are
+    available. A budget of 0 means unlimited.
+    """
+
+    def __init__(self, per_minute: int):
+        self.capacity = float(per_minute)
+        self.rate = per_minute / 60.0
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, amount: float = 1.0) -> None:
+        if self.capacity <= 0:
+            return
+        # A request larger than the whole budget still goes through once the bucket is full.
+        amount = min(float(amount), self.capacity)
+
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= amount:
+                    self._tokens -= amount
+                    return
+                wait = (amount - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+def _is_retryable(exc: Exception) -> bool:
+    if isinstance(exc, (openai.RateLimitError, openai.APIConnectionError, openai.APITimeoutError)):
+        return True
+    return isinstance(exc, openai.APIStatusError) and exc.status_code >= 500
+
+
+def _retry_after(exc: Exception) -> Optional[float]:
+    response = getattr(exc, "response", None)
+    headers = getattr(response, "headers", None)
+    if not headers:
+        return None
+    try:
+        return float(headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
+
+
+class EmbeddingExecutor:
+    """
+    Runs embedding batches concurrently while keeping results in input order.
+
+    - At most `max_in_flight` batches are being embedded at any time.
+    - `requests_per_minute` / `tokens_per_minute` budgets (0 = unlimited) are
+      enforced before each API call.
+    - 429, 5xx and connection errors are retried with exponential backoff
+      (honouring Retry-After when the API sends it).
+    - Cache hits (see EmbeddingCache) never count against the budgets.
+
+    `embedder` is an Embedder, or an OpenAI client used with `model`.
+    """
+
+    def __init__(
+        self,
+        embedder,
+        *,
+        model: Optional[str] = None,
+        cache: Optional[EmbeddingCache] = None,
+        max_in_flight: int = 4,
+        requests_per_minute: int = 0,
+        tokens_per_minute: int = 0,
+        max_retries: int = 6,
+        backoff_base: float = 1.0,
+        backoff_max: float = 60.0,
+    ):
+        if max_in_flight <= 0:
+            raise ValueError("max_in_flight must be > 0")
+
+        self.embedder: Embedder = as_embedder(embedder, model)
+        self.model = self.embedder.model
+        self.cache = cache
+        self.max_in_flight = max_in_flight
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+
+        self._rpm = TokenBucket(requests_per_minute)
+        self._tpm = TokenBucket(tokens_per_minute)
+
+    def _request(self, texts: Sequence[str]) -> np.ndarray:
+        attempt = 0
+        while True:
+            self._rpm.acquire(1)
+            self._tpm.acquire(estimate_tokens(texts))
+            try:
+                return self.embedder.embed(texts)
+            except Exception as exc:
+                if not _is_retryable(exc) or attempt >= self.max_retries:
+                    raise
+                delay = _retry_after(exc)
+                if delay is None:
+                    delay = min(self.backoff_max, self.backoff_base * (2**attempt))
+                    delay *= 0.5 + random.random() / 2  # jitter
+                attempt += 1
+                logger.warning(
+                    "Embedding request failed (%s); retry %d/%d in %.1fs",
+                    type(exc).__name__,
+                    attempt,
+                    self.max_retries,
+                    delay,
+                )
+                time.sleep(delay)
+
+    def embed_batch(self, texts: Sequence[str]) -> np.ndarray:
+        return embed_texts(
+            self.embedder, model=self.model, texts=texts, cache=self.cache, requester=self._request
+        )
+
+    def map(self, batches: Iterable[List[str]]) -> Iterator[np.ndarray]:
+        """
+        Embeds `batches` concurrently and yields one matrix per batch, in the
+        order the batches were given. Batches are pulled lazily, so at most
+        `max_in_flight` of them are held in memory.
+        """
+        pending: Deque[Future] = deque()
+        with ThreadPoolExecutor(max_workers=self.max_in_flight) as pool:
+            for batch in batches:
+                if len(pending) >= self.max_in_flight:
+                    yield pending.popleft().result()
+                pending.append(pool.submit(self.embed_batch, batch))
+            while pending:
+                yield pending.popleft().result()
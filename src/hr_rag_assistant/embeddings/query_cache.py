@@ -0,0 +1,194 @@
+from __future__ import annotations
+
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence, Set, Tuple
+
+import numpy as np
+
+from hr_rag_assistant.embeddings.cache import EmbeddingCache
+from hr_rag_assistant.embeddings.embedders import as_embedder
+
+
+def normalize_query(text: str) -> str:
+    """Cache key of a query: collapsed whitespace, case-folded."""
+    return " ".join(text.split()).casefold()
+
+
+def _shared_model(model: str) -> str:
+    # Query vectors are stored under the normalized text, not the text that
+    # was embedded, so they get their own namespace in the shared
+    # (content-addressed) cache.
+    return f"{model}::query"
+
+
+@dataclass(frozen=True)
+class QueryCacheStats:
+    hits: int  # served from this process
+    shared_hits: int  # served from the shared backend
+    misses: int  # needed an embeddings API call
+    entries: int
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.shared_hits + self.misses
+        return (self.hits + self.shared_hits) / total if total else 0.0
+
+
+class QueryEmbeddingCache:
+    """
+    In-process LRU + TTL cache of query embeddings, keyed by (model,
+    normalize_query(text)), so "How many PTO days?" and "how many  pto days?"
+    share one entry and repeated questions skip the embeddings API entirely.
+    Only the key is normalized: the text embedded is the query as first
+    asked, so results match retrieval without the cache.
+
+    - At most `max_entries` vectors are kept; the least recently used go first.
+    - Entries older than `ttl_seconds` are re-fetched (0 = no expiry).
+    - `shared` (e.g. the SQLite EmbeddingCache) is checked on a local miss,
+      so workers of a multi-process deployment warm each other up.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 1024,
+        ttl_seconds: float = 3600.0,
+        shared: Optional[EmbeddingCache] = None,
+    ):
+        if max_entries <= 0:
+            raise ValueError("max_entries must be > 0")
+
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.shared = shared
+
+        self._entries: "OrderedDict[Tuple[str, str], Tuple[float, np.ndarray]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._shared_hits = 0
+        self._misses = 0
+
+    def _get_local(self, key: Tuple[str, str], now: float) -> Optional[np.ndarray]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        stored_at, vector = entry
+        if self.ttl_seconds > 0 and now - stored_at > self.ttl_seconds:
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return vector
+
+    def _put_local(self, key: Tuple[str, str], vector: np.ndarray, now: float) -> None:
+        self._entries[key] = (now, vector)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def embed_many(self, oai, *, model: str, queries: Sequence[str]) -> np.ndarray:
+        """
+        Embeddings of `queries` in order; all cache misses go out in one
+        request. `oai` is an Embedder or an OpenAI client.
+        """
+        texts, out, missing, found = self._lookup(model, queries)
+        if missing:
+            fresh = as_embedder(oai, model).embed(list(missing.values()))
+            found.update(self._fetched(model, list(missing), fresh))
+        return self._fill(model, texts, out, set(missing), found)
+
+    async def aembed_many(self, oai, *, model: str, queries: Sequence[str]) -> np.ndarray:
+        """`embed_many` with the request awaited (Embedder.aembed) instead of blocking."""
+        texts, out, missing, found = self._lookup(model, queries)
+        if missing:
+            fresh = await as_embedder(oai, model).aembed(list(missing.values()))
+            found.update(self._fetched(model, list(missing), fresh))
+        return self._fill(model, texts, out, set(missing), found)
+
+    def _lookup(
+        self, model: str, queries: Sequence[str]
+    ) -> Tuple[List[str], List[Optional[np.ndarray]], Dict[str, str], Dict[str, np.ndarray]]:
+        """(keys, local hits, key -> query text to embed, shared hits)."""
+        texts = [normalize_query(q) for q in queries]
+        out: List[Optional[np.ndarray]] = [None] * len(texts)
+
+        # 1) This process
+        now = time.monotonic()
+        with self._lock:
+            for i, t in enumerate(texts):
+                out[i] = self._get_local((model, t), now)
+            self._hits += sum(v is not None for v in out)
+
+        # 2) Shared backend
+        missing: Dict[str, str] = {}
+        for t, q, v in zip(texts, queries, out):
+            if v is None:
+                missing.setdefault(t, q)
+        found: Dict[str, np.ndarray] = {}
+        if missing and self.shared is not None:
+            keys = list(missing)
+            found = {
+                t: v
+                for t, v in zip(keys, self.shared.get_many(_shared_model(model), None, keys))
+                if v is not None
+            }
+            missing = {t: q for t, q in missing.items() if t not in found}
+        # 3) The rest goes to the embeddings API (a query repeated within one
+        #    call is embedded once, as first written)
+        return texts, out, missing, found
+
+    def _fetched(self, model: str, missing: List[str], fresh: np.ndarray) -> Dict[str, np.ndarray]:
+        if self.shared is not None:
+            self.shared.put_many(_shared_model(model), None, missing, fresh)
+        return dict(zip(missing, fresh))
+
+    def _fill(
+        self,
+        model: str,
+        texts: List[str],
+        out: List[Optional[np.ndarray]],
+        fetched: Set[str],
+        found: Dict[str, np.ndarray],
+    ) -> np.ndarray:
+        now = time.monotonic()
+        with self._lock:
+            for i, t in enumerate(texts):
+                if out[i] is None:
+                    out[i] = found[t]
+                    self._put_local((model, t), out[i], now)
+                    if t in fetched:
+                        self._misses += 1
+                    else:
+                        self._shared_hits += 1
+
+        return (
+            np.vstack(out).astype("float32", copy=False)
+            if out
+            else np.zeros((0, 0), dtype="float32")
+        )
+
+    def embed(self, oai, *, model: str, query: str) -> np.ndarray:
+        return self.embed_many(oai, model=model, queries=[query])[0]
+
+    def stats(self) -> QueryCacheStats:
+        with self._lock:
+            return QueryCacheStats(
+                hits=self._hits,
+                shared_hits=self._shared_hits,
+                misses=self._misses,
+                entries=len(self._entries),
+            )
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+def open_query_cache(
+    max_entries: int, ttl_seconds: float, shared: Optional[EmbeddingCache] = None
+) -> Optional[QueryEmbeddingCache]:
+    """Returns None when the query cache is disabled (max_entries <= 0)."""
+    if max_entries <= 0:
+        return None
+    return QueryEmbeddingCache(max_entries=max_entries, ttl_seconds=ttl_seconds, shared=shared)
@@ -0,0 +1,691 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Set, Tuple
+
+import numpy as np
+
+from hr_rag_assistant.embeddings.query_cache import normalize_query
+
+
+@dataclass(frozen=True)
+class AnswerCacheStats:
+    hits: int
+    misses: int
+    entries: int
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+
+@dataclass(frozen=True)
+class CachedAnswer:
+    question: str  # the question the answer was generated for
+    answer: str
+    sources: List[str]
+    model: str
+    used_context_chars: int
+    similarity: float  # cosine between the two questions (1.0 = same text)
+    chunk_overlap: float
+
+
+@dataclass
+class _Scope:
+    """Entries of one (scope, index version), held in memory for matching."""
+
+    row_ids: List[int]
+    questions: List[str]
+    chunk_ids: List[Set[str]]
+    vectors: Optional[np.ndarray]  # (n, dim), normalized; None while empty
+
+
+def _normalized(vector: np.ndarray) -> np.ndarray:
+    v = np.asarray(vector, dtype="float32").ravel()
+    norm = float(np.linalg.norm(v))
+    return v / norm if norm > 0 else v
+
+
+def _append(
+    entries: _Scope, row_id: int, normalized: str, vec: Optional[np.ndarray], chunk_ids: List[str]
+) -> None:
+    entries.row_ids.append(row_id)
+    entries.questions.append(normalized)
+    entries.chunk_ids.append(set(chunk_ids))
+    if vec is None:
+        vec = (
+            np.zeros(entries.vectors.shape[1], dtype="float32")
+            if entries.vectors is not None
+            else None
+        )
+    if vec is not None:
+        if entries.vectors is None:
+            # Rows stored so far had no vector
+            entries.vectors = np.zeros((len(entries.row_ids) - 1, len(vec)), "float32")
+        entries.vectors = np.vstack([entries.vectors, vec[None, :]])
+
+
+def _connect(path: Path) -> sqlite3.Connection:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(str(path), timeout=30.0, check_same_thread=False)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return conn
+
+
+def _evict(
+    conn: sqlite3.Connection, table: str, key: str, max_entries: int, ttl_seconds: float
+) -> None:
+    """
+    Expired rows first, then least recently used down to 90% of the cap,
+    whatever their index version: rows of versions no worker serves anymore
+    stop being used and go first.
+    """
+    if ttl_seconds > 0:
+        conn.execute(f"DELETE FROM {table} WHERE created < ?", (time.time() - ttl_seconds,))
+    count = int(conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0])
+    excess = count - int(max_entries * 0.9)
+    if excess > 0:
+        conn.execute(
+            f"DELETE FROM {table} WHERE {key} IN "
+            f"(SELECT {key} FROM {table} ORDER BY last_used ASC LIMIT ?)",
+            (excess,),
+        )
+    conn.commit()
+
+
+def chunk_overlap(a: Set[str], b: Set[str]) -> float:
+    """Jaccard overlap of two sets of retrieved chunk ids."""
+    if not a and not b:
+        return 1.0
+    return len(a & b) / len(a | b)
+
+
+class SemanticAnswerCache:
+    """
+    Persistent cache of generated answers, matched by question embedding.
+
+    A stored answer is reused for a new question when
+    - both were answered in the same `scope` (chat model, temperature and
+      context budget, see HRAnswerer) against the same index version,
+    - the questions' embeddings have cosine >= `threshold` (questions
+      without an embedding, e.g. keyword queries, must match exactly after
+      normalize_query), and
+    - the retrieved chunk ids overlap by at least `min_chunk_overlap`
+      (Jaccard), so a paraphrase that lands on different evidence (another
+      filter, another document) is answered afresh.
+
+    Lookups only see entries of the index version asked for. Entries of
+    other versions are not deleted when a new version appears (a worker
+    still on an older lease, or one started after a rollback, shares the
+    file); like all entries they expire after `ttl_seconds` (0 = never) or
+    are evicted once more than `max_entries` are stored (least recently used
+    first). Backed by SQLite in WAL mode, so the cache is shared by all
+    worker processes; each process keeps the vectors of its scope in memory,
+    appends rows other processes have inserted since (ids only grow) and
+    reloads only after rows were deleted. Writes to other tables of the same
+    file (exact cache, preset answers) or hit counters cost no reload.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        *,
+        threshold: float = 0.95,
+        min_chunk_overlap: float = 0.5,
+        max_entries: int = 5000,
+        ttl_seconds: float = 7 * 24 * 3600,
+    ):
+        if max_entries <= 0:
+            raise ValueError("max_entries must be > 0")
+        if not 0.0 < threshold <= 1.0:
+            raise ValueError("threshold must be in (0, 1]")
+
+        self.path = Path(path)
+        self.threshold = threshold
+        self.min_chunk_overlap = min_chunk_overlap
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+
+        self._lock = threading.Lock()
+        self._conn = _connect(self.path)
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS answers (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                scope TEXT NOT NULL,
+                index_version TEXT NOT NULL,
+                question TEXT NOT NULL,
+                normalized TEXT NOT NULL,
+                vector BLOB,
+                chunk_ids TEXT NOT NULL,
+                answer TEXT NOT NULL,
+                sources TEXT NOT NULL,
+                model TEXT NOT NULL,
+                used_context_chars INTEGER NOT NULL,
+                created REAL NOT NULL,
+                last_used REAL NOT NULL,
+                hits INTEGER NOT NULL DEFAULT 0
+            )
+            """
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_answers_scope ON answers(scope, index_version)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_answers_last_used ON answers(last_used)")
+        # Rows deleted from `answers` by any process (eviction, expiry, clear):
+        # in-memory scopes only have to be reloaded when this changes.
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS answers_deletes (
+                id INTEGER PRIMARY KEY,
+                n INTEGER NOT NULL
+            )
+            """
+        )
+        self._conn.execute("INSERT OR IGNORE INTO answers_deletes (id, n) VALUES (0, 0)")
+        self._conn.execute(
+            """
+            CREATE TRIGGER IF NOT EXISTS answers_count_deletes AFTER DELETE ON answers
+            BEGIN
+                UPDATE answers_deletes SET n = n + 1 WHERE id = 0;
+            END
+            """
+        )
+        self._conn.commit()
+
+        self._scopes: Dict[Tuple[str, str], _Scope] = {}
+        self._max_id, self._deletes = self._changes()
+        self._hits = 0
+        self._misses = 0
+
+    def _changes(self) -> Tuple[int, int]:
+        """(highest row id, rows deleted so far) of the `answers` table."""
+        row = self._conn.execute(
+            "SELECT (SELECT COALESCE(MAX(id), 0) FROM answers), "
+            "(SELECT n FROM answers_deletes WHERE id = 0)"
+        ).fetchone()
+        return int(row[0]), int(row[1])
+
+    def _sync(self) -> None:
+        """
+        Brings the in-memory scopes up to date with the file (caller holds the
+        lock): rows inserted since the last sync are appended, any delete
+        drops the scopes so they are reloaded on demand.
+        """
+        max_id, deletes = self._changes()
+        if deletes != self._deletes:
+            self._scopes.clear()
+        elif max_id > self._max_id and self._scopes:
+            rows = self._conn.execute(
+                "SELECT id, scope, index_version, normalized, vector, chunk_ids FROM answers "
+                "WHERE id > ? ORDER BY id",
+                (self._max_id,),
+            ).fetchall()
+            for row_id, scope, index_version, normalized, vector, chunk_ids in rows:
+                entries = self._scopes.get((scope, index_version))
+                if entries is not None:
+                    vec = np.frombuffer(vector, dtype="float32") if vector else None
+                    _append(entries, row_id, normalized, vec, json.loads(chunk_ids))
+        self._max_id, self._deletes = max_id, deletes
+
+    def _scope(self, scope: str, index_version: str) -> _Scope:
+        """In-memory entries of a scope (caller holds the lock)."""
+        self._sync()
+
+        key = (scope, index_version)
+        cached = self._scopes.get(key)
+        if cached is not None:
+            return cached
+
+        # Only the index version being served is held in memory
+        self._scopes = {k: v for k, v in self._scopes.items() if k[1] == index_version}
+        min_created = time.time() - self.ttl_seconds if self.ttl_seconds > 0 else 0.0
+        rows = self._conn.execute(
+            """
+            SELECT id, normalized, vector, chunk_ids FROM answers
+            WHERE scope = ? AND index_version = ? AND created >= ?
+            """,
+            (scope, index_version, min_created),
+        ).fetchall()
+        dim = next((len(r[2]) // 4 for r in rows if r[2]), 0)
+        # Rows without a vector get a zero row: they only match by exact text.
+        vectors = (
+            np.vstack(
+                [
+                    np.frombuffer(r[2], dtype="float32") if r[2] else np.zeros(dim, "float32")
+                    for r in rows
+                ]
+            )
+            if dim
+            else None
+        )
+        loaded = _Scope(
+            row_ids=[r[0] for r in rows],
+            questions=[r[1] for r in rows],
+            chunk_ids=[set(json.loads(r[3])) for r in rows],
+            vectors=vectors,
+        )
+        self._scopes[key] = loaded
+        return loaded
+
+    def lookup(
+        self,
+        *,
+        scope: str,
+        index_version: str,
+        question: str,
+        vector: Optional[np.ndarray],
+        chunk_ids: Sequence[str],
+    ) -> Optional[CachedAnswer]:
+        normalized = normalize_query(question)
+        retrieved = set(chunk_ids)
+
+        with self._lock:
+            entries = self._scope(scope, index_version)
+
+            # 1) Candidates by similarity, best first
+            if vector is not None and entries.vectors is not None:
+                q = _normalized(vector)
+                if q.shape[0] != entries.vectors.shape[1]:
+                    sims = np.zeros(len(entries.row_ids), dtype="float32")
+                else:
+                    sims = entries.vectors @ q
+            else:
+                sims = np.zeros(len(entries.row_ids), dtype="float32")
+            for i, text in enumerate(entries.questions):
+                if text == normalized:
+                    sims[i] = 1.0
+
+            # 2) First candidate above the threshold whose evidence overlaps
+            best: Optional[Tuple[int, float, float]] = None
+            for i in np.argsort(-sims, kind="stable"):
+                if sims[i] < self.threshold:
+                    break
+                overlap = chunk_overlap(entries.chunk_ids[i], retrieved)
+                if overlap >= self.min_chunk_overlap:
+                    best = (entries.row_ids[i], float(min(sims[i], 1.0)), overlap)
+                    break
+
+            if best is None:
+                self._misses += 1
+                return None
+
+            row_id, similarity, overlap = best
+            row = self._conn.execute(
+                "SELECT question, answer, sources, model, used_context_chars FROM answers "
+                "WHERE id = ?",
+                (row_id,),
+            ).fetchone()
+            if row is None:  # evicted by another process
+                self._misses += 1
+                return None
+            self._conn.execute(
+                "UPDATE answers SET last_used = ?, hits = hits + 1 WHERE id = ?",
+                (time.time(), row_id),
+            )
+            self._conn.commit()
+            self._hits += 1
+
+        return CachedAnswer(
+            question=row[0],
+            answer=row[1],
+            sources=json.loads(row[2]),
+            model=row[3],
+            used_context_chars=int(row[4]),
+            similarity=similarity,
+            chunk_overlap=overlap,
+        )
+
+    def put(
+        self,
+        *,
+        scope: str,
+        index_version: str,
+        question: str,
+        vector: Optional[np.ndarray],
+        chunk_ids: Sequence[str],
+        answer: str,
+        sources: Sequence[str],
+        model: str,
+        used_context_chars: int,
+    ) -> None:
+        normalized = normalize_query(question)
+        vec = _normalized(vector) if vector is not None else None
+        now = time.time()
+
+        with self._lock:
+            entries = self._scope(scope, index_version)
+            self._conn.execute(
+                """
+                INSERT INTO answers (scope, index_version, question, normalized, vector,
+                    chunk_ids, answer, sources, model, used_context_chars, created, last_used)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                """,
+                (
+                    scope,
+                    index_version,
+                    question,
+                    normalized,
+                    vec.tobytes() if vec is not None else None,
+                    json.dumps(list(chunk_ids)),
+                    answer,
+                    json.dumps(list(sources)),
+                    model,
+                    used_context_chars,
+                    now,
+                    now,
+                ),
+            )
+            self._conn.commit()
+            # Picks up the new row (and any other process inserted meanwhile)
+            self._sync()
+
+            if len(entries.row_ids) > self.max_entries or self._count() > self.max_entries:
+                self._evict()
+
+    def _count(self) -> int:
+        return int(self._conn.execute("SELECT COUNT(*) FROM answers").fetchone()[0])
+
+    def _evict(self) -> None:
+        _evict(self._conn, "answers", "id", self.max_entries, self.ttl_seconds)
+        self._scopes.clear()
+        self._max_id, self._deletes = self._changes()
+
+    def stats(self) -> AnswerCacheStats:
+        with self._lock:
+            return AnswerCacheStats(hits=self._hits, misses=self._misses, entries=self._count())
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM answers")
+            self._conn.commit()
+            self._scopes.clear()
+            self._max_id, self._deletes = self._changes()
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+class ExactAnswerCache:
+    """
+    Persistent cache of generated answers for identical requests: the key is
+    the `scope` (chat model, temperature, context budget, prompt hash; see
+    answer_scope), the normalized question and the retrieved chunk ids in
+    order, so a hit is the answer the model gave to exactly this prompt.
+    One indexed lookup, no embedding needed.
+
+    Like SemanticAnswerCache: lookups only see the index version asked for,
+    other versions are left to the eviction, entries expire after
+    `ttl_seconds` (0 = never), at most `max_entries` are kept (least recently
+    used go first), and the SQLite file (WAL) is shared by all worker
+    processes. It may be the same file as the semantic cache (separate table).
+    """
+
+    def __init__(self, path: str, *, max_entries: int = 20000, ttl_seconds: float = 7 * 24 * 3600):
+        if max_entries <= 0:
+            raise ValueError("max_entries must be > 0")
+        self.path = Path(path)
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+
+        self._lock = threading.Lock()
+        self._conn = _connect(self.path)
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS exact_answers (
+                key TEXT PRIMARY KEY,
+                index_version TEXT NOT NULL,
+                question TEXT NOT NULL,
+                answer TEXT NOT NULL,
+                sources TEXT NOT NULL,
+                model TEXT NOT NULL,
+                used_context_chars INTEGER NOT NULL,
+                created REAL NOT NULL,
+                last_used REAL NOT NULL,
+                hits INTEGER NOT NULL DEFAULT 0
+            )
+            """
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_exact_last_used ON exact_answers(last_used)"
+        )
+        self._conn.commit()
+
+        self._hits = 0
+        self._misses = 0
+
+    @staticmethod
+    def key(*, scope: str, question: str, chunk_ids: Sequence[str]) -> str:
+        payload = json.dumps([scope, normalize_query(question), list(chunk_ids)])
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def lookup(
+        self, *, scope: str, index_version: str, question: str, chunk_ids: Sequence[str]
+    ) -> Optional[CachedAnswer]:
+        key = self.key(scope=scope, question=question, chunk_ids=chunk_ids)
+        min_created = time.time() - self.ttl_seconds if self.ttl_seconds > 0 else 0.0
+
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT question, answer, sources, model, used_context_chars FROM exact_answers "
+                "WHERE key = ? AND index_version = ? AND created >= ?",
+                (key, index_version, min_created),
+            ).fetchone()
+            if row is None:
+                self._misses += 1
+                return None
+            self._conn.execute(
+                "UPDATE exact_answers SET last_used = ?, hits = hits + 1 WHERE key = ?",
+                (time.time(), key),
+            )
+            self._conn.commit()
+            self._hits += 1
+
+        return CachedAnswer(
+            question=row[0],
+            answer=row[1],
+            sources=json.loads(row[2]),
+            model=row[3],
+            used_context_chars=int(row[4]),
+            similarity=1.0,
+            chunk_overlap=1.0,
+        )
+
+    def put(
+        self,
+        *,
+        scope: str,
+        index_version: str,
+        question: str,
+        chunk_ids: Sequence[str],
+        answer: str,
+        sources: Sequence[str],
+        model: str,
+        used_context_chars: int,
+    ) -> None:
+        key = self.key(scope=scope, question=question, chunk_ids=chunk_ids)
+        now = time.time()
+
+        with self._lock:
+            self._conn.execute(
+                """
+                INSERT OR REPLACE INTO exact_answers (key, index_version, question, answer,
+                    sources, model, used_context_chars, created, last_used)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                """,
+                (
+                    key,
+                    index_version,
+                    question,
+                    answer,
+                    json.dumps(list(sources)),
+                    model,
+                    used_context_chars,
+                    now,
+                    now,
+                ),
+            )
+            self._conn.commit()
+            if self._count() > self.max_entries:
+                self._evict()
+
+    def _count(self) -> int:
+        return int(self._conn.execute("SELECT COUNT(*) FROM exact_answers").fetchone()[0])
+
+    def _evict(self) -> None:
+        _evict(self._conn, "exact_answers", "key", self.max_entries, self.ttl_seconds)
+
+    def stats(self) -> AnswerCacheStats:
+        with self._lock:
+            return AnswerCacheStats(hits=self._hits, misses=self._misses, entries=self._count())
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM exact_answers")
+            self._conn.commit()
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+class PresetAnswerStore:
+    """
+    Precomputed answers of the preset questions (see generation.presets),
+    stored per `scope` (see preset_scope) and index version,
+    so the app serves them with one indexed SQLite read: no embedding,
+    search or chat call. Answers of a version are replaced as a whole by
+    `replace_version`; lookups only ever see the version asked for.
+    """
+
+    def __init__(self, path: str):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self._conn = _connect(self.path)
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS preset_answers (
+                scope TEXT NOT NULL,
+                index_version TEXT NOT NULL,
+                normalized TEXT NOT NULL,
+                question TEXT NOT NULL,
+                answer TEXT NOT NULL,
+                sources TEXT NOT NULL,
+                model TEXT NOT NULL,
+                used_context_chars INTEGER NOT NULL,
+                created REAL NOT NULL,
+                PRIMARY KEY (scope, index_version, normalized)
+            )
+            """
+        )
+        self._conn.commit()
+
+    def get(self, *, scope: str, index_version: str, question: str) -> Optional[CachedAnswer]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT question, answer, sources, model, used_context_chars FROM preset_answers "
+                "WHERE scope = ? AND index_version = ? AND normalized = ?",
+                (scope, index_version, normalize_query(question)),
+            ).fetchone()
+        if row is None:
+            return None
+        return CachedAnswer(
+            question=row[0],
+            answer=row[1],
+            sources=json.loads(row[2]),
+            model=row[3],
+            used_context_chars=int(row[4]),
+            similarity=1.0,
+            chunk_overlap=1.0,
+        )
+
+    def count(self, *, scope: str, index_version: str) -> int:
+        with self._lock:
+            return int(
+                self._conn.execute(
+                    "SELECT COUNT(*) FROM preset_answers WHERE scope = ? AND index_version = ?",
+                    (scope, index_version),
+                ).fetchone()[0]
+            )
+
+    def replace_version(
+        self, *, scope: str, index_version: str, answers: Sequence[CachedAnswer]
+    ) -> None:
+        """Stores the answers of `index_version` and drops this scope's older versions."""
+        now = time.time()
+        with self._lock:
+            with self._conn:  # one transaction: readers see all answers or the old set
+                self._conn.execute("DELETE FROM preset_answers WHERE scope = ?", (scope,))
+                self._conn.executemany(
+                    """
+                    INSERT OR REPLACE INTO preset_answers (scope, index_version, normalized,
+                        question, answer, sources, model, used_context_chars, created)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                    """,
+                    [
+                        (
+                            scope,
+                            index_version,
+                            normalize_query(a.question),
+                            a.question,
+                            a.answer,
+                            json.dumps(list(a.sources)),
+                            a.model,
+                            a.used_context_chars,
+                            now,
+                        )
+                        for a in answers
+                    ],
+                )
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+def open_preset_store(path: str) -> Optional[PresetAnswerStore]:
+    """Returns None when precomputed preset answers are disabled (empty path)."""
+    if not path.strip():
+        return None
+    return PresetAnswerStore(os.path.expanduser(path))
+
+
+def open_exact_answer_cache(
+    path: str, *, max_entries: int, ttl_seconds: float
+) -> Optional[ExactAnswerCache]:
+    """Returns None when the exact answer cache is disabled (empty path)."""
+    if not path.strip():
+        return None
+    return ExactAnswerCache(
+        os.path.expanduser(path), max_entries=max_entries, ttl_seconds=ttl_seconds
+    )
+
+
+def open_answer_cache(
+    path: str,
+    *,
+    threshold: float,
+    min_chunk_overlap: float,
+    max_entries: int,
+    ttl_seconds: float,
+) -> Optional[SemanticAnswerCache]:
+    """Returns None when the answer cache is disabled (empty path)."""
+    if not path.strip():
+        return None
+    return SemanticAnswerCache(
+        os.path.expanduser(path),
+        threshold=threshold,
+        min_chunk_overlap=min_chunk_overlap,
+        max_entries=max_entries,
+        ttl_seconds=ttl_seconds,
+    )
@@ -1,13 +1,29 @@
 from __future__ import annotations
 
-from dataclasses import dataclass
-from typing import List
+import hashlib
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, Generator, Iterator, List, Optional, Tuple
 
-from openai import OpenAI
+import numpy as np
+from openai import AsyncOpenAI, OpenAI
 
+from hr_rag_assistant.clients import shared_async_openai
+from hr_rag_assistant.generation.answer_cache import ExactAnswerCache, SemanticAnswerCache
+from hr_rag_assistant.generation.citations import unique_sources
+from hr_rag_assistant.generation.compression import compress_hits
+from hr_rag_assistant.generation.packing import (
+    PackedContext,
+    TokenCounter,
+    context_header,
+    pack_context,
+)
+from hr_rag_assistant.logging import get_logger
 from hr_rag_assistant.retrieval.prompts import HR_SYSTEM_PROMPT, HR_USER_PROMPT_TEMPLATE
 from hr_rag_assistant.retrieval.vectorstore import RetrievedChunk
 
+logger = get_logger(__name__)
+
 
 @dataclass(frozen=True)
 class AnswerResult:
@@ -15,6 +31,38 @@ class AnswerResult:
     answer: str
     used_context_chars: int
     model: str
+    sources: List[str] = field(default_factory=list)
+    # Question whose cached answer was reused (None = generated for this question)
+    # and the cache it came from: "exact" or "semantic"
+    cached_from: Optional[str] = None
+    cache_hit: Optional[str] = None
+    # Token usage as reported by the API, and generation latency: seconds from
+    # the request to the first answer token (streaming only) and to the end.
+    # All None for cached answers.
+    prompt_tokens: Optional[int] = None
+    completion_tokens: Optional[int] = None
+    ttft_seconds: Optional[float] = None
+    generation_seconds: Optional[float] = None
+    # Context packing (see PackedContext); None for cached answers
+    context_tokens: Optional[int] = None
+    chunks_used: Optional[int] = None
+    chunks_truncated: Optional[int] = None
+    chunks_dropped: Optional[int] = None
+
+
+class AnswerStream:
+    """
+    Answer text deltas in the order the model produces them; iterate once
+    (e.g. `st.write_stream(stream)`). `result` holds the final AnswerResult,
+    with usage and timings, after the iteration finished.
+    """
+
+    def __init__(self, deltas: Generator[str, None, "AnswerResult"]):
+        self._deltas = deltas
+        self.result: Optional[AnswerResult] = None
+
+    def __iter__(self) -> Iterator[str]:
+        self.result = yield from self._deltas
 
 
 def build_context(hits: List[RetrievedChunk], max_context_chars: int = 6000) -> str:
@@ -23,13 +71,18 @@ def build_context(hits: List[RetrievedChunk], max_context_chars: int = 6000) ->
     We include source + chunk id headers so the model can reference them,
     and to keep human debugging easy.
     """
+    return _pack_chars(hits, max_context_chars)[0]
+
+
+def _pack_chars(hits: List[RetrievedChunk], max_context_chars: int) -> Tuple[str, int, int]:
+    """build_context plus the number of hits included and truncated."""
     parts: List[str] = []
     used = 0
+    truncated = 0
 
     for hit in hits:
-        c = hit.chunk
-        header = f"[SOURCE: {c.source} | CHUNK: chunk_{c.chunk_index:04d} | SCORE: {hit.score:.4f}]"
-        body = c.text.strip()
+        header = context_header(hit)
+        body = hit.chunk.text.strip()
 
         block = header + "\n" + body + "\n"
         if used + len(block) > max_context_chars:
@@ -38,18 +91,69 @@ def build_context(hits: List[RetrievedChunk], max_context_chars: int = 6000) ->
             if remaining > len(header) + 20:
                 parts.append((header + "\n" + body)[:remaining] + "\n")
                 used = max_context_chars
+                truncated = 1
             break
 
         parts.append(block)
         used += len(block)
 
-    return "".join(parts)
+    return "".join(parts), len(parts), truncated
+
+
+def answer_scope(
+    *,
+    chat_model: str,
+    temperature: float,
+    max_context_chars: int,
+    max_context_tokens: Optional[int] = None,
+    compression_neighbors: Optional[int] = None,
+) -> str:
+    """
+    Everything besides question and evidence that shapes an answer; cached
+    answers are only reused within the same scope (a prompt edit starts a new one).
+    """
+    prompt_hash = hashlib.sha256(
+        (HR_SYSTEM_PROMPT + "\0" + HR_USER_PROMPT_TEMPLATE).encode("utf-8")
+    ).hexdigest()[:12]
+    ctx = f"{max_context_tokens}tok" if max_context_tokens is not None else max_context_chars
+    if compression_neighbors is not None:
+        ctx = f"{ctx}|compress={compression_neighbors}"
+    return f"{chat_model}|t={temperature:g}|ctx={ctx}|prompt={prompt_hash}"
+
+
+def build_messages(question: str, context: str) -> List[Dict[str, str]]:
+    user_prompt = HR_USER_PROMPT_TEMPLATE.format(question=question, context=context)
+    return [
+        {"role": "system", "content": HR_SYSTEM_PROMPT},
+        {"role": "user", "content": user_prompt},
+    ]
 
 
 class HRAnswerer:
-    def __init__(self, *, openai_api_key: str, chat_model: str):
+    def __init__(
+        self,
+        *,
+        openai_api_key: str,
+        chat_model: str,
+        answer_cache: Optional[SemanticAnswerCache] = None,
+        async_client: Optional[AsyncOpenAI] = None,
+        compression_neighbors: Optional[int] = None,
+        exact_cache: Optional[ExactAnswerCache] = None,
+    ):
         self.oai = OpenAI(api_key=openai_api_key)
+        self.openai_api_key = openai_api_key
         self.chat_model = chat_model
+        # Reuses answers of near-duplicate questions (see SemanticAnswerCache).
+        self.answer_cache = answer_cache
+        # Replays answers of identical requests at temperature 0, checked first.
+        self.exact_cache = exact_cache
+        # Used by `aanswer`; default: the event loop's shared client (see clients.py).
+        self.async_client = async_client
+        # Sizes token-budgeted contexts; calibrated by the reported prompt tokens.
+        self.token_counter = TokenCounter(chat_model)
+        # Keep only question-relevant sentences (+ this many neighbours) of each
+        # hit before packing (see compress_hits); None = send chunks whole.
+        self.compression_neighbors = compression_neighbors
 
     def answer(
         self,
@@ -57,30 +161,351 @@ class HRAnswerer:
         question: str,
         hits: List[RetrievedChunk],
         max_context_chars: int = 6000,
+        max_context_tokens: Optional[int] = None,
         temperature: float = 0.0,
+        query_vector: Optional[np.ndarray] = None,
+        index_version: Optional[str] = None,
     ) -> AnswerResult:
+        """
+        The context holds the retrieved hits that fit `max_context_tokens`
+        (see pack_context), or `max_context_chars` when no token budget is
+        given. `query_vector` and `index_version` (RetrievalResult.query_vector /
+        .index_version) enable the answer caches; answers from unversioned
+        indexes are never cached, and only temperature-0 answers are replayed
+        by the exact cache.
+        """
         question = question.strip()
         if not question:
             raise ValueError("Question is empty.")
 
-        context = build_context(hits, max_context_chars=max_context_chars)
-
-        user_prompt = HR_USER_PROMPT_TEMPLATE.format(question=question, context=context)
+        scope = self.scope(
+            temperature=temperature,
+            max_context_chars=max_context_chars,
+            max_context_tokens=max_context_tokens,
+        )
+        cached = self._cached(
+            question, hits, scope, query_vector, index_version, exact=temperature == 0.0
+        )
+        if cached is not None:
+            return cached
 
+        packed = self.pack(question, hits, max_context_chars, max_context_tokens)
+        t0 = time.perf_counter()
         resp = self.oai.chat.completions.create(
             model=self.chat_model,
             temperature=temperature,
-            messages=[
-                {"role": "system", "content": HR_SYSTEM_PROMPT},
-                {"role": "user", "content": user_prompt},
-            ],
+            messages=build_messages(question, packed.text),
+        )
+        text = (resp.choices[0].message.content or "").strip()
+        return self._result(
+            question,
+            text,
+            packed,
+            hits,
+            scope,
+            query_vector,
+            index_version,
+            exact=temperature == 0.0,
+            usage=getattr(resp, "usage", None),
+            generation_seconds=time.perf_counter() - t0,
+        )
+
+    def stream_answer(
+        self,
+        *,
+        question: str,
+        hits: List[RetrievedChunk],
+        max_context_chars: int = 6000,
+        max_context_tokens: Optional[int] = None,
+        temperature: float = 0.0,
+        query_vector: Optional[np.ndarray] = None,
+        index_version: Optional[str] = None,
+    ) -> AnswerStream:
+        """
+        `answer` as a stream of text deltas (stream=True), so the first words
+        can be shown while the rest is generated. A cached answer arrives as
+        one delta. Arguments are as for `answer`.
+        """
+        question = question.strip()
+        if not question:
+            raise ValueError("Question is empty.")
+        return AnswerStream(
+            self._stream(
+                question,
+                hits,
+                max_context_chars,
+                max_context_tokens,
+                temperature,
+                query_vector,
+                index_version,
+            )
+        )
+
+    def _stream(
+        self,
+        question: str,
+        hits: List[RetrievedChunk],
+        max_context_chars: int,
+        max_context_tokens: Optional[int],
+        temperature: float,
+        query_vector: Optional[np.ndarray],
+        index_version: Optional[str],
+    ) -> Generator[str, None, AnswerResult]:
+        scope = self.scope(
+            temperature=temperature,
+            max_context_chars=max_context_chars,
+            max_context_tokens=max_context_tokens,
+        )
+        cached = self._cached(
+            question, hits, scope, query_vector, index_version, exact=temperature == 0.0
+        )
+        if cached is not None:
+            yield cached.answer
+            return cached
+
+        packed = self.pack(question, hits, max_context_chars, max_context_tokens)
+        t0 = time.perf_counter()
+        ttft: Optional[float] = None
+        usage = None
+        parts: List[str] = []
+        events = self.oai.chat.completions.create(
+            model=self.chat_model,
+            temperature=temperature,
+            messages=build_messages(question, packed.text),
+            stream=True,
+            # One last event with the token usage of the whole answer
+            stream_options={"include_usage": True},
         )
+        for event in events:
+            if event.usage is not None:
+                usage = event.usage
+            if not event.choices:
+                continue
+            delta = event.choices[0].delta.content
+            if not parts:
+                # Leading whitespace is dropped, as in `answer`
+                delta = (delta or "").lstrip()
+            if not delta:
+                continue
+            if ttft is None:
+                ttft = time.perf_counter() - t0
+            parts.append(delta)
+            yield delta
 
+        return self._result(
+            question,
+            "".join(parts).strip(),
+            packed,
+            hits,
+            scope,
+            query_vector,
+            index_version,
+            exact=temperature == 0.0,
+            usage=usage,
+            ttft_seconds=ttft,
+            generation_seconds=time.perf_counter() - t0,
+        )
+
+    async def aanswer(
+        self,
+        *,
+        question: str,
+        hits: List[RetrievedChunk],
+        max_context_chars: int = 6000,
+        max_context_tokens: Optional[int] = None,
+        temperature: float = 0.0,
+        query_vector: Optional[np.ndarray] = None,
+        index_version: Optional[str] = None,
+    ) -> AnswerResult:
+        """`answer` with the chat completion awaited on the async client."""
+        question = question.strip()
+        if not question:
+            raise ValueError("Question is empty.")
+
+        scope = self.scope(
+            temperature=temperature,
+            max_context_chars=max_context_chars,
+            max_context_tokens=max_context_tokens,
+        )
+        cached = self._cached(
+            question, hits, scope, query_vector, index_version, exact=temperature == 0.0
+        )
+        if cached is not None:
+            return cached
+
+        packed = self.pack(question, hits, max_context_chars, max_context_tokens)
+        aoai = self.async_client or shared_async_openai(self.openai_api_key)
+        t0 = time.perf_counter()
+        resp = await aoai.chat.completions.create(
+            model=self.chat_model,
+            temperature=temperature,
+            messages=build_messages(question, packed.text),
+        )
         text = (resp.choices[0].message.content or "").strip()
+        return self._result(
+            question,
+            text,
+            packed,
+            hits,
+            scope,
+            query_vector,
+            index_version,
+            exact=temperature == 0.0,
+            usage=getattr(resp, "usage", None),
+            generation_seconds=time.perf_counter() - t0,
+        )
 
+    def scope(
+        self,
+        *,
+        temperature: float = 0.0,
+        max_context_chars: int = 6000,
+        max_context_tokens: Optional[int] = None,
+    ) -> str:
+        """answer_scope of this answerer's requests with these settings."""
+        return answer_scope(
+            chat_model=self.chat_model,
+            temperature=temperature,
+            max_context_chars=max_context_chars,
+            max_context_tokens=max_context_tokens,
+            compression_neighbors=self.compression_neighbors,
+        )
+
+    def pack(
+        self,
+        question: str,
+        hits: List[RetrievedChunk],
+        max_context_chars: int = 6000,
+        max_context_tokens: Optional[int] = None,
+    ) -> PackedContext:
+        """The context `answer` sends for these hits, with its packing stats."""
+        if self.compression_neighbors is not None:
+            hits = compress_hits(question, hits, neighbors=self.compression_neighbors)
+        if max_context_tokens is not None:
+            return pack_context(
+                hits, max_context_tokens=max_context_tokens, counter=self.token_counter
+            )
+        text, used, truncated = _pack_chars(hits, max_context_chars)
+        return PackedContext(
+            text=text,
+            tokens=self.token_counter.count(text),
+            chunks_used=used,
+            chunks_truncated=truncated,
+            chunks_dropped=len(hits) - used,
+        )
+
+    def _cached(
+        self,
+        question: str,
+        hits: List[RetrievedChunk],
+        scope: str,
+        query_vector: Optional[np.ndarray],
+        index_version: Optional[str],
+        *,
+        exact: bool,
+    ) -> Optional[AnswerResult]:
+        if index_version is None:
+            return None
+        chunk_ids = [h.chunk.id for h in hits]
+        if exact and self.exact_cache is not None:
+            cached = self.exact_cache.lookup(
+                scope=scope, index_version=index_version, question=question, chunk_ids=chunk_ids
+            )
+            if cached is not None:
+                logger.info("Exact answer cache hit: %r", question)
+                return AnswerResult(
+                    question=question,
+                    answer=cached.answer,
+                    used_context_chars=cached.used_context_chars,
+                    model=cached.model,
+                    sources=cached.sources,
+                    cached_from=cached.question,
+                    cache_hit="exact",
+                )
+        if self.answer_cache is None:
+            return None
+        cached = self.answer_cache.lookup(
+            scope=scope,
+            index_version=index_version,
+            question=question,
+            vector=query_vector,
+            chunk_ids=chunk_ids,
+        )
+        if cached is None:
+            return None
+        logger.info(
+            "Answer cache hit (similarity %.3f, chunk overlap %.2f): %r",
+            cached.similarity,
+            cached.chunk_overlap,
+            cached.question,
+        )
         return AnswerResult(
+            question=question,
+            answer=cached.answer,
+            used_context_chars=cached.used_context_chars,
+            model=cached.model,
+            sources=cached.sources,
+            cached_from=cached.question,
+            cache_hit="semantic",
+        )
+
+    def _result(
+        self,
+        question: str,
+        text: str,
+        packed: PackedContext,
+        hits: List[RetrievedChunk],
+        scope: str,
+        query_vector: Optional[np.ndarray],
+        index_version: Optional[str],
+        *,
+        exact: bool,
+        usage: Any = None,
+        ttft_seconds: Optional[float] = None,
+        generation_seconds: Optional[float] = None,
+    ) -> AnswerResult:
+        prompt_tokens = getattr(usage, "prompt_tokens", None)
+        if prompt_tokens is not None:
+            prompt_chars = sum(len(m["content"]) for m in build_messages(question, packed.text))
+            self.token_counter.calibrate(prompt_chars, prompt_tokens)
+        result = AnswerResult(
             question=question,
             answer=text,
-            used_context_chars=len(context),
+            used_context_chars=len(packed.text),
             model=self.chat_model,
-        )
\ No newline at end of file
+            sources=unique_sources(hits),
+            prompt_tokens=prompt_tokens,
+            completion_tokens=getattr(usage, "completion_tokens", None),
+            ttft_seconds=ttft_seconds,
+            generation_seconds=generation_seconds,
+            context_tokens=packed.tokens,
+            chunks_used=packed.chunks_used,
+            chunks_truncated=packed.chunks_truncated,
+            chunks_dropped=packed.chunks_dropped,
+        )
+        if index_version is None or not text:
+            return result
+        if exact and self.exact_cache is not None:
+            self.exact_cache.put(
+                scope=scope,
+                index_version=index_version,
+                question=question,
+                chunk_ids=[h.chunk.id for h in hits],
+                answer=text,
+                sources=result.sources,
+                model=result.model,
+                used_context_chars=result.used_context_chars,
+            )
+        if self.answer_cache is not None:
+            self.answer_cache.put(
+                scope=scope,
+                index_version=index_version,
+                question=question,
+                vector=query_vector,
+                chunk_ids=[h.chunk.id for h in hits],
+                answer=text,
+                sources=result.sources,
+                model=result.model,
+                used_context_chars=result.used_context_chars,
+            )
+        return result
@@ -2,7 +2,17 @@ from __future__ import annotations
 
 from typing import Iterable, List, Set, Tuple
 
+from hr_rag_assistant.retrieval.redundancy import MERGED_KEY
 from hr_rag_assistant.retrieval.vectorstore import RetrievedChunk
+from hr_rag_assistant.types import HRChunk
+
+
+def chunk_label(chunk: HRChunk) -> str:
+    """Citation label of a chunk: "chunk_0002", or "chunk_0002-0004" for a merged span."""
+    merged = chunk.metadata.get(MERGED_KEY)
+    if merged:
+        return f"chunk_{merged[0]:04d}-{merged[-1]:04d}"
+    return f"chunk_{chunk.chunk_index:04d}"
 
 
 def unique_sources(hits: Iterable[RetrievedChunk], max_sources: int = 10) -> List[str]:
@@ -10,16 +20,16 @@ def unique_sources(hits: Iterable[RetrievedChunk], max_sources: int = 10) -> Lis
     Return a de-duplicated list of sources like:
       remote_work_policy.md :: chunk_0002
     """
-    seen: Set[Tuple[str, int]] = set()
+    seen: Set[Tuple[str, str]] = set()
     out: List[str] = []
 
     for hit in hits:
         c = hit.chunk
-        key = (c.source, c.chunk_index)
+        key = (c.source, chunk_label(c))
         if key in seen:
             continue
         seen.add(key)
-        out.append(f"{c.source} :: chunk_{c.chunk_index:04d}")
+        out.append(f"{c.source} :: {key[1]}")
         if len(out) >= max_sources:
             break
 
@@ -27,7 +37,11 @@ def unique_sources(hits: Iterable[RetrievedChunk], max_sources: int = 10) -> Lis
 
 
 def format_sources_block(hits: Iterable[RetrievedChunk], max_sources: int = 10) -> str:
-    srcs = unique_sources(hits, max_sources=max_sources)
+    return format_source_list(unique_sources(hits, max_sources=max_sources))
+
+
+def format_source_list(srcs: List[str]) -> str:
+    """Sources block for a list from unique_sources (e.g. AnswerResult.sources)."""
     if not srcs:
         return "Sources:\n- (none)"
     return "Sources:\n" + "\n".join(f"- {s}" for s in srcs)
\ No newline at end of file
@@ -0,0 +1,98 @@
+from __future__ import annotations
+
+import math
+import re
+from collections import Counter
+from dataclasses import replace
+from typing import List, Sequence, Set, Tuple
+
+from hr_rag_assistant.retrieval.lexical import tokenize
+from hr_rag_assistant.retrieval.vectorstore import RetrievedChunk
+
+# Marks text left out between kept sentences of a chunk
+GAP = " [...] "
+
+# Sentences scoring at least this share of the chunk's best sentence are kept
+MIN_RELATIVE_SCORE = 0.5
+
+_SENTENCE_BOUNDARY = re.compile(r"(?<=[.!?])\s+|\n+")
+
+
+def sentence_spans(text: str) -> List[Tuple[int, int]]:
+    """(start, end) offsets of the sentences / lines of `text`."""
+    spans: List[Tuple[int, int]] = []
+    pos = 0
+    for m in _SENTENCE_BOUNDARY.finditer(text):
+        if text[pos : m.start()].strip():
+            spans.append((pos, m.start()))
+        pos = m.end()
+    if text[pos:].strip():
+        spans.append((pos, len(text)))
+    return spans
+
+
+def compress_hits(
+    question: str, hits: Sequence[RetrievedChunk], *, neighbors: int = 1
+) -> List[RetrievedChunk]:
+    """
+    Query-focused extractive compression: each hit keeps only the sentences
+    that share the most (IDF-weighted) question terms, plus `neighbors`
+    sentences on either side for context; skipped stretches become GAP.
+    Chunk ids, sources and scores are unchanged, so context headers and
+    citations still resolve. Hits without any question term are kept whole
+    (dense retrieval may have matched a paraphrase).
+    """
+    if neighbors < 0:
+        raise ValueError("neighbors must be >= 0")
+    query_terms = set(tokenize(question))
+    if not query_terms:
+        return list(hits)
+
+    # 1) Question terms of every sentence, and their rarity across all hits
+    spans = [sentence_spans(h.chunk.text) for h in hits]
+    terms: List[List[Set[str]]] = [
+        [set(tokenize(h.chunk.text[s:e])) & query_terms for s, e in hit_spans]
+        for h, hit_spans in zip(hits, spans)
+    ]
+    df = Counter(t for hit_terms in terms for sentence in hit_terms for t in sentence)
+    num_sentences = sum(len(hit_spans) for hit_spans in spans)
+    idf = {t: math.log(1.0 + num_sentences / n) for t, n in df.items()}
+
+    out: List[RetrievedChunk] = []
+    for hit, hit_spans, hit_terms in zip(hits, spans, terms):
+        scores = [sum(idf[t] for t in sentence) for sentence in hit_terms]
+        best = max(scores, default=0.0)
+        if best <= 0.0:
+            out.append(hit)
+            continue
+
+        # 2) Relevant sentences and their neighbours
+        keep = [False] * len(hit_spans)
+        for i, score in enumerate(scores):
+            if score >= MIN_RELATIVE_SCORE * best:
+                for j in range(max(0, i - neighbors), min(len(keep), i + neighbors + 1)):
+                    keep[j] = True
+        if all(keep):
+            out.append(hit)
+            continue
+
+        # 3) Contiguous kept sentences keep their original text
+        text = hit.chunk.text
+        parts: List[str] = []
+        i = 0
+        while i < len(keep):
+            if not keep[i]:
+                i += 1
+                continue
+            j = i
+            while j + 1 < len(keep) and keep[j + 1]:
+                j += 1
+            parts.append(text[hit_spans[i][0] : hit_spans[j][1]].strip())
+            i = j + 1
+        compressed = GAP.join(parts)
+        if not keep[0]:
+            compressed = GAP.lstrip() + compressed
+        if not keep[-1]:
+            compressed = compressed + GAP.rstrip()
+        out.append(replace(hit, chunk=replace(hit.chunk, text=compressed)))
+    return out
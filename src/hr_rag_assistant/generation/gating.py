@@ -0,0 +1,183 @@
+from __future__ import annotations
+
+from dataclasses import dataclass, field, replace
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from hr_rag_assistant.config import Settings
+from hr_rag_assistant.retrieval.retriever import RetrievalResult
+from hr_rag_assistant.retrieval.vectorstore import RetrievedChunk
+
+# Canned answer for questions the documents do not cover (as in HR_SYSTEM_PROMPT)
+REFUSAL = "I don't know based on the provided HR documents."
+
+# Dense candidates below top-1 that the margin is measured against
+MARGIN_DEPTH = 4
+
+
+@dataclass(frozen=True)
+class GateThresholds:
+    # Refuse when the best cosine similarity is below this
+    min_score: float = 0.25
+    # Below `confident_score`, also refuse when the best hit does not stand out:
+    # top-1 minus the mean of the next MARGIN_DEPTH similarities < min_margin
+    min_margin: float = 0.0
+    confident_score: float = 1.0
+    # Drop hits more than this below top-1 (adaptive top-k; None = keep all)
+    relative_cutoff: Optional[float] = None
+
+
+@dataclass(frozen=True)
+class GateDecision:
+    answer: bool
+    # Hits to send to the model (empty when refusing)
+    hits: List[RetrievedChunk] = field(default_factory=list)
+    reason: str = ""
+    top_score: Optional[float] = None
+    margin: Optional[float] = None
+
+
+def thresholds_from_settings(s: Settings) -> GateThresholds:
+    return GateThresholds(
+        min_score=s.gate_min_score,
+        min_margin=s.gate_min_margin,
+        confident_score=s.gate_confident_score,
+        relative_cutoff=s.gate_relative_cutoff,
+    )
+
+
+def gate_scope(thresholds: Optional[GateThresholds]) -> str:
+    """Key of a gate configuration, for stored answers that went through it."""
+    if thresholds is None:
+        return "off"
+    cutoff = "none" if thresholds.relative_cutoff is None else f"{thresholds.relative_cutoff:g}"
+    return (
+        f"{thresholds.min_score:g}/{thresholds.min_margin:g}"
+        f"/{thresholds.confident_score:g}/{cutoff}"
+    )
+
+
+def score_profile(retrieval: RetrievalResult) -> Tuple[Optional[float], Optional[float]]:
+    """(top-1 similarity, margin) of a retrieval; (None, None) without dense scores."""
+    ranked = sorted(retrieval.similarities.values(), reverse=True)
+    if not ranked:
+        return None, None
+    rest = ranked[1 : 1 + MARGIN_DEPTH]
+    margin = ranked[0] - (sum(rest) / len(rest)) if rest else ranked[0]
+    return ranked[0], margin
+
+
+def hit_similarity(hit: RetrievedChunk, retrieval: RetrievalResult) -> Optional[float]:
+    """Cosine similarity of a hit (best member of a merged span); None if only BM25 found it."""
+    sims = retrieval.similarities
+    scores = [sims[i] for i in hit.chunk.id.split("+") if i in sims]
+    return max(scores) if scores else None
+
+
+def gate_retrieval(retrieval: RetrievalResult, thresholds: GateThresholds) -> GateDecision:
+    """
+    Decides from the retrieval scores alone whether a chat completion is
+    worth it: no hits, a low best similarity, or (below `confident_score`)
+    a best hit that does not stand out from the rest mean the documents do
+    not cover the question, and REFUSAL is returned without calling the
+    model. Otherwise hits far below the best one are cut. Keyword (BM25)
+    retrievals carry no similarities and only need a hit.
+    """
+    if not retrieval.results:
+        return GateDecision(answer=False, reason="no hits")
+
+    top, margin = score_profile(retrieval)
+    if top is None:
+        return GateDecision(answer=True, hits=list(retrieval.results), reason="keyword match")
+    if top < thresholds.min_score:
+        return GateDecision(answer=False, reason="low similarity", top_score=top, margin=margin)
+    if top < thresholds.confident_score and margin < thresholds.min_margin:
+        return GateDecision(
+            answer=False, reason="no clear best match", top_score=top, margin=margin
+        )
+
+    hits = list(retrieval.results)
+    if thresholds.relative_cutoff is not None:
+        floor = top - thresholds.relative_cutoff
+        sims = [hit_similarity(h, retrieval) for h in hits]
+        # BM25-only hits (no similarity) are kept
+        hits = [h for h, sim in zip(hits, sims) if sim is None or sim >= floor] or hits[:1]
+    return GateDecision(answer=True, hits=hits, reason="ok", top_score=top, margin=margin)
+
+
+def gated(retrieval: RetrievalResult, decision: GateDecision) -> RetrievalResult:
+    """`retrieval` restricted to the hits the gate kept."""
+    return replace(retrieval, results=decision.hits)
+
+
+@dataclass(frozen=True)
+class CalibrationSample:
+    top_score: float
+    margin: float
+    answerable: bool
+    # For answerable questions with labelled sources: top-1 minus the
+    # similarity of the lowest-ranked relevant hit
+    relevant_drop: Optional[float] = None
+
+
+@dataclass(frozen=True)
+class CalibrationReport:
+    thresholds: GateThresholds
+    # Share of answerable questions still answered / unanswerable ones refused
+    recall: float
+    refusal_rate: float
+
+
+def calibrate_thresholds(
+    samples: Sequence[CalibrationSample], *, target_recall: float = 0.98
+) -> CalibrationReport:
+    """
+    Thresholds that refuse as many unanswerable questions as possible while
+    still answering `target_recall` of the answerable ones (grid search over
+    the observed scores). The margin test only applies below the highest
+    score an unanswerable question reached; the cutoff keeps every labelled
+    relevant hit.
+    """
+    if not 0.0 < target_recall <= 1.0:
+        raise ValueError("target_recall must be in (0, 1]")
+    pos = [s for s in samples if s.answerable]
+    neg = [s for s in samples if not s.answerable]
+    if not pos:
+        raise ValueError("Calibration needs answerable questions.")
+
+    pos_top = np.array([s.top_score for s in pos])
+    pos_margin = np.array([s.margin for s in pos])
+    neg_top = np.array([s.top_score for s in neg])
+    neg_margin = np.array([s.margin for s in neg])
+    confident = float(neg_top.max()) + 1e-6 if neg else 1.0
+
+    # Candidate thresholds: 0 (= off) and every observed answerable value
+    scores = np.concatenate([[0.0], np.unique(pos_top)])
+    margins = np.concatenate([[0.0], np.unique(pos_margin)])
+
+    def refused(top: np.ndarray, margin: np.ndarray) -> np.ndarray:
+        # (len(scores), len(margins), n) refusals for every threshold pair
+        low = top[None, None, :] < scores[:, None, None]
+        flat = (top < confident)[None, None, :] & (margin[None, None, :] < margins[None, :, None])
+        return low | flat
+
+    recall = 1.0 - refused(pos_top, pos_margin).mean(axis=2)
+    caught = refused(neg_top, neg_margin).mean(axis=2) if neg else np.zeros_like(recall)
+    # Best refusal rate at the target recall; ties go to the lowest margin
+    # (the noisier signal), then the lowest score threshold
+    objective = np.where(recall >= target_recall - 1e-9, caught, -1.0)
+    j, i = np.unravel_index(int(np.argmax(objective.T)), objective.T.shape)
+
+    drops = [s.relevant_drop for s in pos if s.relevant_drop is not None]
+    cutoff = round(max(drops) + 0.01, 4) if drops else None
+    return CalibrationReport(
+        thresholds=GateThresholds(
+            min_score=float(scores[i]),
+            min_margin=float(margins[j]),
+            confident_score=confident,
+            relative_cutoff=cutoff,
+        ),
+        recall=float(recall[i, j]),
+        refusal_rate=float(caught[i, j]),
+    )
@@ -0,0 +1,181 @@
+from __future__ import annotations
+
+import math
+import re
+import threading
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence, Set
+
+from hr_rag_assistant.generation.citations import chunk_label
+from hr_rag_assistant.retrieval.vectorstore import RetrievedChunk
+
+try:  # optional: exact token counts (pip install "hr-rag-assistant[tokens]")
+    import tiktoken
+except ImportError:  # pragma: no cover - depends on the environment
+    tiktoken = None
+
+# Starting point of the estimator (~4 chars/token for English prose)
+DEFAULT_CHARS_PER_TOKEN = 4.0
+
+# Knapsack resolution: token costs are rounded up to budget / KNAPSACK_STEPS
+KNAPSACK_STEPS = 1000
+
+# Partial blocks shorter than this are not worth their header
+MIN_PARTIAL_TOKENS = 20
+
+# Possible cut points: after sentence punctuation or at a line break
+_SENTENCE_END = re.compile(r"[.!?;:](?=\s)|\n")
+
+
+class TokenCounter:
+    """
+    Counts prompt tokens for `chat_model`: exact with tiktoken when it is
+    installed, otherwise a chars-per-token estimate that `calibrate` keeps
+    in line with the prompt token counts the API reports.
+    """
+
+    def __init__(self, chat_model: str, *, chars_per_token: float = DEFAULT_CHARS_PER_TOKEN):
+        self.chat_model = chat_model
+        self.chars_per_token = chars_per_token
+        self._encoding = _encoding_for(chat_model)
+        self._lock = threading.Lock()
+
+    @property
+    def exact(self) -> bool:
+        return self._encoding is not None
+
+    def count(self, text: str) -> int:
+        if not text:
+            return 0
+        if self._encoding is not None:
+            return len(self._encoding.encode(text, disallowed_special=()))
+        return math.ceil(len(text) / self.chars_per_token)
+
+    def calibrate(self, chars: int, tokens: Optional[int], *, weight: float = 0.2) -> None:
+        """Moves the estimate towards `chars / tokens` of an actual request."""
+        if self.exact or not tokens or chars <= 0:
+            return
+        with self._lock:
+            self.chars_per_token += weight * (chars / tokens - self.chars_per_token)
+
+
+def _encoding_for(chat_model: str):
+    if tiktoken is None:
+        return None
+    try:
+        return tiktoken.encoding_for_model(chat_model)
+    except KeyError:
+        return tiktoken.get_encoding("o200k_base")
+
+
+@dataclass(frozen=True)
+class PackedContext:
+    text: str
+    tokens: int
+    chunks_used: int
+    # Included with their tail cut off at a sentence boundary
+    chunks_truncated: int
+    # Left out entirely
+    chunks_dropped: int
+
+
+def context_header(hit: RetrievedChunk) -> str:
+    c = hit.chunk
+    return f"[SOURCE: {c.source} | CHUNK: {chunk_label(c)} | SCORE: {hit.score:.4f}]"
+
+
+def pack_context(
+    hits: Sequence[RetrievedChunk], *, max_context_tokens: int, counter: TokenCounter
+) -> PackedContext:
+    """
+    Context blocks (same format as build_context) for the subset of hits
+    with the highest total relevance score that fits in `max_context_tokens`
+    (a 0/1 knapsack over block token counts), in retrieval order. Leftover
+    budget is filled with the leading sentences of the best remaining hits.
+    """
+    if max_context_tokens <= 0:
+        raise ValueError("max_context_tokens must be > 0")
+
+    bodies = [h.chunk.text.strip() for h in hits]
+    blocks = [context_header(h) + "\n" + body + "\n" for h, body in zip(hits, bodies)]
+    costs = [counter.count(b) for b in blocks]
+
+    # 1) Whole blocks: maximize total score within the budget
+    chosen = _knapsack(costs, [max(h.score, 0.0) for h in hits], max_context_tokens)
+    used = sum(costs[i] for i in chosen)
+
+    # 2) Partial blocks, cut at a sentence boundary, while budget remains
+    partial: Dict[int, str] = {}
+    for i in range(len(hits)):
+        if i in chosen:
+            continue
+        remaining = max_context_tokens - used
+        if remaining < MIN_PARTIAL_TOKENS:
+            break
+        block = _sentence_prefix(context_header(hits[i]), bodies[i], remaining, counter)
+        if block is not None:
+            partial[i] = block
+            used += counter.count(block)
+
+    parts = [blocks[i] if i in chosen else partial[i] for i in sorted(chosen | partial.keys())]
+    return PackedContext(
+        text="".join(parts),
+        tokens=used,
+        chunks_used=len(parts),
+        chunks_truncated=len(partial),
+        chunks_dropped=len(hits) - len(parts),
+    )
+
+
+def _knapsack(costs: List[int], values: List[float], budget: int) -> Set[int]:
+    """Indexes of the max-value subset whose total cost is <= budget."""
+    if sum(costs) <= budget:
+        return set(range(len(costs)))
+    # Coarser units keep the table small for large budgets; rounding costs
+    # up keeps every selection within the real budget.
+    unit = max(1, math.ceil(budget / KNAPSACK_STEPS))
+    capacity = budget // unit
+    weights = [math.ceil(c / unit) for c in costs]
+
+    best = [0.0] * (capacity + 1)
+    take = [[False] * (capacity + 1) for _ in costs]
+    for i, (w, v) in enumerate(zip(weights, values)):
+        # Tiny bonus per chunk: among equal scores, prefer more evidence
+        v += 1e-9
+        for b in range(capacity, w - 1, -1):
+            if best[b - w] + v > best[b]:
+                best[b] = best[b - w] + v
+                take[i][b] = True
+
+    chosen: Set[int] = set()
+    b = capacity
+    for i in range(len(costs) - 1, -1, -1):
+        if take[i][b]:
+            chosen.add(i)
+            b -= weights[i]
+    return chosen
+
+
+def _sentence_prefix(
+    header: str, body: str, budget: int, counter: TokenCounter
+) -> Optional[str]:
+    """Longest `header + body[:cut]` block ending at a sentence boundary within budget."""
+    cuts = [m.end() for m in _SENTENCE_END.finditer(body)] + [len(body)]
+
+    def block(k: int) -> str:
+        return header + "\n" + body[: cuts[k]].rstrip() + "\n"
+
+    # Token counts grow with the cut position: binary search the last fit
+    lo, hi = 0, len(cuts)
+    while lo < hi:
+        mid = (lo + hi) // 2
+        if counter.count(block(mid)) <= budget:
+            lo = mid + 1
+        else:
+            hi = mid
+    if lo == 0:
+        return None
+    out = block(lo - 1)
+    if counter.count(out) - counter.count(header) < MIN_PARTIAL_TOKENS:
+        return None
+    return out
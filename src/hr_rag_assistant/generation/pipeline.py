@@ -0,0 +1,79 @@
+from __future__ import annotations
+
+import asyncio
+import time
+from dataclasses import dataclass
+from typing import List, Optional, Sequence
+
+from hr_rag_assistant.generation.answerer import AnswerResult, HRAnswerer
+from hr_rag_assistant.retrieval.filters import FilterLike
+from hr_rag_assistant.retrieval.retriever import HRRetriever, RetrievalResult
+
+
+@dataclass(frozen=True)
+class PipelineResult:
+    retrieval: RetrievalResult
+    answer: AnswerResult
+    retrieve_seconds: float
+    answer_seconds: float
+
+
+class AsyncHRPipeline:
+    """
+    Question -> retrieval -> grounded answer on one event loop.
+
+    All network calls (query embedding, chat completion) are awaited on the
+    loop's shared AsyncOpenAI client and index searches run in worker
+    threads, so a single process serves many questions concurrently without
+    a thread per request. At most `max_concurrency` questions are in flight;
+    the rest wait their turn.
+    """
+
+    def __init__(
+        self,
+        *,
+        retriever: HRRetriever,
+        answerer: HRAnswerer,
+        top_k: int = 5,
+        max_context_chars: int = 6000,
+        max_context_tokens: Optional[int] = None,
+        temperature: float = 0.0,
+        max_concurrency: int = 256,
+    ):
+        if max_concurrency <= 0:
+            raise ValueError("max_concurrency must be > 0")
+        self.retriever = retriever
+        self.answerer = answerer
+        self.top_k = top_k
+        self.max_context_chars = max_context_chars
+        self.max_context_tokens = max_context_tokens
+        self.temperature = temperature
+        self._slots = asyncio.Semaphore(max_concurrency)
+
+    async def ask(self, question: str, *, filters: Optional[FilterLike] = None) -> PipelineResult:
+        async with self._slots:
+            t0 = time.perf_counter()
+            retrieval = await self.retriever.aretrieve(question, top_k=self.top_k, filters=filters)
+            t1 = time.perf_counter()
+            answer = await self.answerer.aanswer(
+                question=retrieval.query,
+                hits=retrieval.results,
+                max_context_chars=self.max_context_chars,
+                max_context_tokens=self.max_context_tokens,
+                temperature=self.temperature,
+                query_vector=retrieval.query_vector,
+                index_version=retrieval.index_version,
+            )
+            t2 = time.perf_counter()
+        return PipelineResult(
+            retrieval=retrieval,
+            answer=answer,
+            retrieve_seconds=t1 - t0,
+            answer_seconds=t2 - t1,
+        )
+
+    async def ask_many(
+        self, questions: Sequence[str], *, filters: Optional[FilterLike] = None
+    ) -> List[PipelineResult]:
+        """Answers all questions concurrently; results are in input order."""
+        return list(await asyncio.gather(*(self.ask(q, filters=filters) for q in questions)))
@@ -0,0 +1,197 @@
+from __future__ import annotations
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import List, Optional, Sequence, Set, Tuple
+
+from hr_rag_assistant.generation.answer_cache import CachedAnswer, PresetAnswerStore
+from hr_rag_assistant.generation.answerer import HRAnswerer
+from hr_rag_assistant.generation.gating import (
+    REFUSAL,
+    GateThresholds,
+    gate_retrieval,
+    gate_scope,
+)
+from hr_rag_assistant.logging import get_logger
+from hr_rag_assistant.retrieval.retriever import HRRetriever, RetrievalResult
+
+logger = get_logger(__name__)
+
+# Questions offered in the app; most traffic is one of these, so their
+# answers are precomputed after ingestion (scripts/warm_presets.py).
+HR_QUESTIONS = [
+    "How many days per week am I allowed to work remotely?",
+    "Do I need manager approval for remote work?",
+    "Can my remote work privileges be revoked? If so, why?",
+    "How many days of annual leave do employees receive per year?",
+    "How far in advance do I need to request annual leave?",
+    "Do I need a medical certificate if I am sick for several days?",
+    "Can I carry unused leave days into the next year?",
+    "What health insurance benefits are provided to employees?",
+    "Does the company contribute to a pension plan?",
+    "Is there a budget for training or professional development?",
+    "How long is the probation period for new employees?",
+    "What training must be completed during onboarding?",
+    "Is there a buddy assigned to new employees?",
+    "What happens if an employee violates the code of conduct?",
+    "Under what conditions can disciplinary action lead to termination?",
+]
+
+# Request settings presets are precomputed for (the app's defaults)
+PRESET_TOP_K = 5
+PRESET_MAX_CONTEXT_TOKENS = 1500
+
+
+@dataclass(frozen=True)
+class WarmupReport:
+    index_version: str
+    answered: int
+    refused: int
+    seconds: float
+
+
+def preset_scope(
+    answerer: HRAnswerer,
+    retriever: HRRetriever,
+    *,
+    gate: Optional[GateThresholds] = None,
+    top_k: int = PRESET_TOP_K,
+    max_context_tokens: Optional[int] = PRESET_MAX_CONTEXT_TOKENS,
+    temperature: float = 0.0,
+) -> str:
+    """
+    Key of everything that shapes a preset answer besides question and index:
+    answering settings, retrieval settings and the confidence gate (None = off).
+    """
+    scope = answerer.scope(temperature=temperature, max_context_tokens=max_context_tokens)
+    return f"{scope}|k={top_k}|retrieval={retriever.scope()}|gate={gate_scope(gate)}"
+
+
+def warm_presets(
+    *,
+    retriever: HRRetriever,
+    answerer: HRAnswerer,
+    store: PresetAnswerStore,
+    questions: Sequence[str] = HR_QUESTIONS,
+    top_k: int = PRESET_TOP_K,
+    max_context_tokens: Optional[int] = PRESET_MAX_CONTEXT_TOKENS,
+    gate: Optional[GateThresholds] = None,
+    workers: int = 8,
+) -> WarmupReport:
+    """
+    Answers `questions` against the index version currently served and
+    stores them in `store` (replacing answers of older versions):
+
+    1) one batched embedding request + FAISS search for all questions
+    2) the confidence gate (if given) turns out-of-scope retrievals into REFUSAL
+    3) answers are generated `workers` at a time at temperature 0, which
+       also fills the answerer's caches
+    """
+    t0 = time.perf_counter()
+
+    # 1) Retrieve all presets in one batch (one search, one index version)
+    retrievals = retriever.retrieve_many(list(questions), top_k=top_k)
+    version = retrievals[0].index_version if retrievals else retriever.index_version
+    if version is None:
+        raise RuntimeError("Precomputed answers need a versioned index (run ingestion).")
+
+    # 2) + 3) Gate, then generate
+    def answer(retrieval: RetrievalResult) -> CachedAnswer:
+        hits = retrieval.results
+        if gate is not None:
+            decision = gate_retrieval(retrieval, gate)
+            if not decision.answer:
+                return _preset_answer(retrieval.query, REFUSAL, [], answerer.chat_model, 0)
+            hits = decision.hits
+        result = answerer.answer(
+            question=retrieval.query,
+            hits=hits,
+            max_context_tokens=max_context_tokens,
+            temperature=0.0,
+            query_vector=retrieval.query_vector,
+            index_version=retrieval.index_version,
+        )
+        return _preset_answer(
+            result.question, result.answer, result.sources, result.model, result.used_context_chars
+        )
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        answers = list(pool.map(answer, retrievals))
+
+    store.replace_version(
+        scope=preset_scope(
+            answerer, retriever, gate=gate, top_k=top_k, max_context_tokens=max_context_tokens
+        ),
+        index_version=version,
+        answers=answers,
+    )
+    refused = sum(a.answer == REFUSAL for a in answers)
+    return WarmupReport(
+        index_version=version,
+        answered=len(answers) - refused,
+        refused=refused,
+        seconds=time.perf_counter() - t0,
+    )
+
+
+def _preset_answer(
+    question: str, answer: str, sources: List[str], model: str, used_context_chars: int
+) -> CachedAnswer:
+    return CachedAnswer(
+        question=question,
+        answer=answer,
+        sources=sources,
+        model=model,
+        used_context_chars=used_context_chars,
+        similarity=1.0,
+        chunk_overlap=1.0,
+    )
+
+
+# (scope, index version) pairs being warmed by this process
+_refreshing: Set[Tuple[str, str]] = set()
+_refreshing_lock = threading.Lock()
+
+
+def refresh_presets_in_background(
+    *,
+    retriever: HRRetriever,
+    answerer: HRAnswerer,
+    store: PresetAnswerStore,
+    gate: Optional[GateThresholds] = None,
+) -> bool:
+    """
+    Starts warm_presets in a daemon thread when the store has no answers for
+    the index version being served (e.g. after a hot reload); returns True if
+    a refresh was started. At most one refresh per version runs per process.
+    """
+    version = retriever.index_version
+    if version is None:
+        return False
+    scope = preset_scope(answerer, retriever, gate=gate)
+    if store.count(scope=scope, index_version=version) > 0:
+        return False
+    with _refreshing_lock:
+        if (scope, version) in _refreshing:
+            return False
+        _refreshing.add((scope, version))
+
+    def run() -> None:
+        try:
+            report = warm_presets(retriever=retriever, answerer=answerer, store=store, gate=gate)
+            logger.info(
+                "Warmed %d preset answers for index %s in %.1fs",
+                report.answered + report.refused,
+                report.index_version,
+                report.seconds,
+            )
+        except Exception:
+            logger.exception("Warming preset answers for index %s failed", version)
+        finally:
+            with _refreshing_lock:
+                _refreshing.discard((scope, version))
+
+    threading.Thread(target=run, name="preset-warmup", daemon=True).start()
+    return True
@@ -1,16 +1,15 @@
 from __future__ import annotations
 
-from typing import List
+from typing import Iterable, Iterator, List
 
 from hr_rag_assistant.types import HRChunk, HRDocument
 
 
-def chunk_document(doc: HRDocument, chunk_size: int, chunk_overlap: int) -> List[HRChunk]:
+def iter_document_chunks(doc: HRDocument, chunk_size: int, chunk_overlap: int) -> Iterator[HRChunk]:
     if chunk_overlap >= chunk_size:
         raise ValueError("chunk_overlap must be smaller than chunk_size")
 
     text = doc.text
-    chunks: List[HRChunk] = []
 
     start = 0
     idx = 0
@@ -20,21 +19,19 @@ def chunk_document(doc: HRDocument, chunk_size: int, chunk_overlap: int) -> List
         chunk_text = text[start:end].strip()
 
         if chunk_text:
-            chunks.append(
-                HRChunk(
-                    id=f"{doc.source}::chunk_{idx:04d}",
-                    text=chunk_text,
-                    source=doc.source,
-                    chunk_index=idx,
-                    start_char=start,
-                    end_char=end,
-                    metadata={
-                        **doc.metadata,
-                        "chunk_index": idx,
-                        "start_char": start,
-                        "end_char": end,
-                    },
-                )
+            yield HRChunk(
+                id=f"{doc.source}::chunk_{idx:04d}",
+                text=chunk_text,
+                source=doc.source,
+                chunk_index=idx,
+                start_char=start,
+                end_char=end,
+                metadata={
+                    **doc.metadata,
+                    "chunk_index": idx,
+                    "start_char": start,
+                    "end_char": end,
+                },
             )
 
         idx += 1
@@ -52,11 +49,17 @@ def chunk_document(doc: HRDocument, chunk_size: int, chunk_overlap: int) -> List
 
         start = next_start
 
-    return chunks
+
+def chunk_document(doc: HRDocument, chunk_size: int, chunk_overlap: int) -> List[HRChunk]:
+    return list(iter_document_chunks(doc, chunk_size, chunk_overlap))
 
 
-def chunk_documents(docs: List[HRDocument], chunk_size: int, chunk_overlap: int) -> List[HRChunk]:
-    all_chunks: List[HRChunk] = []
+def iter_chunks(
+    docs: Iterable[HRDocument], chunk_size: int, chunk_overlap: int
+) -> Iterator[HRChunk]:
     for doc in docs:
-        all_chunks.extend(chunk_document(doc, chunk_size, chunk_overlap))
-    return all_chunks
\ No newline at end of file
+        yield from iter_document_chunks(doc, chunk_size, chunk_overlap)
+
+
+def chunk_documents(docs: List[HRDocument], chunk_size: int, chunk_overlap: int) -> List[HRChunk]:
+    return list(iter_chunks(docs, chunk_size, chunk_overlap))
\ No newline at end of file
@@ -2,6 +2,8 @@ from __future__ import annotations
 
 import re
 
+from hr_rag_assistant.types import HRDocument
+
 
 def clean_text(text: str) -> str:
     """Basic normalization: normalize whitespace and strip."""
@@ -11,3 +13,6 @@ def clean_text(text: str) -> str:
     normalized = re.sub(r"\n{3,}", "\n\n", normalized)
     return normalized.strip()
 
+
+def clean_document(doc: HRDocument) -> HRDocument:
+    return HRDocument(source=doc.source, text=clean_text(doc.text), metadata=doc.metadata)
@@ -2,100 +2,525 @@ from __future__ import annotations
 
 import json
 import os
+import shutil
+import time
+from collections import deque
+from dataclasses import dataclass, replace
 from pathlib import Path
-from typing import List
+from typing import Any, Deque, Dict, Iterable, Iterator, List, Mapping, Optional, Tuple, TypeVar
 
 import faiss
+import numpy as np
 from openai import OpenAI
 
+from hr_rag_assistant.embeddings.cache import EmbeddingCache
+from hr_rag_assistant.embeddings.embedders import Embedder, OpenAIEmbedder, index_embedder
+from hr_rag_assistant.embeddings.executor import EmbeddingExecutor
+from hr_rag_assistant.ingestion.manifest import (
+    IndexManifest,
+    ManifestChunk,
+    chunk_key,
+    content_hash,
+)
+from hr_rag_assistant.logging import get_logger
+from hr_rag_assistant.retrieval.chunk_store import ChunkStoreWriter
+from hr_rag_assistant.retrieval.exact_vectors import VECTORS_FILENAME, ExactVectorWriter
+from hr_rag_assistant.retrieval.index_spec import IndexSpec
+from hr_rag_assistant.retrieval.lexical import BM25_B, BM25_K1, BM25Writer
+from hr_rag_assistant.retrieval.versioning import (
+    acquire_lease,
+    collect_garbage,
+    new_version,
+    publish_version,
+    release_lease,
+    resolve_index_dir,
+)
 from hr_rag_assistant.types import HRChunk
 
+logger = get_logger(__name__)
 
-def _batched(items: List[str], batch_size: int):
-    for i in range(0, len(items), batch_size):
-        yield items[i : i + batch_size]
+T = TypeVar("T")
+
+
+@dataclass(frozen=True)
+class IndexBuildStats:
+    num_chunks: int
+    embedded: int
+    reused: int
+    removed: int
+    recall: Optional[Dict[str, Any]] = None
+    version: Optional[str] = None
+    output_dir: Optional[str] = None
+
+
+def _batched(items: Iterable[T], batch_size: int) -> Iterator[List[T]]:
+    batch: List[T] = []
+    for item in items:
+        batch.append(item)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _load_previous(
+    previous_dir: Path, embedder: Embedder, spec: IndexSpec
+) -> tuple[Optional[IndexManifest], Optional[faiss.Index]]:
+    """
+    Returns the previous manifest + index if the next version can be built
+    incrementally from them. Anything else (first run, legacy index without
+    stable ids, other embedder or index type) means a full rebuild.
+    """
+    manifest = IndexManifest.load(str(previous_dir))
+    index_path = previous_dir / "index.faiss"
+    meta_path = previous_dir / "meta.json"
+    if manifest is None or not index_path.exists() or not meta_path.exists():
+        return None, None
+    if manifest.embedding_model != embedder.model:
+        return None, None
+
+    old_meta = json.loads(meta_path.read_text(encoding="utf-8"))
+    if index_embedder(old_meta) != embedder.identity():
+        return None, None
+
+    # Compare against what was requested last time: IVF parameters may have
+    # been adapted to a small corpus, which should not force a rebuild.
+    if (
+        old_meta.get("index_requested", IndexSpec.from_meta(old_meta).build_key())
+        != spec.build_key()
+    ):
+        return None, None
+
+    index = faiss.read_index(str(index_path))
+    if not isinstance(index, faiss.IndexIDMap2) or index.ntotal != len(manifest.chunks):
+        return None, None
+    return manifest, index
+
+
+class _IndexAccumulator:
+    """
+    Creates the index lazily once the dimension is known. Index kinds that
+    need training buffer the first `spec.train_size` vectors, train on them
+    and then add everything; the effective (possibly adapted) spec is kept in
+    `self.spec`.
+    """
+
+    def __init__(self, spec: IndexSpec, index: Optional[faiss.Index]):
+        self.spec = spec
+        self.index = index
+        self._buf_x: List[np.ndarray] = []
+        self._buf_ids: List[np.ndarray] = []
+        self._buffered = 0
+
+    def add(self, x: np.ndarray, ids: np.ndarray) -> None:
+        if self.index is not None:
+            self.index.add_with_ids(x, ids)
+            return
+        self._buf_x.append(x)
+        self._buf_ids.append(ids)
+        self._buffered += len(x)
+        if self._buffered >= self.spec.train_size:
+            self._create_and_flush()
+
+    def _create_and_flush(self) -> None:
+        x = np.vstack(self._buf_x)
+        ids = np.concatenate(self._buf_ids)
+        self._buf_x, self._buf_ids = [], []
+
+        spec = self.spec.adapted_to(len(x))
+        if spec != self.spec:
+            logger.warning(
+                "Only %d vectors to train on; using %s instead of %s", len(x), spec, self.spec
+            )
+            self.spec = spec
+
+        index = spec.create(x.shape[1])
+        if spec.needs_training:
+            index.train(x)
+        index.add_with_ids(x, ids)
+        self.index = index
+
+    def finish(self) -> Optional[faiss.Index]:
+        if self.index is None and self._buf_x:
+            self._create_and_flush()
+        return self.index
+
+
+class _RecallProbe:
+    """
+    Exact top-k for a fixed sample of query vectors, accumulated batch by
+    batch while the index is built (so no full copy of the vectors is kept).
+    The queries are the first `num_queries` vectors of the run; batches seen
+    before that many were collected are held back until then.
+    """
+
+    def __init__(self, num_queries: int, k: int):
+        self.num_queries = num_queries
+        self.k = k
+        self.queries: Optional[np.ndarray] = None
+        self._scores: Optional[np.ndarray] = None
+        self._ids: Optional[np.ndarray] = None
+        # Batches seen before enough queries were collected
+        self._early: List[Tuple[np.ndarray, np.ndarray]] = []
+        self._early_count = 0
+
+    def observe(self, x: np.ndarray, ids: np.ndarray) -> None:
+        if self.queries is None:
+            self._early.append((x.copy(), ids))
+            self._early_count += len(x)
+            if self._early_count >= self.num_queries:
+                self._start()
+            return
+        self._accumulate(x, ids)
+
+    def _start(self) -> None:
+        self.queries = np.vstack([x for x, _ in self._early])[: self.num_queries]
+        self._scores = np.full((len(self.queries), 0), -np.inf, dtype="float32")
+        self._ids = np.zeros((len(self.queries), 0), dtype="int64")
+        early, self._early = self._early, []
+        for x, ids in early:
+            self._accumulate(x, ids)
+
+    def _accumulate(self, x: np.ndarray, ids: np.ndarray) -> None:
+        sims = self.queries @ x.T
+        scores = np.hstack([self._scores, sims])
+        all_ids = np.hstack([self._ids, np.broadcast_to(ids, sims.shape)])
+        k = min(self.k, scores.shape[1])
+        top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        self._scores = np.take_along_axis(scores, top, axis=1)
+        self._ids = np.take_along_axis(all_ids, top, axis=1)
+
+    def measure(self, index: faiss.Index, spec: IndexSpec) -> Optional[Dict[str, Any]]:
+        if self.queries is None and self._early:
+            self._start()
+        if self.queries is None or self._ids is None:
+            return None
+
+        k = self._ids.shape[1]
+        params = spec.search_params()
+        latencies: List[float] = []
+        hits = 0
+        for q, exact in zip(self.queries, self._ids):
+            start = time.perf_counter()
+            _, I = index.search(q.reshape(1, -1), k, params=params)
+            latencies.append((time.perf_counter() - start) * 1000)
+            hits += len(set(I[0].tolist()) & set(exact.tolist()))
+
+        return {
+            "k": k,
+            "queries": len(self.queries),
+            "recall_at_k": hits / (k * len(self.queries)),
+            "latency_ms_p50": float(np.percentile(latencies, 50)),
+            "latency_ms_p95": float(np.percentile(latencies, 95)),
+            "baseline": "exact IndexFlatIP over the same vectors",
+            "num_vectors": int(index.ntotal),
+        }
+
+
+def _rebuild_without(index: faiss.Index, stale: List[int], spec: IndexSpec) -> faiss.Index:
+    """For index kinds without remove_ids (HNSW): re-add every vector that is still live."""
+    ids = faiss.vector_to_array(index.id_map)
+    keep = ~np.isin(ids, np.array(stale, dtype="int64"))
+    x = index.index.reconstruct_n(0, index.ntotal)[keep]
+    rebuilt = spec.create(index.d)
+    if spec.needs_training:
+        rebuilt.train(x)
+    rebuilt.add_with_ids(x, ids[keep])
+    return rebuilt
+
+
+def _mmap_loadable(index_path: Path) -> bool:
+    """Whether serving processes can memory-map this index (INDEX_LOAD_MODE=mmap)."""
+    try:
+        faiss.read_index(str(index_path), faiss.IO_FLAG_MMAP_IFC | faiss.IO_FLAG_READ_ONLY)
+    except RuntimeError:
+        return False
+    return True
 
 
 def build_and_persist_faiss_index(
     *,
-    chunks: List[HRChunk],
+    chunks: Iterable[HRChunk],
     index_dir: str,
-    openai_api_key: str,
-    embedding_model: str,
+    openai_api_key: Optional[str] = None,
+    embedding_model: Optional[str] = None,
+    embedder: Optional[Embedder] = None,
+    document_hashes: Optional[Mapping[str, str]] = None,
+    embedding_cache: Optional[EmbeddingCache] = None,
     batch_size: int = 128,
-) -> None:
+    max_in_flight: int = 4,
+    requests_per_minute: int = 0,
+    tokens_per_minute: int = 0,
+    index_spec: Optional[IndexSpec] = None,
+    recall_queries: int = 200,
+    recall_k: int = 10,
+    incremental: bool = True,
+    keep_versions: int = 2,
+    lexical_index: bool = True,
+) -> IndexBuildStats:
     """
     Builds a FAISS index (cosine similarity via normalized vectors + Inner Product)
-    and persists:
+    as a new snapshot under index_dir/versions/<version>/, containing:
       - index.faiss
-      - chunks.jsonl (id, text, metadata for citations)
-      - meta.json (embedding_model, dim, counts)
-    """
-    if not chunks:
-        raise ValueError("No chunks provided for indexing.")
+      - chunks.rows / chunks.txt / chunks.vidmap / chunks.tables.json
+        (binary chunk store: id, vector_id, text, metadata for citations;
+        see retrieval.chunk_store)
+      - vectors.f16 (only with `index_spec.store_vectors`: float16 copy of the
+        vectors, used to rescore candidates of a quantized index)
+      - bm25.terms.json / bm25.postings (with `lexical_index`: BM25 inverted
+        index over chunk text for hybrid and keyword retrieval)
+      - meta.json (embedder, dim, counts)
+      - manifest.json (per-document and per-chunk content hashes)
+
+    The snapshot is published by atomically swapping index_dir/CURRENT, so
+    readers (FaissVectorStore, HotReloadingVectorStore) never see a partially
+    written index; a build that fails before publishing removes its version
+    directory. Afterwards, versions beyond the newest `keep_versions` that
+    no running process has open are deleted (see retrieval.versioning).
+
+    `chunks` may be any iterable (e.g. the lazy pipeline in ingestion.pipeline):
+    it is consumed in `batch_size` batches that are embedded, added to the index
+    and appended to the chunk store, so only a few batches of text and vectors
+    are in memory at once. `document_hashes` is read after `chunks` has been
+    exhausted, so it may be filled in by the same pipeline.
 
+    With `incremental=True` the previous manifest is diffed against `chunks`:
+    only new or changed chunks are embedded, vectors of deleted chunks are
+    removed, and unchanged chunks keep their vector ids.
+
+    Vectors come from `embedder` (see embeddings.embedders; default: the
+    OpenAI embeddings API with `embedding_model`), whose identity is recorded
+    in meta.json so the index is only ever queried with the same embedder.
+    Chunks that still need a vector are looked up in `embedding_cache` first,
+    so re-chunking the same text never pays for the same embedding twice.
+    Up to `max_in_flight` batches are embedded concurrently within the given
+    per-minute budgets (0 = unlimited); vectors are still added in chunk order.
+
+    `index_spec` selects the FAISS index type (flat, IVF-Flat, IVF-PQ, HNSW)
+    and vector encoding (float32, float16, int8) and is recorded in meta.json
+    so FaissVectorStore reopens it correctly.
+    For approximate kinds, recall@k against an exact flat baseline and query
+    latency are measured on `recall_queries` vectors embedded in this run.
+    """
+    requested_spec = spec = index_spec or IndexSpec()
+    if embedder is None:
+        if not embedding_model:
+            raise ValueError("Either embedder or embedding_model is required.")
+        # Retries are handled by the executor (with rate-limit budgets), not the client.
+        embedder = OpenAIEmbedder(
+            model=embedding_model, client=OpenAI(api_key=openai_api_key, max_retries=0)
+        )
+    embedding_model = embedder.model
     os.makedirs(index_dir, exist_ok=True)
-    index_dir_path = Path(index_dir)
 
-    index_path = index_dir_path / "index.faiss"
-    chunks_path = index_dir_path / "chunks.jsonl"
-    meta_path = index_dir_path / "meta.json"
+    # The published snapshot (or a pre-versioning index directly in index_dir)
+    # is only read; everything is written to a fresh version directory.
+    previous_dir, _ = resolve_index_dir(index_dir)
+    previous, index = (None, None)
+    if incremental:
+        previous, index = _load_previous(previous_dir, embedder, spec)
 
-    oai = OpenAI(api_key=openai_api_key)
+    next_vector_id = previous.next_vector_id if previous else 0
+    manifest_chunks: Dict[str, ManifestChunk] = {}
+    num_chunks = 0
+    embedded = 0
 
-    # 1) Embed chunks
-    all_vectors: List[List[float]] = []
-    all_ids: List[str] = []
+    # Vector ids of the embedding batches handed to the executor, in order.
+    pending_ids: Deque[np.ndarray] = deque()
 
-    texts = [c.text for c in chunks]
-    ids = [c.id for c in chunks]
+    def texts_to_embed(
+        store: ChunkStoreWriter, bm25: Optional[BM25Writer]
+    ) -> Iterator[List[str]]:
+        """
+        1) Diff each chunk against the previous manifest and append its row
+        to the chunk store (and its terms to the BM25 index); yield full
+        batches of texts that need a vector.
+        """
+        nonlocal next_vector_id, num_chunks, embedded
+        ids: List[int] = []
+        texts: List[str] = []
 
-    for id_batch, text_batch in zip(_batched(ids, batch_size), _batched(texts, batch_size)):
-        emb = oai.embeddings.create(model=embedding_model, input=text_batch)
-        vectors = [e.embedding for e in emb.data]
-        all_vectors.extend(vectors)
-        all_ids.extend(id_batch)
+        for batch in _batched(chunks, batch_size):
+            for c in batch:
+                key = chunk_key(c)
+                if key in manifest_chunks:
+                    # Two chunks on one manifest entry would leave the index
+                    # larger than the manifest and disable incremental builds.
+                    raise ValueError(f"Duplicate chunk {key!r} (document listed twice?)")
+                h = content_hash(c.text)
+                vid = previous.reusable_vector_id(c, h) if previous else None
+                if vid is None:
+                    vid = next_vector_id
+                    next_vector_id += 1
+                    ids.append(vid)
+                    texts.append(c.text)
 
-    if not all_vectors:
-        raise RuntimeError("Embedding returned no vectors.")
+                manifest_chunks[key] = ManifestChunk(hash=h, vector_id=vid, document=c.document)
+                num_chunks += 1
 
-    dim = len(all_vectors[0])
+                # Retrieval returns vector ids -> the store maps them to rows.
+                store.add(c, vid)
+                if bm25 is not None:
+                    bm25.add(c.text, vid)
 
-    # 2) Build FAISS index
+            while len(texts) >= batch_size:
+                pending_ids.append(np.array(ids[:batch_size], dtype="int64"))
+                embedded += batch_size
+                yield texts[:batch_size]
+                ids, texts = ids[batch_size:], texts[batch_size:]
+
+        if texts:
+            pending_ids.append(np.array(ids, dtype="int64"))
+            embedded += len(texts)
+            yield texts
+
+    # 2) Embed new/changed chunks
+    executor = EmbeddingExecutor(
+        embedder,
+        cache=embedding_cache,
+        max_in_flight=max_in_flight,
+        requests_per_minute=requests_per_minute,
+        tokens_per_minute=tokens_per_minute,
+    )
+
+    # 3) Update (or build) the FAISS index batch by batch
     # We use cosine similarity by L2-normalizing vectors and using Inner Product.
-    import numpy as np
-
-    x = np.array(all_vectors, dtype="float32")
-    faiss.normalize_L2(x)
-
-    index = faiss.IndexFlatIP(dim)  # Inner Product
-    index.add(x)
-
-    # 3) Persist FAISS index
-    faiss.write_index(index, str(index_path))
-
-    # 4) Persist chunk store for citations + lookup
-    # We store chunks in the same order as vectors were added to FAISS.
-    # Retrieval later will return indices -> map to these rows.
-    with chunks_path.open("w", encoding="utf-8") as f:
-        for c in chunks:
-            row = {
-                "id": c.id,
-                "source": c.source,
-                "chunk_index": c.chunk_index,
-                "start_char": c.start_char,
-                "end_char": c.end_char,
-                "text": c.text,
-                "metadata": c.metadata,
-            }
-            f.write(json.dumps(row, ensure_ascii=False) + "\n")
-
-    # 5) Persist meta
-    meta = {
-        "embedding_model": embedding_model,
-        "dimension": dim,
-        "num_chunks": len(chunks),
-        "faiss_index": "IndexFlatIP",
-        "similarity": "cosine (via normalized vectors + inner product)",
-    }
-    meta_path.write_text(json.dumps(meta, indent=2), encoding="utf-8")
\ No newline at end of file
+    # IndexIDMap2 keeps our own stable vector ids and supports remove_ids().
+    dim = previous.dimension if previous else None
+    previous_meta: Dict[str, Any] = {}
+    if previous is not None:
+        # Keep the parameters the existing index was actually built with.
+        previous_meta = json.loads((previous_dir / "meta.json").read_text(encoding="utf-8"))
+        spec = replace(
+            IndexSpec.from_meta(previous_meta), nprobe=spec.nprobe, ef_search=spec.ef_search
+        )
+    accumulator = _IndexAccumulator(spec, index)
+    probe = _RecallProbe(recall_queries, recall_k)
+    version, out_dir = new_version(index_dir)
+    # Leased until published, so a concurrent collect_garbage leaves it alone
+    lease = acquire_lease(index_dir, version)
+    index_path = out_dir / "index.faiss"
+    meta_path = out_dir / "meta.json"
+    store = ChunkStoreWriter(str(out_dir))
+    bm25 = BM25Writer(str(out_dir)) if lexical_index else None
+    vectors = (
+        ExactVectorWriter(
+            str(out_dir), dimension=dim, previous_dir=str(previous_dir) if previous else None
+        )
+        if spec.store_vectors
+        else None
+    )
+    try:
+        for x in executor.map(texts_to_embed(store, bm25)):
+            ids = pending_ids.popleft()
+            if dim is None:
+                dim = int(x.shape[1])
+            if x.shape[1] != dim:
+                raise RuntimeError(
+                    f"Embedding dim changed: {dim} -> {x.shape[1]}. Rebuild the index."
+                )
+            faiss.normalize_L2(x)
+            accumulator.add(x, ids)
+            if vectors is not None:
+                vectors.write(ids, x)
+            if not spec.is_exact:
+                probe.observe(x, ids)
+
+        if num_chunks == 0:
+            raise ValueError("No chunks provided for indexing.")
+
+        index = accumulator.finish()
+        spec = accumulator.spec
+        assert index is not None and dim is not None
+
+        kept = {c.vector_id for c in manifest_chunks.values()}
+        stale = (
+            [c.vector_id for c in previous.chunks.values() if c.vector_id not in kept]
+            if previous
+            else []
+        )
+        if stale:
+            if spec.supports_remove:
+                index.remove_ids(np.array(stale, dtype="int64"))
+            else:
+                index = _rebuild_without(index, stale, spec)
+
+        # Only meaningful when every indexed vector went through the probe.
+        # Incremental runs keep the last full-build measurement ("num_vectors" says when).
+        recall = previous_meta.get("recall")
+        if not spec.is_exact and embedded == num_chunks:
+            recall = probe.measure(index, spec)
+        if recall is not None:
+            logger.info(
+                "%s recall@%d = %.4f over %d queries (p50 %.2f ms)",
+                spec.kind,
+                recall["k"],
+                recall["recall_at_k"],
+                recall["queries"],
+                recall["latency_ms_p50"],
+            )
+
+        # 4) Persist FAISS index + chunk store into the new (unpublished) version
+        faiss.write_index(index, str(index_path))
+        store.commit(next_vector_id)
+        if vectors is not None:
+            vectors.commit(next_vector_id)
+        if bm25 is not None:
+            bm25.commit()
+
+        # 5) Persist manifest
+        manifest = IndexManifest(
+            embedding_model=embedding_model,
+            dimension=dim,
+            next_vector_id=next_vector_id,
+            documents=dict(document_hashes or {}),
+            chunks=manifest_chunks,
+        )
+        manifest.save(str(out_dir))
+
+        # 6) Persist meta
+        meta = {
+            "version": version,
+            "embedding_model": embedding_model,
+            "embedder": embedder.identity(),
+            "dimension": dim,
+            "num_chunks": num_chunks,
+            "faiss_index": type(faiss.downcast_index(index.index)).__name__,
+            "index": spec.to_meta(),
+            "index_requested": requested_spec.build_key(),
+            "recall": recall,
+            "chunk_store": "binary-v1",
+            "index_file_bytes": index_path.stat().st_size,
+            "bytes_per_vector": index_path.stat().st_size / max(1, index.ntotal),
+            "exact_vectors": VECTORS_FILENAME if vectors is not None else None,
+            "lexical": {"kind": "bm25", "k1": BM25_K1, "b": BM25_B} if bm25 is not None else None,
+            "mmap_loadable": _mmap_loadable(index_path),
+            "similarity": "cosine (via normalized vectors + inner product)",
+        }
+        meta_path.write_text(json.dumps(meta, indent=2), encoding="utf-8")
+
+        # 7) Publish: one atomic rename switches readers to the new version
+        publish_version(index_dir, version)
+    except BaseException:
+        store.abort()
+        if vectors is not None:
+            vectors.abort()
+        if bm25 is not None:
+            bm25.abort()
+        shutil.rmtree(out_dir, ignore_errors=True)
+        raise
+    finally:
+        release_lease(lease)
+
+    collect_garbage(index_dir, keep=keep_versions)
+
+    return IndexBuildStats(
+        num_chunks=num_chunks,
+        embedded=embedded,
+        reused=num_chunks - embedded,
+        removed=len(stale),
+        recall=recall,
+        version=version,
+        output_dir=str(out_dir),
+    )
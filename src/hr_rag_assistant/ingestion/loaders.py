@@ -1,35 +1,48 @@
 from __future__ import annotations
 
 from pathlib import Path
-from typing import List
+from typing import Iterator, List
 
 from hr_rag_assistant.types import HRDocument
 
 SUPPORTED_EXTS = {".md", ".txt"}
 
 
-def load_documents(raw_dir: str) -> List[HRDocument]:
+def iter_document_paths(raw_dir: str) -> Iterator[Path]:
+    """Supported files under `raw_dir`, sorted by path (this order defines chunk order)."""
     base = Path(raw_dir)
     if not base.exists():
         raise FileNotFoundError(f"RAW_DATA_DIR not found: {base.resolve()}")
 
-    docs: List[HRDocument] = []
+    found = 0
     for path in sorted(base.rglob("*")):
         if path.is_file() and path.suffix.lower() in SUPPORTED_EXTS:
-            text = path.read_text(encoding="utf-8", errors="ignore")
-            docs.append(
-                HRDocument(
-                    source=path.name,
-                    text=text,
-                    metadata={
-                        "source": path.name,
-                        "path": str(path.relative_to(base)),
-                        "ext": path.suffix.lower(),
-                    },
-                )
-            )
-
-    if not docs:
+            found += 1
+            yield path
+
+    if not found:
         raise RuntimeError(f"No .md/.txt documents found in {base.resolve()}")
 
-    return docs
\ No newline at end of file
+
+def load_document(path: Path, base: Path) -> HRDocument:
+    text = path.read_text(encoding="utf-8", errors="ignore")
+    return HRDocument(
+        source=path.name,
+        text=text,
+        metadata={
+            "source": path.name,
+            "path": str(path.relative_to(base)),
+            "ext": path.suffix.lower(),
+        },
+    )
+
+
+def iter_documents(raw_dir: str) -> Iterator[HRDocument]:
+    """Yields documents one at a time (sorted by path), so only one file is in memory."""
+    base = Path(raw_dir)
+    for path in iter_document_paths(raw_dir):
+        yield load_document(path, base)
+
+
+def load_documents(raw_dir: str) -> List[HRDocument]:
+    return list(iter_documents(raw_dir))
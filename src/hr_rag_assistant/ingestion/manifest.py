@@ -0,0 +1,125 @@
+from __future__ import annotations
+
+import hashlib
+import json
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Mapping, Optional
+
+from hr_rag_assistant.types import HRChunk, HRDocument
+
+MANIFEST_FILENAME = "manifest.json"
+MANIFEST_VERSION = 2
+
+
+def content_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def chunk_key(chunk: HRChunk) -> str:
+    """
+    Manifest key of `chunk`: like its id, but qualified by the document path
+    instead of the file name, which documents in several folders may share.
+    """
+    return f"{chunk.document}::chunk_{chunk.chunk_index:04d}"
+
+
+@dataclass(frozen=True)
+class ManifestChunk:
+    hash: str
+    vector_id: int
+    document: str
+
+
+@dataclass(frozen=True)
+class DocumentDiff:
+    added: List[str]
+    changed: List[str]
+    removed: List[str]
+    unchanged: List[str]
+
+
+@dataclass
+class IndexManifest:
+    """
+    Content hashes of everything that is currently in the index.
+
+    - documents: document path -> hash of the cleaned document text
+    - chunks: chunk_key -> (hash of chunk text, FAISS vector id, document path)
+
+    Vector ids are never reused: a new or changed chunk always gets
+    `next_vector_id`, so ids of untouched chunks stay stable across runs.
+    """
+
+    embedding_model: str
+    dimension: int
+    next_vector_id: int = 0
+    documents: Dict[str, str] = field(default_factory=dict)
+    chunks: Dict[str, ManifestChunk] = field(default_factory=dict)
+
+    @classmethod
+    def load(cls, index_dir: str) -> Optional["IndexManifest"]:
+        path = Path(index_dir) / MANIFEST_FILENAME
+        if not path.exists():
+            return None
+
+        raw = json.loads(path.read_text(encoding="utf-8"))
+        if raw.get("version") != MANIFEST_VERSION:
+            return None
+
+        return cls(
+            embedding_model=raw["embedding_model"],
+            dimension=int(raw["dimension"]),
+            next_vector_id=int(raw["next_vector_id"]),
+            documents=dict(raw.get("documents", {})),
+            chunks={
+                key: ManifestChunk(
+                    hash=row["hash"],
+                    vector_id=int(row["vector_id"]),
+                    document=row["document"],
+                )
+                for key, row in raw.get("chunks", {}).items()
+            },
+        )
+
+    def save(self, index_dir: str) -> None:
+        payload: Dict[str, Any] = {
+            "version": MANIFEST_VERSION,
+            "embedding_model": self.embedding_model,
+            "dimension": self.dimension,
+            "next_vector_id": self.next_vector_id,
+            "documents": self.documents,
+            "chunks": {
+                key: {"hash": c.hash, "vector_id": c.vector_id, "document": c.document}
+                for key, c in self.chunks.items()
+            },
+        }
+        path = Path(index_dir) / MANIFEST_FILENAME
+        path.write_text(json.dumps(payload, ensure_ascii=False), encoding="utf-8")
+
+    def diff_documents(self, docs: Iterable[HRDocument]) -> DocumentDiff:
+        return self.diff_hashes({d.document: content_hash(d.text) for d in docs})
+
+    def diff_hashes(self, document_hashes: Mapping[str, str]) -> DocumentDiff:
+        added: List[str] = []
+        changed: List[str] = []
+        unchanged: List[str] = []
+
+        for document, h in document_hashes.items():
+            old = self.documents.get(document)
+            if old is None:
+                added.append(document)
+            elif old != h:
+                changed.append(document)
+            else:
+                unchanged.append(document)
+
+        removed = sorted(s for s in self.documents if s not in document_hashes)
+        return DocumentDiff(added=added, changed=changed, removed=removed, unchanged=unchanged)
+
+    def reusable_vector_id(self, chunk: HRChunk, chunk_hash: str) -> Optional[int]:
+        """Vector id of `chunk` if the same chunk with the same text is already indexed."""
+        old = self.chunks.get(chunk_key(chunk))
+        if old is not None and old.hash == chunk_hash:
+            return old.vector_id
+        return None
@@ -0,0 +1,142 @@
+from __future__ import annotations
+
+import time
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Deque, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from hr_rag_assistant.ingestion.chunker import chunk_document, iter_chunks
+from hr_rag_assistant.ingestion.cleaner import clean_document
+from hr_rag_assistant.ingestion.loaders import iter_document_paths, iter_documents, load_document
+from hr_rag_assistant.ingestion.manifest import content_hash
+from hr_rag_assistant.types import HRChunk, HRDocument
+
+
+@dataclass
+class IngestionStats:
+    """
+    Counters filled in while the pipeline is consumed. Totals are final only
+    once the chunk iterator has been exhausted (e.g. after index building).
+    """
+
+    documents: int = 0
+    cleaned_chars: int = 0
+    chunks: int = 0
+    chunk_chars: int = 0
+    first_chunk_id: Optional[str] = None
+    document_hashes: Dict[str, str] = field(default_factory=dict)
+    started_at: float = field(default_factory=time.perf_counter)
+
+    @property
+    def avg_chunk_len(self) -> float:
+        return self.chunk_chars / self.chunks if self.chunks else 0.0
+
+    @property
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started_at
+
+    @property
+    def docs_per_sec(self) -> float:
+        return self.documents / self.elapsed if self.elapsed > 0 else 0.0
+
+    @property
+    def chars_per_sec(self) -> float:
+        return self.cleaned_chars / self.elapsed if self.elapsed > 0 else 0.0
+
+
+def _track_documents(docs: Iterable[HRDocument], stats: IngestionStats) -> Iterator[HRDocument]:
+    for d in docs:
+        stats.documents += 1
+        stats.cleaned_chars += len(d.text)
+        stats.document_hashes[d.document] = content_hash(d.text)
+        yield d
+
+
+def _track_chunks(chunks: Iterable[HRChunk], stats: IngestionStats) -> Iterator[HRChunk]:
+    for c in chunks:
+        if stats.first_chunk_id is None:
+            stats.first_chunk_id = c.id
+        stats.chunks += 1
+        stats.chunk_chars += len(c.text)
+        yield c
+
+
+def _process_path(
+    path: Path, base: Path, chunk_size: int, chunk_overlap: int
+) -> Tuple[str, str, int, List[HRChunk]]:
+    """Worker: load -> clean -> chunk one file. Returns (path, hash, cleaned chars, chunks)."""
+    doc = clean_document(load_document(path, base))
+    chunks = chunk_document(doc, chunk_size, chunk_overlap)
+    return doc.document, content_hash(doc.text), len(doc.text), chunks
+
+
+def _iter_chunks_parallel(
+    raw_dir: str,
+    *,
+    chunk_size: int,
+    chunk_overlap: int,
+    workers: int,
+    stats: IngestionStats,
+) -> Iterator[HRChunk]:
+    """
+    Spreads load/clean/chunk over `workers` processes. Results are consumed in
+    path order, so chunk ids and ordering match the single-process pipeline.
+    At most `workers * 4` documents are queued ahead of the consumer, which
+    keeps memory bounded while the embedding stage drains the output.
+    """
+    if chunk_overlap >= chunk_size:
+        raise ValueError("chunk_overlap must be smaller than chunk_size")
+
+    base = Path(raw_dir)
+    max_pending = workers * 4
+    pending: Deque[Future] = deque()
+
+    def drain_one() -> Iterator[HRChunk]:
+        document, doc_hash, chars, chunks = pending.popleft().result()
+        stats.documents += 1
+        stats.cleaned_chars += chars
+        stats.document_hashes[document] = doc_hash
+        yield from chunks
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for path in iter_document_paths(raw_dir):
+            if len(pending) >= max_pending:
+                yield from drain_one()
+            pending.append(pool.submit(_process_path, path, base, chunk_size, chunk_overlap))
+        while pending:
+            yield from drain_one()
+
+
+def iter_corpus_chunks(
+    raw_dir: str,
+    *,
+    chunk_size: int,
+    chunk_overlap: int,
+    workers: int = 0,
+    stats: Optional[IngestionStats] = None,
+) -> Iterator[HRChunk]:
+    """
+    Lazy load -> clean -> chunk pipeline over `raw_dir`.
+
+    Nothing is materialized beyond the document currently being chunked, so
+    the consumer (build_and_persist_faiss_index) controls peak memory via its
+    batch size. With `workers > 1` the CPU-bound stages run in a process pool
+    (see _iter_chunks_parallel) while the caller keeps embedding.
+    """
+    stats = stats if stats is not None else IngestionStats()
+
+    if workers > 1:
+        chunks = _iter_chunks_parallel(
+            raw_dir,
+            chunk_size=chunk_size,
+            chunk_overlap=chunk_overlap,
+            workers=workers,
+            stats=stats,
+        )
+    else:
+        docs = (clean_document(d) for d in iter_documents(raw_dir))
+        chunks = iter_chunks(_track_documents(docs, stats), chunk_size, chunk_overlap)
+
+    return _track_chunks(chunks, stats)
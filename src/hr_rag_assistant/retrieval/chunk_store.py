@@ -0,0 +1,298 @@
+from __future__ import annotations
+
+import json
+import mmap
+import os
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple, Union
+
+import numpy as np
+
+from hr_rag_assistant.types import HRChunk
+
+# Binary chunk store layout (all files live next to index.faiss):
+#   chunks.rows         fixed-size records (ROW_DTYPE), one per chunk, in chunk order
+#   chunks.txt          UTF-8 blob holding every chunk id and text
+#   chunks.vidmap       int32[next_vector_id]: FAISS vector id -> row (-1 = none)
+#   chunks.tables.json  interned sources + document-level metadata
+# Everything except the (small, per-document) tables is memory-mapped, so
+# opening the store does not depend on corpus size and an HRChunk is only
+# materialized for rows a search actually returns.
+ROWS_FILENAME = "chunks.rows"
+TEXT_FILENAME = "chunks.txt"
+VIDMAP_FILENAME = "chunks.vidmap"
+TABLES_FILENAME = "chunks.tables.json"
+LEGACY_JSONL_FILENAME = "chunks.jsonl"
+FORMAT_VERSION = 1
+
+ROW_DTYPE = np.dtype(
+    [
+        ("vector_id", "<i8"),
+        ("id_off", "<u8"),
+        ("id_len", "<u4"),
+        ("text_len", "<u4"),  # text follows the id in the blob
+        ("source", "<u4"),
+        ("meta", "<u4"),
+        ("chunk_index", "<u4"),
+        ("start_char", "<i8"),
+        ("end_char", "<i8"),
+    ]
+)
+
+# (vector ids, document group per row, (source, document metadata) per group, vector id space)
+DocumentGroups = Tuple[np.ndarray, np.ndarray, List[Tuple[str, Dict[str, Any]]], int]
+
+# Per-chunk keys the chunker adds on top of the document metadata; they are
+# rebuilt from the row instead of being stored once per chunk.
+_CHUNK_META_KEYS = ("chunk_index", "start_char", "end_char")
+
+_WRITE_BUFFER_ROWS = 4096
+
+
+class ChunkStoreWriter:
+    """
+    Streams chunks into the binary store. Files are written under *.tmp names
+    and only renamed into place by `commit()`.
+    """
+
+    def __init__(self, index_dir: str):
+        self.index_dir = Path(index_dir)
+        self._rows_tmp = self.index_dir / (ROWS_FILENAME + ".tmp")
+        self._text_tmp = self.index_dir / (TEXT_FILENAME + ".tmp")
+        self._rows_f = self._rows_tmp.open("wb")
+        self._text_f = self._text_tmp.open("wb")
+
+        self._text_off = 0
+        self._buffer: List[tuple] = []
+        self._sources: Dict[str, int] = {}
+        self._metadata_ids: Dict[str, int] = {}
+        self._metadata: List[Dict[str, Any]] = []
+        self.count = 0
+
+    def add(self, chunk: HRChunk, vector_id: int) -> None:
+        id_bytes = chunk.id.encode("utf-8")
+        text_bytes = chunk.text.encode("utf-8")
+        self._text_f.write(id_bytes)
+        self._text_f.write(text_bytes)
+
+        base_meta = {k: v for k, v in chunk.metadata.items() if k not in _CHUNK_META_KEYS}
+        meta_key = json.dumps(base_meta, ensure_ascii=False, sort_keys=True)
+        meta_id = self._metadata_ids.get(meta_key)
+        if meta_id is None:
+            meta_id = self._metadata_ids[meta_key] = len(self._metadata)
+            self._metadata.append(base_meta)
+
+        self._buffer.append(
+            (
+                vector_id,
+                self._text_off,
+                len(id_bytes),
+                len(text_bytes),
+                self._sources.setdefault(chunk.source, len(self._sources)),
+                meta_id,
+                chunk.chunk_index,
+                chunk.start_char,
+                chunk.end_char,
+            )
+        )
+        self._text_off += len(id_bytes) + len(text_bytes)
+        self.count += 1
+
+        if len(self._buffer) >= _WRITE_BUFFER_ROWS:
+            self._flush()
+
+    def _flush(self) -> None:
+        if self._buffer:
+            np.array(self._buffer, dtype=ROW_DTYPE).tofile(self._rows_f)
+            self._buffer = []
+
+    def commit(self, next_vector_id: int) -> None:
+        self._flush()
+        self._rows_f.close()
+        self._text_f.close()
+
+        # vector id -> row lookup table
+        rows = np.fromfile(self._rows_tmp, dtype=ROW_DTYPE)
+        vidmap = np.full(next_vector_id, -1, dtype="<i4")
+        vidmap[rows["vector_id"]] = np.arange(len(rows), dtype="<i4")
+        del rows
+        vidmap_tmp = self.index_dir / (VIDMAP_FILENAME + ".tmp")
+        vidmap.tofile(vidmap_tmp)
+
+        tables = {
+            "format": FORMAT_VERSION,
+            "count": self.count,
+            "sources": list(self._sources),
+            "metadata": self._metadata,
+        }
+        tables_tmp = self.index_dir / (TABLES_FILENAME + ".tmp")
+        tables_tmp.write_text(json.dumps(tables, ensure_ascii=False), encoding="utf-8")
+
+        os.replace(self._rows_tmp, self.index_dir / ROWS_FILENAME)
+        os.replace(self._text_tmp, self.index_dir / TEXT_FILENAME)
+        os.replace(vidmap_tmp, self.index_dir / VIDMAP_FILENAME)
+        os.replace(tables_tmp, self.index_dir / TABLES_FILENAME)
+        # The binary store supersedes the JSONL one.
+        (self.index_dir / LEGACY_JSONL_FILENAME).unlink(missing_ok=True)
+
+    def abort(self) -> None:
+        self._rows_f.close()
+        self._text_f.close()
+        self._rows_tmp.unlink(missing_ok=True)
+        self._text_tmp.unlink(missing_ok=True)
+
+
+class ChunkStore:
+    """Read-only, memory-mapped view of the binary chunk store."""
+
+    def __init__(self, index_dir: str):
+        self.index_dir = Path(index_dir)
+        tables = json.loads((self.index_dir / TABLES_FILENAME).read_text(encoding="utf-8"))
+        if tables.get("format") != FORMAT_VERSION:
+            raise RuntimeError(f"Unsupported chunk store format: {tables.get('format')}")
+
+        self._sources: List[str] = tables["sources"]
+        self._metadata: List[Dict[str, Any]] = tables["metadata"]
+        self._count = int(tables["count"])
+
+        self._rows = np.memmap(
+            self.index_dir / ROWS_FILENAME, dtype=ROW_DTYPE, mode="r", shape=(self._count,)
+        )
+        vidmap_path = self.index_dir / VIDMAP_FILENAME
+        n_vids = vidmap_path.stat().st_size // 4
+        self._vidmap = np.memmap(vidmap_path, dtype="<i4", mode="r", shape=(n_vids,))
+
+        with (self.index_dir / TEXT_FILENAME).open("rb") as f:
+            self._blob = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __getitem__(self, row: int) -> HRChunk:
+        r = self._rows[row]
+        id_off = int(r["id_off"])
+        id_end = id_off + int(r["id_len"])
+        text_end = id_end + int(r["text_len"])
+        chunk_index, start_char, end_char = (
+            int(r["chunk_index"]),
+            int(r["start_char"]),
+            int(r["end_char"]),
+        )
+
+        return HRChunk(
+            id=self._blob[id_off:id_end].decode("utf-8"),
+            text=self._blob[id_end:text_end].decode("utf-8"),
+            metadata={
+                **self._metadata[int(r["meta"])],
+                "chunk_index": chunk_index,
+                "start_char": start_char,
+                "end_char": end_char,
+            },
+            source=self._sources[int(r["source"])],
+            chunk_index=chunk_index,
+            start_char=start_char,
+            end_char=end_char,
+        )
+
+    def __iter__(self) -> Iterator[HRChunk]:
+        for row in range(self._count):
+            yield self[row]
+
+    def row_for_vector_id(self, vector_id: int) -> Optional[int]:
+        if not 0 <= vector_id < len(self._vidmap):
+            return None
+        row = int(self._vidmap[vector_id])
+        return row if row >= 0 else None
+
+    def get_by_vector_id(self, vector_id: int) -> HRChunk:
+        row = self.row_for_vector_id(vector_id)
+        if row is None:
+            raise KeyError(f"Unknown vector id: {vector_id}")
+        return self[row]
+
+    def document_groups(self) -> DocumentGroups:
+        """Groups rows by their interned (source, metadata) pair without decoding any text."""
+        n_meta = max(1, len(self._metadata))
+        keys = self._rows["source"].astype("int64") * n_meta + self._rows["meta"].astype("int64")
+        pairs, groups = np.unique(keys, return_inverse=True)
+        group_keys = [
+            (self._sources[int(p) // n_meta], self._metadata[int(p) % n_meta]) for p in pairs
+        ]
+        return np.asarray(self._rows["vector_id"]), groups, group_keys, len(self._vidmap)
+
+
+class JsonlChunkStore:
+    """Legacy chunks.jsonl store, fully parsed into memory."""
+
+    def __init__(self, path: Path):
+        self._chunks: List[HRChunk] = []
+        self._row_by_vector_id: Dict[int, int] = {}
+        with path.open("r", encoding="utf-8") as f:
+            for line in f:
+                row = json.loads(line)
+                # Stores written before stable vector ids: row i corresponds to vector i.
+                self._row_by_vector_id[int(row.get("vector_id", len(self._chunks)))] = len(
+                    self._chunks
+                )
+                self._chunks.append(
+                    HRChunk(
+                        id=row["id"],
+                        text=row["text"],
+                        metadata=row.get("metadata", {}),
+                        source=row["source"],
+                        chunk_index=int(row["chunk_index"]),
+                        start_char=int(row.get("start_char", 0)),
+                        end_char=int(row.get("end_char", 0)),
+                    )
+                )
+
+    def __len__(self) -> int:
+        return len(self._chunks)
+
+    def __getitem__(self, row: int) -> HRChunk:
+        return self._chunks[row]
+
+    def __iter__(self) -> Iterator[HRChunk]:
+        return iter(self._chunks)
+
+    def row_for_vector_id(self, vector_id: int) -> Optional[int]:
+        return self._row_by_vector_id.get(vector_id)
+
+    def get_by_vector_id(self, vector_id: int) -> HRChunk:
+        return self._chunks[self._row_by_vector_id[vector_id]]
+
+    def document_groups(self) -> DocumentGroups:
+        vector_ids = np.fromiter(
+            self._row_by_vector_id, dtype="int64", count=len(self._row_by_vector_id)
+        )
+        group_ids: Dict[str, int] = {}
+        group_keys: List[Tuple[str, Dict[str, Any]]] = []
+        groups = np.empty(len(vector_ids), dtype="int64")
+        for i, vid in enumerate(vector_ids.tolist()):
+            c = self._chunks[self._row_by_vector_id[vid]]
+            base = {k: v for k, v in c.metadata.items() if k not in _CHUNK_META_KEYS}
+            key = json.dumps([c.source, base], ensure_ascii=False, sort_keys=True)
+            if key not in group_ids:
+                group_ids[key] = len(group_keys)
+                group_keys.append((c.source, base))
+            groups[i] = group_ids[key]
+        return vector_ids, groups, group_keys, int(vector_ids.max()) + 1 if len(vector_ids) else 0
+
+
+AnyChunkStore = Union[ChunkStore, JsonlChunkStore]
+
+
+def chunk_store_exists(index_dir: str) -> bool:
+    d = Path(index_dir)
+    return (d / TABLES_FILENAME).exists() or (d / LEGACY_JSONL_FILENAME).exists()
+
+
+def open_chunk_store(index_dir: str) -> AnyChunkStore:
+    d = Path(index_dir)
+    if (d / TABLES_FILENAME).exists():
+        return ChunkStore(index_dir)
+    if (d / LEGACY_JSONL_FILENAME).exists():
+        return JsonlChunkStore(d / LEGACY_JSONL_FILENAME)
+    raise FileNotFoundError(
+        f"Missing chunks store in {d} (expected {TABLES_FILENAME} or {LEGACY_JSONL_FILENAME})"
+    )
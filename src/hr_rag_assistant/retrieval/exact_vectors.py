@@ -0,0 +1,86 @@
+from __future__ import annotations
+
+import os
+import shutil
+from pathlib import Path
+from typing import BinaryIO, Optional
+
+import numpy as np
+
+# float16 copy of every L2-normalized embedding, row = FAISS vector id.
+# Written when IndexSpec.store_vectors is set and memory-mapped at query time
+# to rescore candidates from a quantized index with (near) exact cosine.
+VECTORS_FILENAME = "vectors.f16"
+VECTOR_DTYPE = np.dtype("<f2")
+
+
+class ExactVectorWriter:
+    """
+    Writes vectors at the offset of their vector id. Incremental runs start
+    from a copy of the file in `previous_dir`, so reused vectors are kept; the
+    new file is only renamed into place by `commit()`.
+    """
+
+    def __init__(
+        self, index_dir: str, *, dimension: Optional[int] = None, previous_dir: Optional[str] = None
+    ):
+        self.index_dir = Path(index_dir)
+        self.dimension = dimension
+        self._path = self.index_dir / VECTORS_FILENAME
+        self._tmp = self.index_dir / (VECTORS_FILENAME + ".tmp")
+
+        previous = Path(previous_dir) / VECTORS_FILENAME if previous_dir else None
+        if previous is not None and previous.exists():
+            shutil.copyfile(previous, self._tmp)
+        else:
+            self._tmp.unlink(missing_ok=True)
+            self._tmp.touch()
+        self._f: BinaryIO = self._tmp.open("r+b")
+
+    def write(self, ids: np.ndarray, x: np.ndarray) -> None:
+        if self.dimension is None:
+            self.dimension = int(x.shape[1])
+        row_bytes = self.dimension * VECTOR_DTYPE.itemsize
+        codes = x.astype(VECTOR_DTYPE)
+
+        # Ids of one batch are consecutive, so this is usually a single write.
+        start = 0
+        for i in range(1, len(ids) + 1):
+            if i == len(ids) or ids[i] != ids[i - 1] + 1:
+                self._f.seek(int(ids[start]) * row_bytes)
+                self._f.write(codes[start:i].tobytes())
+                start = i
+
+    def commit(self, next_vector_id: int) -> None:
+        if self.dimension is not None:
+            self._f.truncate(next_vector_id * self.dimension * VECTOR_DTYPE.itemsize)
+        self._f.close()
+        os.replace(self._tmp, self._path)
+
+    def abort(self) -> None:
+        self._f.close()
+        self._tmp.unlink(missing_ok=True)
+
+
+class ExactVectors:
+    """Read-only, memory-mapped vectors.f16."""
+
+    def __init__(self, index_dir: str, dimension: int):
+        path = Path(index_dir) / VECTORS_FILENAME
+        rows = path.stat().st_size // (dimension * VECTOR_DTYPE.itemsize)
+        self.dimension = dimension
+        self._x = np.memmap(path, dtype=VECTOR_DTYPE, mode="r", shape=(rows, dimension))
+
+    def __len__(self) -> int:
+        return int(self._x.shape[0])
+
+    def vectors(self, vector_ids: np.ndarray) -> np.ndarray:
+        return self._x[vector_ids].astype("float32")
+
+    def scores(self, query: np.ndarray, vector_ids: np.ndarray) -> np.ndarray:
+        """Cosine similarity of a normalized (dim,) query to each vector id."""
+        return self.vectors(vector_ids) @ query.astype("float32")
+
+
+def exact_vectors_exist(index_dir: str) -> bool:
+    return (Path(index_dir) / VECTORS_FILENAME).exists()
@@ -0,0 +1,160 @@
+from __future__ import annotations
+
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Sequence, Tuple, Union
+
+import faiss
+import numpy as np
+
+# Resolved filters kept per store (each holds one bitmap of next_vector_id bits).
+_SELECTOR_CACHE_SIZE = 256
+
+
+def _as_tuple(values: Union[None, str, Iterable[str]]) -> Tuple[str, ...]:
+    if values is None:
+        return ()
+    if isinstance(values, str):
+        return (values,)
+    return tuple(values)
+
+
+@dataclass(frozen=True, init=False)
+class MetadataFilter:
+    """
+    Restricts a search to chunks whose document matches every given field:
+
+    - sources:       document file names (metadata["source"]), any of them
+    - path_prefixes: prefixes of metadata["path"], e.g. "de/" for a country folder
+    - equals:        exact metadata values, e.g. {"ext": ".md"}
+
+    Empty fields are ignored, so MetadataFilter() matches everything.
+    """
+
+    sources: Tuple[str, ...] = ()
+    path_prefixes: Tuple[str, ...] = ()
+    equals: Tuple[Tuple[str, Any], ...] = ()
+
+    def __init__(
+        self,
+        sources: Union[None, str, Iterable[str]] = None,
+        path_prefixes: Union[None, str, Iterable[str]] = None,
+        equals: Union[None, Mapping[str, Any], Iterable[Tuple[str, Any]]] = None,
+    ):
+        # Normalized to sorted tuples so equal filters hash equal (selector cache key).
+        items = equals.items() if isinstance(equals, Mapping) else (equals or ())
+        object.__setattr__(self, "sources", tuple(sorted(set(_as_tuple(sources)))))
+        object.__setattr__(
+            self,
+            "path_prefixes",
+            tuple(sorted({p.replace("\\", "/") for p in _as_tuple(path_prefixes)})),
+        )
+        object.__setattr__(self, "equals", tuple(sorted(items)))
+
+    @property
+    def is_empty(self) -> bool:
+        return not (self.sources or self.path_prefixes or self.equals)
+
+    def matches(self, source: str, metadata: Mapping[str, Any]) -> bool:
+        if self.sources and source not in self.sources:
+            return False
+        if self.path_prefixes:
+            path = str(metadata.get("path", "")).replace("\\", "/")
+            if not any(path.startswith(p) for p in self.path_prefixes):
+                return False
+        return all(metadata.get(k) == v for k, v in self.equals)
+
+
+@dataclass(frozen=True)
+class ResolvedFilter:
+    """Matching vector ids plus a FAISS selector over them (keeps the bitmap alive)."""
+
+    vector_ids: np.ndarray
+    selector: faiss.IDSelector
+    bitmap: np.ndarray
+
+    @property
+    def count(self) -> int:
+        return len(self.vector_ids)
+
+
+class FilterIndex:
+    """
+    Vector ids grouped by document, precomputed when a store is opened.
+
+    A chunk store row carries an interned (source, document metadata) pair,
+    so a filter is evaluated once per document rather than once per chunk;
+    the ids of matching documents are concatenated into a bitmap over the
+    vector id space and wrapped in an IDSelectorBitmap, which FAISS checks in
+    O(1) per candidate during the search itself. Resolved filters are cached.
+    """
+
+    def __init__(
+        self,
+        vector_ids: np.ndarray,
+        groups: np.ndarray,
+        group_keys: Sequence[Tuple[str, Mapping[str, Any]]],
+        id_space: int,
+    ):
+        """
+        `groups[i]` indexes `group_keys` ((source, metadata) of the document)
+        for the chunk with `vector_ids[i]`; `id_space` is next_vector_id.
+        """
+        order = np.argsort(groups, kind="stable")
+        bounds = np.searchsorted(groups[order], np.arange(len(group_keys) + 1))
+        sorted_ids = vector_ids[order].astype("int64")
+
+        self._group_keys = list(group_keys)
+        self._group_ids: List[np.ndarray] = [
+            sorted_ids[bounds[g] : bounds[g + 1]] for g in range(len(group_keys))
+        ]
+        self.id_space = int(id_space)
+
+        self._cache: "OrderedDict[MetadataFilter, ResolvedFilter]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def resolve(self, flt: MetadataFilter) -> ResolvedFilter:
+        with self._lock:
+            hit = self._cache.get(flt)
+            if hit is not None:
+                self._cache.move_to_end(flt)
+                return hit
+
+        parts = [
+            ids
+            for (source, meta), ids in zip(self._group_keys, self._group_ids)
+            if flt.matches(source, meta)
+        ]
+        vector_ids = np.sort(np.concatenate(parts)) if parts else np.zeros(0, dtype="int64")
+
+        mask = np.zeros(max(self.id_space, 1), dtype=bool)
+        mask[vector_ids] = True
+        bitmap = np.packbits(mask, bitorder="little")
+        resolved = ResolvedFilter(
+            vector_ids=vector_ids,
+            selector=faiss.IDSelectorBitmap(len(mask), faiss.swig_ptr(bitmap)),
+            bitmap=bitmap,
+        )
+
+        with self._lock:
+            self._cache[flt] = resolved
+            while len(self._cache) > _SELECTOR_CACHE_SIZE:
+                self._cache.popitem(last=False)
+        return resolved
+
+
+FilterLike = Union[MetadataFilter, Mapping[str, Any]]
+
+
+def as_filter(value: Optional[FilterLike]) -> Optional[MetadataFilter]:
+    """
+    Accepts a MetadataFilter or a plain dict such as
+    {"source": "remote_work_policy.md"} / {"path_prefix": "de/", "ext": ".md"}.
+    """
+    if value is None or isinstance(value, MetadataFilter):
+        return value
+    rest: Dict[str, Any] = dict(value)
+    sources = _as_tuple(rest.pop("source", None)) + _as_tuple(rest.pop("sources", None))
+    prefixes = _as_tuple(rest.pop("path_prefix", None)) + _as_tuple(rest.pop("path_prefixes", None))
+    return MetadataFilter(sources=sources, path_prefixes=prefixes, equals=rest)
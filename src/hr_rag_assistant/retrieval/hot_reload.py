@@ -0,0 +1,95 @@
+from __future__ import annotations
+
+import threading
+from typing import Any, List, Optional
+
+from hr_rag_assistant.logging import get_logger
+from hr_rag_assistant.retrieval.vectorstore import FaissVectorStore, RetrievedChunk
+from hr_rag_assistant.retrieval.versioning import current_version
+
+logger = get_logger(__name__)
+
+
+class HotReloadingVectorStore:
+    """
+    FaissVectorStore that follows the CURRENT pointer of a versioned index dir.
+
+    A daemon thread checks CURRENT every `poll_interval` seconds. When a new
+    version is published it is opened in that thread and then swapped in with
+    a single reference assignment, so queries never wait for a load: in-flight
+    searches finish on the store they started with, and the old store (and its
+    lease on the old version) is released once the last of them returns.
+
+    Other attributes (meta, chunks, dimension, load_stats, ...) are read from
+    the current store.
+    """
+
+    def __init__(self, index_dir: str, *, poll_interval: float = 5.0, **store_kwargs: Any):
+        if poll_interval <= 0:
+            raise ValueError("poll_interval must be > 0")
+
+        self.root_dir = index_dir
+        self.poll_interval = poll_interval
+        self._store_kwargs = store_kwargs
+        self._store = FaissVectorStore(index_dir, **store_kwargs)
+        self._reload_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._watch, name="index-reload", daemon=True)
+        self._thread.start()
+
+    @property
+    def store(self) -> FaissVectorStore:
+        return self._store
+
+    @property
+    def version(self) -> Optional[str]:
+        return self._store.version
+
+    def __getattr__(self, name: str) -> Any:
+        # Only called for attributes not defined here.
+        if name == "_store":
+            raise AttributeError(name)
+        return getattr(self._store, name)
+
+    def search(
+        self, query_vector: List[float], top_k: int = 5, **kwargs: Any
+    ) -> List[RetrievedChunk]:
+        return self._store.search(query_vector, top_k=top_k, **kwargs)
+
+    def search_batch(
+        self, query_vectors: Any, top_k: int = 5, **kwargs: Any
+    ) -> List[List[RetrievedChunk]]:
+        return self._store.search_batch(query_vectors, top_k=top_k, **kwargs)
+
+    def search_lexical(self, query: str, top_k: int = 5, **kwargs: Any) -> List[RetrievedChunk]:
+        return self._store.search_lexical(query, top_k=top_k, **kwargs)
+
+    def reload(self) -> bool:
+        """Swaps in the published version if it changed. Returns True if it did."""
+        with self._reload_lock:
+            published = current_version(self.root_dir)
+            if published is None or published == self._store.version:
+                return False
+
+            new_store = FaissVectorStore(self.root_dir, **self._store_kwargs)
+            old_version = self._store.version
+            self._store = new_store
+        logger.info(
+            "Index %s: switched from version %s to %s",
+            self.root_dir,
+            old_version,
+            new_store.version,
+        )
+        return True
+
+    def _watch(self) -> None:
+        while not self._stop.wait(self.poll_interval):
+            try:
+                self.reload()
+            except Exception as e:
+                # Keep serving the loaded version; try again on the next tick.
+                logger.warning("Index %s: reload failed (%s)", self.root_dir, e)
+
+    def close(self) -> None:
+        self._stop.set()
+        self._thread.join(timeout=self.poll_interval + 1)
@@ -0,0 +1,63 @@
+from __future__ import annotations
+
+from dataclasses import replace
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from hr_rag_assistant.retrieval.lexical import STOPWORDS, words
+from hr_rag_assistant.retrieval.vectorstore import RetrievedChunk
+
+RETRIEVAL_MODES = ("dense", "hybrid")
+
+# (shard, document path, chunk id), see hit_key
+HitKey = Tuple[Optional[str], str, str]
+
+# Standard RRF constant: damps the influence of the very first ranks.
+RRF_K = 60
+
+# Longest query still treated as a keyword lookup ("PTO carryover").
+KEYWORD_MAX_TERMS = 4
+
+
+def reciprocal_rank_fusion(
+    ranked_lists: Sequence[Sequence[RetrievedChunk]], top_k: int, k: int = RRF_K
+) -> List[RetrievedChunk]:
+    """
+    Fuses ranked hit lists by sum(1 / (k + rank)) per chunk. Only ranks are
+    used, so cosine and BM25 scores never have to be put on one scale; a
+    chunk found by both searches beats one found by a single search at a
+    similar rank. Returned scores are the fused scores.
+    """
+    fused: Dict[HitKey, float] = {}
+    chunks: Dict[HitKey, RetrievedChunk] = {}
+    for hits in ranked_lists:
+        for rank, hit in enumerate(hits, start=1):
+            key = hit_key(hit)
+            fused[key] = fused.get(key, 0.0) + 1.0 / (k + rank)
+            chunks.setdefault(key, hit)
+
+    best = sorted(fused, key=lambda key: -fused[key])[:top_k]
+    return [replace(chunks[key], score=fused[key]) for key in best]
+
+
+def hit_key(hit: RetrievedChunk) -> HitKey:
+    """
+    Identity of a hit across searches of one store: chunk ids repeat across
+    documents with the same file name (de/leave.md, fr/leave.md) and across
+    shards, so the document path and the shard are part of it.
+    """
+    return hit.shard, hit.chunk.document, hit.chunk.id
+
+
+def keyword_terms(query: str, max_terms: int = KEYWORD_MAX_TERMS) -> List[str]:
+    """
+    Terms of a keyword-style query ("probation", "PTO", "medical certificate"),
+    or [] for anything that reads like a sentence: questions, queries with
+    function words, or more than `max_terms` words. Keyword queries are what
+    BM25 answers best and need no embedding.
+    """
+    if "?" in query:
+        return []
+    tokens = words(query)
+    if not tokens or len(tokens) > max_terms or any(t in STOPWORDS for t in tokens):
+        return []
+    return tokens
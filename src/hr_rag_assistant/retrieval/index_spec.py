@@ -0,0 +1,150 @@
+from __future__ import annotations
+
+from dataclasses import asdict, dataclass, replace
+from typing import Any, Dict, Optional
+
+import faiss
+
+INDEX_KINDS = ("flat", "ivf_flat", "ivf_pq", "hnsw")
+QUANTIZERS = ("none", "fp16", "int8")
+_SQ_CODES = {"none": "Flat", "fp16": "SQfp16", "int8": "SQ8"}
+
+# Vectors used to train int8 scalar-quantizer ranges (no IVF involved).
+SQ_TRAIN_SIZE = 8192
+
+# FAISS warns below ~39 training points per centroid.
+MIN_POINTS_PER_CENTROID = 39
+
+
+@dataclass(frozen=True)
+class IndexSpec:
+    """
+    Which FAISS index to build and how to search it.
+
+    Build parameters:
+      - flat:     exact inner-product scan (no parameters)
+      - ivf_flat: `nlist` inverted lists over full vectors
+      - ivf_pq:   `nlist` lists over `pq_m` x `pq_nbits` product-quantized codes
+      - hnsw:     graph with `hnsw_m` links per node, built with `ef_construction`
+    Query-time knobs: `nprobe` (IVF) and `ef_search` (HNSW).
+
+    Storage: `quantizer` stores flat/IVF/HNSW vectors as float16 ("fp16", 2x
+    smaller) or 8-bit scalar codes ("int8", 4x smaller). `store_vectors`
+    additionally writes a float16 copy of the exact vectors (vectors.f16)
+    that FaissVectorStore uses to rescore the top candidates.
+
+    All kinds are wrapped in IndexIDMap2 so vector ids stay stable.
+    """
+
+    kind: str = "flat"
+    nlist: int = 1024
+    pq_m: int = 16
+    pq_nbits: int = 8
+    hnsw_m: int = 32
+    ef_construction: int = 200
+    nprobe: int = 16
+    ef_search: int = 128
+    quantizer: str = "none"
+    store_vectors: bool = False
+
+    def __post_init__(self) -> None:
+        if self.kind not in INDEX_KINDS:
+            raise ValueError(f"Unknown index kind {self.kind!r}; expected one of {INDEX_KINDS}")
+        if self.quantizer not in QUANTIZERS:
+            raise ValueError(f"Unknown quantizer {self.quantizer!r}; expected one of {QUANTIZERS}")
+        if self.kind == "ivf_pq" and self.quantizer != "none":
+            raise ValueError("ivf_pq is already quantized; use quantizer='none'")
+
+    @property
+    def is_ivf(self) -> bool:
+        return self.kind in ("ivf_flat", "ivf_pq")
+
+    @property
+    def is_exact(self) -> bool:
+        """Flat float32 search returns exact cosine scores (no recall to measure)."""
+        return self.kind == "flat" and self.quantizer == "none"
+
+    @property
+    def needs_training(self) -> bool:
+        return self.is_ivf or self.quantizer == "int8"
+
+    @property
+    def supports_remove(self) -> bool:
+        return self.kind != "hnsw"
+
+    @property
+    def train_size(self) -> int:
+        """Vectors buffered before training (0 if the kind needs no training)."""
+        if not self.needs_training:
+            return 0
+        if not self.is_ivf:
+            return SQ_TRAIN_SIZE
+        points = self.nlist * MIN_POINTS_PER_CENTROID
+        if self.kind == "ivf_pq":
+            points = max(points, (2**self.pq_nbits) * MIN_POINTS_PER_CENTROID)
+        return points
+
+    def build_key(self) -> Dict[str, Any]:
+        """Parameters that define the stored index (changing them requires a rebuild)."""
+        key: Dict[str, Any] = {"kind": self.kind}
+        # Only recorded when set, so indexes built before quantization existed stay reusable.
+        if self.quantizer != "none":
+            key["quantizer"] = self.quantizer
+        if self.store_vectors:
+            key["store_vectors"] = True
+        if self.is_ivf:
+            key["nlist"] = self.nlist
+        if self.kind == "ivf_pq":
+            key.update(pq_m=self.pq_m, pq_nbits=self.pq_nbits)
+        if self.kind == "hnsw":
+            key.update(hnsw_m=self.hnsw_m, ef_construction=self.ef_construction)
+        return key
+
+    def adapted_to(self, num_train: int) -> "IndexSpec":
+        """
+        Shrinks IVF/PQ parameters that the available training data cannot
+        support; falls back to flat when there is too little data to train.
+        """
+        if not self.is_ivf:
+            return self
+        if self.kind == "ivf_pq" and num_train < 2**self.pq_nbits:
+            return replace(self, kind="flat")
+        nlist = min(self.nlist, max(1, num_train // MIN_POINTS_PER_CENTROID))
+        return replace(self, nlist=nlist)
+
+    def create(self, dim: int) -> faiss.Index:
+        if self.kind == "ivf_pq" and dim % self.pq_m != 0:
+            raise ValueError(f"pq_m={self.pq_m} must divide the embedding dimension {dim}")
+
+        codes = _SQ_CODES[self.quantizer]
+        description = {
+            "flat": f"IDMap2,{codes}",
+            "ivf_flat": f"IDMap2,IVF{self.nlist},{codes}",
+            "ivf_pq": f"IDMap2,IVF{self.nlist},PQ{self.pq_m}x{self.pq_nbits}",
+            "hnsw": f"IDMap2,HNSW{self.hnsw_m},{codes}",
+        }[self.kind]
+        index = faiss.index_factory(dim, description, faiss.METRIC_INNER_PRODUCT)
+
+        if self.kind == "hnsw":
+            faiss.downcast_index(index.index).hnsw.efConstruction = self.ef_construction
+        return index
+
+    def search_params(
+        self, sel: Optional[faiss.IDSelector] = None
+    ) -> Optional[faiss.SearchParameters]:
+        if self.is_ivf:
+            return faiss.SearchParametersIVF(nprobe=self.nprobe, sel=sel)
+        if self.kind == "hnsw":
+            return faiss.SearchParametersHNSW(efSearch=self.ef_search, sel=sel)
+        if sel is not None:
+            return faiss.SearchParameters(sel=sel)
+        return None
+
+    def to_meta(self) -> Dict[str, Any]:
+        return asdict(self)
+
+    @classmethod
+    def from_meta(cls, meta: Dict[str, Any]) -> "IndexSpec":
+        # Indexes built before index types were configurable are flat.
+        raw = meta.get("index") or {"kind": "flat"}
+        return cls(**{k: v for k, v in raw.items() if k in cls.__dataclass_fields__})
@@ -0,0 +1,264 @@
+from __future__ import annotations
+
+import json
+import os
+import re
+from array import array
+from collections import Counter
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+# BM25 inverted index, written next to index.faiss:
+#   bm25.terms.json   vocabulary: term -> [first posting, end posting, idf],
+#                     plus the parameters the weights were computed with
+#   bm25.postings     POSTING_DTYPE records grouped by term
+# Each posting already holds the full BM25 weight of the term in that chunk
+# (idf * saturated tf with length normalization), so a query only sums the
+# postings of its terms. The postings file is memory-mapped.
+TERMS_FILENAME = "bm25.terms.json"
+POSTINGS_FILENAME = "bm25.postings"
+FORMAT_VERSION = 1
+
+POSTING_DTYPE = np.dtype([("vector_id", "<i8"), ("weight", "<f4")])
+
+# Sorted runs BM25Writer spills while ingesting (removed on commit / abort)
+RUN_PREFIX = "bm25.run"
+RUN_DTYPE = np.dtype([("term", "<i4"), ("vector_id", "<i8"), ("tf", "<i4"), ("doc_len", "<i4")])
+
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+_TOKEN_RE = re.compile(r"\w+")
+
+# Function words carry no policy meaning and would make every query match
+# every chunk. Kept short on purpose: "leave", "notice", "days" must stay.
+STOPWORDS = frozenset(
+    """
+    a about am an and any are as at be been being but by can could did do does
+    for from had has have how i if in into is it its me my no not of on or our
+    should so than that the their them then there these they this to was we
+    were what when where which who why will with would you your
+    """.split()
+)
+
+
+def words(text: str) -> List[str]:
+    """Case-folded word tokens ("PTO" -> "pto")."""
+    return _TOKEN_RE.findall(text.casefold())
+
+
+def tokenize(text: str) -> List[str]:
+    """Index terms of `text`: its words without stopwords."""
+    return [t for t in words(text) if t not in STOPWORDS]
+
+
+class BM25Writer:
+    """
+    Collects term frequencies while chunks are streamed into the chunk store
+    and writes the inverted index on `commit()` (under *.tmp names first,
+    like ChunkStoreWriter). Postings are buffered in compact arrays and
+    spilled to a sorted run file every `max_buffered_postings`; `commit()`
+    merges the runs term block by term block, so memory stays bounded by
+    the buffer size plus the vocabulary, not by the corpus.
+    """
+
+    def __init__(
+        self,
+        index_dir: str,
+        *,
+        k1: float = BM25_K1,
+        b: float = BM25_B,
+        max_buffered_postings: int = 1_000_000,
+    ):
+        if max_buffered_postings < 1:
+            raise ValueError("max_buffered_postings must be >= 1")
+        self.index_dir = Path(index_dir)
+        self.k1 = k1
+        self.b = b
+        self.max_buffered_postings = max_buffered_postings
+        self._term_ids: Dict[str, int] = {}
+        self._df = array("q")
+        self._num_docs = 0
+        self._total_len = 0
+        self._runs: List[Path] = []
+        self._reset_buffer()
+
+    @property
+    def buffered_postings(self) -> int:
+        return len(self._buf_terms)
+
+    def add(self, text: str, vector_id: int) -> None:
+        tokens = tokenize(text)
+        self._num_docs += 1
+        self._total_len += len(tokens)
+        for term, tf in Counter(tokens).items():
+            tid = self._term_ids.get(term)
+            if tid is None:
+                tid = self._term_ids[term] = len(self._term_ids)
+                self._df.append(0)
+            self._df[tid] += 1
+            self._buf_terms.append(tid)
+            self._buf_ids.append(vector_id)
+            self._buf_tf.append(tf)
+            self._buf_len.append(len(tokens))
+        if len(self._buf_terms) >= self.max_buffered_postings:
+            self._spill()
+
+    def commit(self) -> None:
+        self._spill()
+        num_docs = self._num_docs
+        avg_len = self._total_len / max(1, num_docs)
+
+        # Postings of term id t end up at [offsets[t], offsets[t + 1])
+        df = np.frombuffer(self._df, dtype="int64") if self._df else np.zeros(0, dtype="int64")
+        offsets = np.concatenate([[0], np.cumsum(df)]).astype("int64")
+        idf = np.log(1.0 + (num_docs - df + 0.5) / (df + 0.5))
+        runs = [np.memmap(path, dtype=RUN_DTYPE, mode="r") for path in self._runs]
+
+        postings_tmp = self.index_dir / (POSTINGS_FILENAME + ".tmp")
+        with open(postings_tmp, "wb") as out:
+            start = 0
+            while start < len(df):
+                # A block of whole terms holding at most max_buffered_postings
+                # postings (or a single, more frequent term)
+                limit = offsets[start] + self.max_buffered_postings
+                end = max(start + 1, int(np.searchsorted(offsets, limit, side="right")) - 1)
+                parts = []
+                for run in runs:
+                    lo, hi = np.searchsorted(run["term"], [start, end])
+                    parts.append(run[lo:hi])
+                block = np.concatenate(parts)
+                block = block[np.argsort(block["term"], kind="stable")]
+
+                tf = block["tf"].astype("float32")
+                dl = block["doc_len"].astype("float32")
+                norm = self.k1 * (1.0 - self.b + self.b * dl / max(avg_len, 1e-9))
+                records = np.empty(len(block), dtype=POSTING_DTYPE)
+                records["vector_id"] = block["vector_id"]
+                records["weight"] = idf[block["term"]] * tf * (self.k1 + 1.0) / (tf + norm)
+                records.tofile(out)
+                start = end
+        del runs
+
+        terms = {
+            term: [int(offsets[tid]), int(offsets[tid + 1]), float(idf[tid])]
+            for term, tid in self._term_ids.items()
+        }
+        terms_tmp = self.index_dir / (TERMS_FILENAME + ".tmp")
+        terms_tmp.write_text(
+            json.dumps(
+                {
+                    "format": FORMAT_VERSION,
+                    "k1": self.k1,
+                    "b": self.b,
+                    "num_docs": num_docs,
+                    "avg_doc_len": avg_len,
+                    "terms": terms,
+                },
+                ensure_ascii=False,
+            ),
+            encoding="utf-8",
+        )
+        os.replace(postings_tmp, self.index_dir / POSTINGS_FILENAME)
+        os.replace(terms_tmp, self.index_dir / TERMS_FILENAME)
+        self._remove_runs()
+
+    def abort(self) -> None:
+        self._remove_runs()
+        for name in (POSTINGS_FILENAME, TERMS_FILENAME):
+            (self.index_dir / (name + ".tmp")).unlink(missing_ok=True)
+
+    def _reset_buffer(self) -> None:
+        self._buf_terms = array("i")
+        self._buf_ids = array("q")
+        self._buf_tf = array("i")
+        self._buf_len = array("i")
+
+    def _spill(self) -> None:
+        """Writes the buffered postings, sorted by term id, as one run file."""
+        n = len(self._buf_terms)
+        if n == 0:
+            return
+        run = np.empty(n, dtype=RUN_DTYPE)
+        run["term"] = np.frombuffer(self._buf_terms, dtype="int32")
+        run["vector_id"] = np.frombuffer(self._buf_ids, dtype="int64")
+        run["tf"] = np.frombuffer(self._buf_tf, dtype="int32")
+        run["doc_len"] = np.frombuffer(self._buf_len, dtype="int32")
+        # Stable: postings of a term stay in the order chunks were added
+        run = run[np.argsort(run["term"], kind="stable")]
+        path = self.index_dir / f"{RUN_PREFIX}{len(self._runs):05d}.tmp"
+        run.tofile(path)
+        self._runs.append(path)
+        self._reset_buffer()
+
+    def _remove_runs(self) -> None:
+        for path in self._runs:
+            path.unlink(missing_ok=True)
+        self._runs = []
+        self._reset_buffer()
+
+
+class BM25Index:
+    """Read-only BM25 index over the chunks of one snapshot."""
+
+    def __init__(self, index_dir: str):
+        self.index_dir = Path(index_dir)
+        tables = json.loads((self.index_dir / TERMS_FILENAME).read_text(encoding="utf-8"))
+        if tables.get("format") != FORMAT_VERSION:
+            raise RuntimeError(f"Unsupported BM25 index format: {tables.get('format')}")
+
+        self.k1 = float(tables["k1"])
+        self.b = float(tables["b"])
+        self.num_docs = int(tables["num_docs"])
+        self._terms: Dict[str, List[float]] = tables["terms"]
+
+        path = self.index_dir / POSTINGS_FILENAME
+        count = path.stat().st_size // POSTING_DTYPE.itemsize
+        # np.memmap cannot map an empty file
+        self._postings = (
+            np.memmap(path, dtype=POSTING_DTYPE, mode="r", shape=(count,))
+            if count
+            else np.zeros(0, dtype=POSTING_DTYPE)
+        )
+
+    def __contains__(self, term: str) -> bool:
+        return term in self._terms
+
+    def idf(self, term: str) -> float:
+        entry = self._terms.get(term)
+        return float(entry[2]) if entry else 0.0
+
+    def search(
+        self, terms: Sequence[str], top_k: int, allowed: Optional[np.ndarray] = None
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        (scores, vector ids) of the top_k chunks for the given query terms,
+        best first; only chunks that contain at least one term are returned.
+        `allowed` (sorted vector ids) restricts the result, e.g. to a filter.
+        """
+        slices = [self._terms[t] for t in dict.fromkeys(terms) if t in self._terms]
+        if not slices:
+            return np.zeros(0, dtype="float32"), np.zeros(0, dtype="int64")
+
+        postings = np.concatenate([self._postings[int(s) : int(e)] for s, e, _ in slices])
+        ids, weights = postings["vector_id"], postings["weight"]
+        if allowed is not None:
+            keep = np.isin(ids, allowed)
+            ids, weights = ids[keep], weights[keep]
+
+        # Sum the weights of each chunk over the query terms
+        unique_ids, inverse = np.unique(ids, return_inverse=True)
+        scores = np.bincount(inverse, weights=weights, minlength=len(unique_ids))
+        if len(scores) > top_k:
+            top = np.argpartition(-scores, top_k - 1)[:top_k]
+        else:
+            top = np.arange(len(scores))
+        # Ties are broken by vector id (= ingestion order) for stable results
+        order = top[np.lexsort((unique_ids[top], -scores[top]))]
+        return scores[order].astype("float32"), unique_ids[order]
+
+
+def bm25_index_exists(index_dir: str) -> bool:
+    return (Path(index_dir) / TERMS_FILENAME).exists()
@@ -0,0 +1,144 @@
+from __future__ import annotations
+
+from collections import defaultdict
+from dataclasses import replace
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from hr_rag_assistant.retrieval.vectorstore import RetrievedChunk
+from hr_rag_assistant.types import HRChunk
+
+# Chunk indexes of a merged span, in document order (metadata key).
+MERGED_KEY = "merged_chunk_indexes"
+
+
+def _normalize_rows(x: np.ndarray) -> np.ndarray:
+    x = np.asarray(x, dtype="float32")
+    norms = np.linalg.norm(x, axis=-1, keepdims=True)
+    return x / np.maximum(norms, 1e-12)
+
+
+def mmr_select(
+    query_vector: np.ndarray,
+    hits: Sequence[RetrievedChunk],
+    vectors: np.ndarray,
+    top_k: int,
+    lambda_mult: float = 0.7,
+) -> List[RetrievedChunk]:
+    """
+    Maximal marginal relevance: greedily picks the hit maximizing
+    lambda * cos(query, hit) - (1 - lambda) * max cos(hit, already picked),
+    so near-duplicates of a picked chunk (overlapping neighbours, the same
+    paragraph in two policies) give way to other evidence. `vectors` are the
+    hits' stored embeddings (row i = hits[i]); lambda 1.0 = plain relevance.
+    Hits keep their scores and are returned in selection order.
+    """
+    if not 0.0 <= lambda_mult <= 1.0:
+        raise ValueError("lambda_mult must be in [0, 1]")
+    if len(hits) <= 1:
+        return list(hits[:top_k])
+
+    V = _normalize_rows(vectors)
+    relevance = V @ _normalize_rows(query_vector.reshape(1, -1))[0]
+    # Highest similarity of each candidate to the hits picked so far
+    redundancy = np.full(len(hits), -np.inf, dtype="float32")
+    remaining = np.ones(len(hits), dtype=bool)
+    picked: List[int] = []
+
+    for _ in range(min(top_k, len(hits))):
+        penalty = np.where(np.isfinite(redundancy), redundancy, 0.0)
+        mmr = lambda_mult * relevance - (1.0 - lambda_mult) * penalty
+        mmr[~remaining] = -np.inf
+        best = int(np.argmax(mmr))
+        picked.append(best)
+        remaining[best] = False
+        redundancy = np.maximum(redundancy, V @ V[best])
+
+    return [hits[i] for i in picked]
+
+
+def _join(left: str, right: str, overlap_chars: int) -> str:
+    """
+    `left` followed by the part of `right` it does not already contain.
+    Chunk texts are stripped, so the shared text is found by matching the
+    longest suffix of `left` (at most `overlap_chars`) against `right`.
+    """
+    for k in range(min(overlap_chars, len(left), len(right)), 0, -1):
+        if left.endswith(right[:k]):
+            return left + right[k:]
+    return left + "\n" + right
+
+
+def _merge_span(members: List[HRChunk]) -> HRChunk:
+    """One chunk for document-ordered chunks whose character ranges chain together."""
+    first = members[0]
+    if len(members) == 1:
+        return first
+
+    text, end = first.text, first.end_char
+    for c in members[1:]:
+        if c.end_char <= end:
+            continue  # contained in the span already
+        text = _join(text, c.text, end - c.start_char)
+        end = c.end_char
+
+    return HRChunk(
+        id="+".join(c.id for c in members),
+        text=text,
+        metadata={
+            **first.metadata,
+            "end_char": end,
+            MERGED_KEY: [c.chunk_index for c in members],
+        },
+        source=first.source,
+        chunk_index=first.chunk_index,
+        start_char=first.start_char,
+        end_char=end,
+    )
+
+
+def merge_overlapping_hits(hits: Sequence[RetrievedChunk]) -> List[RetrievedChunk]:
+    """
+    Merges hits from the same document whose [start_char, end_char) ranges
+    overlap or touch into one span, so the CHUNK_OVERLAP text shared by
+    neighbouring chunks is sent to the model once. A merged hit takes the
+    best score and the best rank of its members; other hits are unchanged.
+    Documents are told apart by path and shard, not file name: de/leave.md
+    and fr/leave.md are never spliced together. Chunks without offsets
+    (legacy stores) are never merged.
+    """
+    by_document: Dict[Tuple[Optional[str], str], List[int]] = defaultdict(list)
+    for rank, hit in enumerate(hits):
+        c = hit.chunk
+        if c.end_char > c.start_char:
+            by_document[(hit.shard, c.document)].append(rank)
+
+    merged: Dict[int, RetrievedChunk] = {}  # best rank of a span -> merged hit
+    absorbed = set()
+    for ranks in by_document.values():
+        if len(ranks) < 2:
+            continue
+        ranks.sort(key=lambda r: (hits[r].chunk.start_char, hits[r].chunk.end_char))
+
+        group = [ranks[0]]
+        span_end = hits[ranks[0]].chunk.end_char
+        for r in ranks[1:] + [None]:
+            if r is not None and hits[r].chunk.start_char <= span_end:
+                group.append(r)
+                span_end = max(span_end, hits[r].chunk.end_char)
+                continue
+            if len(group) > 1:
+                best = min(group)
+                merged[best] = replace(
+                    hits[best],
+                    chunk=_merge_span([hits[g].chunk for g in group]),
+                    score=max(hits[g].score for g in group),
+                    vector_id=-1,
+                )
+                absorbed.update(g for g in group if g != best)
+            if r is not None:
+                group = [r]
+                span_end = hits[r].chunk.end_char
+
+    return [merged.get(rank, hit) for rank, hit in enumerate(hits) if rank not in absorbed]
@@ -1,18 +1,53 @@
 from __future__ import annotations
 
-from dataclasses import dataclass
-from typing import List
+import asyncio
+import threading
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Sequence, Union
 
+import numpy as np
 from openai import OpenAI
 
+from hr_rag_assistant.embeddings.cache import EmbeddingCache, aembed_texts, embed_texts
+from hr_rag_assistant.embeddings.embedders import Embedder, OpenAIEmbedder
+from hr_rag_assistant.embeddings.query_cache import QueryEmbeddingCache
+from hr_rag_assistant.logging import get_logger
+from hr_rag_assistant.retrieval.filters import FilterLike
+from hr_rag_assistant.retrieval.hot_reload import HotReloadingVectorStore
+from hr_rag_assistant.retrieval.hybrid import (
+    RETRIEVAL_MODES,
+    RRF_K,
+    keyword_terms,
+    reciprocal_rank_fusion,
+)
+from hr_rag_assistant.retrieval.redundancy import merge_overlapping_hits, mmr_select
+from hr_rag_assistant.retrieval.sharded import ShardedVectorStore
 from hr_rag_assistant.retrieval.vectorstore import FaissVectorStore, RetrievedChunk
 
+logger = get_logger(__name__)
+
+# Inputs per embeddings request (the API accepts at most 2048).
+MAX_EMBED_BATCH = 2048
+
+Store = Union[FaissVectorStore, HotReloadingVectorStore, ShardedVectorStore]
+
 
 @dataclass(frozen=True)
 class RetrievalResult:
     query: str
     top_k: int
     results: List[RetrievedChunk]
+    # "dense" (cosine), "hybrid" (dense + BM25, fused) or "lexical" (BM25 only,
+    # no embedding request); tells how RetrievedChunk.score is to be read.
+    mode: str = "dense"
+    # Query embedding (None on the lexical fast path) and the index version
+    # searched (None for unversioned indexes); used by the answer cache.
+    query_vector: Optional[np.ndarray] = field(default=None, repr=False, compare=False)
+    index_version: Optional[str] = None
+    # Cosine similarity of every dense-search candidate by chunk id (empty on
+    # the lexical fast path). Comparable across modes, unlike fused scores;
+    # read by confidence gating.
+    similarities: Dict[str, float] = field(default_factory=dict, repr=False, compare=False)
 
 
 class HRRetriever:
@@ -20,20 +55,331 @@ class HRRetriever:
         self,
         *,
         index_dir: str,
-        openai_api_key: str,
-        embedding_model: str,
+        openai_api_key: Optional[str] = None,
+        embedding_model: Optional[str] = None,
+        embedder: Optional[Embedder] = None,
+        embedding_cache: Optional[EmbeddingCache] = None,
+        index_load_mode: str = "heap",
+        nprobe: Optional[int] = None,
+        ef_search: Optional[int] = None,
+        rescore_multiplier: int = 4,
+        shard_dirs: Optional[Sequence[str]] = None,
+        reload_interval: float = 0.0,
+        query_cache: Optional[QueryEmbeddingCache] = None,
+        retrieval_mode: str = "dense",
+        lexical_fast_path: bool = False,
+        fusion_depth: int = 20,
+        rrf_k: int = RRF_K,
+        merge_overlaps: bool = False,
+        mmr_lambda: Optional[float] = None,
+        mmr_fetch_k: int = 20,
+        lazy_load: bool = False,
     ):
-        self.store = FaissVectorStore(index_dir=index_dir)
-        self.oai = OpenAI(api_key=openai_api_key)
-        self.embedding_model = embedding_model
+        # Queries are embedded by `embedder` (default: OpenAI with embedding_model);
+        # indexes built with a different embedder are refused when opened.
+        if embedder is None:
+            if not embedding_model:
+                raise ValueError("Either embedder or embedding_model is required.")
+            embedder = OpenAIEmbedder(model=embedding_model, client=OpenAI(api_key=openai_api_key))
+        self.embedder = embedder
+        self.embedding_model = embedder.model
+
+        # With shard_dirs, index_dir is ignored and all shards are searched together.
+        # reload_interval > 0 makes long-lived retrievers follow newly published index versions.
+        self._index_dir = index_dir
+        self._shard_dirs = shard_dirs
+        self._reload_interval = reload_interval
+        self._store_kwargs = dict(
+            load_mode=index_load_mode,
+            nprobe=nprobe,
+            ef_search=ef_search,
+            rescore_multiplier=rescore_multiplier,
+            expected_embedder=embedder.identity(),
+        )
+        self._store: Optional[Store] = None
+        self._store_lock = threading.Lock()
+        self.embedding_cache = embedding_cache
+        # Repeated (normalized) questions are answered without an embeddings request.
+        self.query_cache = query_cache
+
+        # "hybrid" fuses the top `fusion_depth` dense and BM25 hits with
+        # reciprocal-rank fusion; with `lexical_fast_path`, keyword queries
+        # whose terms all occur in the index are answered by BM25 alone.
+        if retrieval_mode not in RETRIEVAL_MODES:
+            raise ValueError(
+                f"retrieval_mode must be one of {RETRIEVAL_MODES}, got {retrieval_mode!r}"
+            )
+        self.retrieval_mode = retrieval_mode
+        self.lexical_fast_path = lexical_fast_path
+        self.fusion_depth = fusion_depth
+        self.rrf_k = rrf_k
+
+        # Redundancy control: with `mmr_lambda` set, top_k hits are picked from
+        # `mmr_fetch_k` candidates by maximal marginal relevance over the stored
+        # vectors; `merge_overlaps` joins overlapping neighbours into one span.
+        if mmr_lambda is not None and not 0.0 <= mmr_lambda <= 1.0:
+            raise ValueError("mmr_lambda must be in [0, 1]")
+        self.merge_overlaps = merge_overlaps
+        self.mmr_lambda = mmr_lambda
+        self.mmr_fetch_k = mmr_fetch_k
+
+        # With `lazy_load` the index is opened on first use; `aretrieve` then
+        # opens it while the first query embedding is in flight.
+        if not lazy_load:
+            self._open_store()
+
+    @property
+    def store(self) -> Store:
+        return self._store if self._store is not None else self._open_store()
+
+    def _open_store(self) -> Store:
+        with self._store_lock:
+            if self._store is not None:
+                return self._store
+            store: Store
+            if self._shard_dirs:
+                store = ShardedVectorStore(
+                    self._shard_dirs, reload_interval=self._reload_interval, **self._store_kwargs
+                )
+            elif self._reload_interval > 0:
+                store = HotReloadingVectorStore(
+                    self._index_dir, poll_interval=self._reload_interval, **self._store_kwargs
+                )
+            else:
+                store = FaissVectorStore(index_dir=self._index_dir, **self._store_kwargs)
+            wants_lexical = self.retrieval_mode == "hybrid" or self.lexical_fast_path
+            if wants_lexical and not store.has_lexical:
+                logger.warning(
+                    "Index has no BM25 index (re-run ingestion); using dense retrieval only"
+                )
+            self._store = store
+            return store
 
-    def retrieve(self, query: str, top_k: int = 5) -> RetrievalResult:
+    def retrieve(
+        self, query: str, top_k: int = 5, filters: Optional[FilterLike] = None
+    ) -> RetrievalResult:
+        """`filters` restricts retrieval to matching chunks (see FaissVectorStore.search)."""
         query = query.strip()
         if not query:
             raise ValueError("Query is empty.")
 
-        emb = self.oai.embeddings.create(model=self.embedding_model, input=[query])
-        query_vec = emb.data[0].embedding
+        version = self.index_version
+        lexical = self._lexical_only(query, top_k, filters, version)
+        if lexical is not None:
+            return lexical
+
+        query_vec = self._embed_queries([query])[0]
+        return self._search(query, query_vec, top_k, filters, version)
+
+    async def aretrieve(
+        self, query: str, top_k: int = 5, filters: Optional[FilterLike] = None
+    ) -> RetrievalResult:
+        """
+        `retrieve` for asyncio servers: the query embedding is awaited on the
+        shared async client and the index search runs in a worker thread
+        (FAISS releases the GIL), so the event loop keeps serving other
+        questions. A lazily loaded index is opened while the embedding is in
+        flight (that first query skips the keyword fast path: it needs the index).
+        """
+        query = query.strip()
+        if not query:
+            raise ValueError("Query is empty.")
+
+        loading = None
+        if self._store is None:
+            loading = asyncio.ensure_future(asyncio.to_thread(self._open_store))
+        else:
+            lexical = self._lexical_only(query, top_k, filters, self.index_version)
+            if lexical is not None:
+                return lexical
+
+        try:
+            query_vec = (await self._aembed_queries([query]))[0]
+        finally:
+            if loading is not None:
+                await loading
+
+        version = self.index_version
+        return await asyncio.to_thread(self._search, query, query_vec, top_k, filters, version)
+
+    def _search(
+        self,
+        query: str,
+        query_vec: np.ndarray,
+        top_k: int,
+        filters: Optional[FilterLike],
+        version: Optional[str],
+    ) -> RetrievalResult:
+        dense = self.store.search(query_vec, top_k=self._dense_depth(top_k), filters=filters)
+        return self._result(query, dense, top_k, filters, query_vec, version)
+
+    @property
+    def index_version(self) -> Optional[str]:
+        """Version of the index currently served (None for unversioned indexes)."""
+        return self.store.version
+
+    def scope(self) -> str:
+        """Settings besides query and index that decide which hits are returned."""
+        kw = self._store_kwargs
+        mmr = f"{self.mmr_lambda:g}@{self.mmr_fetch_k}" if self.mmr_lambda is not None else "off"
+        return (
+            f"{self.retrieval_mode}|fast={int(self.lexical_fast_path)}"
+            f"|fusion={self.fusion_depth}/{self.rrf_k}|merge={int(self.merge_overlaps)}"
+            f"|mmr={mmr}|probe={kw['nprobe']}/{kw['ef_search']}/{kw['rescore_multiplier']}"
+        )
+
+    @property
+    def _hybrid(self) -> bool:
+        return self.retrieval_mode == "hybrid" and self.store.has_lexical
+
+    def _candidates(self, top_k: int) -> int:
+        """Hits kept before MMR picks top_k of them."""
+        return max(top_k, self.mmr_fetch_k) if self.mmr_lambda is not None else top_k
+
+    def _dense_depth(self, top_k: int) -> int:
+        depth = self._candidates(top_k)
+        return max(depth, self.fusion_depth) if self._hybrid else depth
+
+    def _lexical_only(
+        self, query: str, top_k: int, filters: Optional[FilterLike], version: Optional[str]
+    ) -> Optional[RetrievalResult]:
+        """BM25 result for keyword queries (fast path), or None to embed the query."""
+        if not self.lexical_fast_path:
+            return None
+        terms = keyword_terms(query)
+        # Unknown terms (typos, synonyms) are where dense retrieval is needed.
+        if not terms or not self.store.has_terms(terms):
+            return None
+        hits = self.store.search_lexical(query, top_k=top_k, filters=filters)
+        if not hits:
+            return None
+        return RetrievalResult(
+            query=query,
+            top_k=top_k,
+            results=self._postprocess(hits, top_k, None, version),
+            mode="lexical",
+            index_version=version,
+        )
+
+    def _result(
+        self,
+        query: str,
+        dense: List[RetrievedChunk],
+        top_k: int,
+        filters: Optional[FilterLike],
+        query_vec: np.ndarray,
+        version: Optional[str],
+    ) -> RetrievalResult:
+        """Dense hits -> fusion with BM25 (hybrid) -> post-processing."""
+        mode = "dense"
+        hits = dense
+        if self._hybrid:
+            depth = max(top_k, self.fusion_depth)
+            lexical = self.store.search_lexical(query, top_k=depth, filters=filters)
+            hits = reciprocal_rank_fusion([dense, lexical], self._candidates(top_k), k=self.rrf_k)
+            mode = "hybrid"
+        return RetrievalResult(
+            query=query,
+            top_k=top_k,
+            results=self._postprocess(hits, top_k, query_vec, version),
+            mode=mode,
+            query_vector=query_vec,
+            index_version=version,
+            similarities={h.chunk.id: h.score for h in dense},
+        )
+
+    def _postprocess(
+        self,
+        hits: List[RetrievedChunk],
+        top_k: int,
+        query_vec: Optional[np.ndarray],
+        version: Optional[str],
+    ) -> List[RetrievedChunk]:
+        # 1) MMR over the candidates (needs the query vector, and vector ids of
+        #    the version that was searched: skipped if a reload happened since)
+        if (
+            self.mmr_lambda is not None
+            and query_vec is not None
+            and len(hits) > top_k
+            and version == self.index_version
+        ):
+            vectors = self.store.hit_vectors(hits)
+            hits = mmr_select(query_vec, hits, vectors, top_k, self.mmr_lambda)
+        hits = hits[:top_k]
+
+        # 2) One span per run of overlapping/adjacent chunks
+        if self.merge_overlaps:
+            hits = merge_overlapping_hits(hits)
+        return hits
+
+    def _embed_queries(self, queries: Sequence[str]) -> np.ndarray:
+        vectors = []
+        for i in range(0, len(queries), MAX_EMBED_BATCH):
+            batch = queries[i : i + MAX_EMBED_BATCH]
+            if self.query_cache is not None:
+                vectors.append(
+                    self.query_cache.embed_many(
+                        self.embedder, model=self.embedding_model, queries=batch
+                    )
+                )
+            else:
+                vectors.append(
+                    embed_texts(
+                        self.embedder,
+                        model=self.embedding_model,
+                        texts=batch,
+                        cache=self.embedding_cache,
+                    )
+                )
+        return np.vstack(vectors)
+
+    async def _aembed_queries(self, queries: Sequence[str]) -> np.ndarray:
+        vectors = []
+        for i in range(0, len(queries), MAX_EMBED_BATCH):
+            batch = queries[i : i + MAX_EMBED_BATCH]
+            if self.query_cache is not None:
+                vectors.append(
+                    await self.query_cache.aembed_many(
+                        self.embedder, model=self.embedding_model, queries=batch
+                    )
+                )
+            else:
+                vectors.append(
+                    await aembed_texts(
+                        self.embedder,
+                        model=self.embedding_model,
+                        texts=batch,
+                        cache=self.embedding_cache,
+                    )
+                )
+        return np.vstack(vectors)
+
+    def retrieve_many(
+        self, queries: Sequence[str], top_k: int = 5, filters: Optional[FilterLike] = None
+    ) -> List[RetrievalResult]:
+        """
+        Batch version of `retrieve` for eval jobs and FAQ regeneration: queries
+        are embedded with one request per MAX_EMBED_BATCH and searched with one
+        FAISS call (keyword queries on the lexical fast path are not embedded).
+        Results are in input order.
+        """
+        cleaned = [q.strip() for q in queries]
+        for i, q in enumerate(cleaned):
+            if not q:
+                raise ValueError(f"Query {i} is empty.")
+        if not cleaned:
+            return []
 
-        hits = self.store.search(query_vec, top_k=top_k)
-        return RetrievalResult(query=query, top_k=top_k, results=hits)
\ No newline at end of file
+        version = self.index_version
+        results: List[Optional[RetrievalResult]] = [
+            self._lexical_only(q, top_k, filters, version) for q in cleaned
+        ]
+        todo = [i for i, r in enumerate(results) if r is None]
+        if todo:
+            vectors = self._embed_queries([cleaned[i] for i in todo])
+            hits = self.store.search_batch(
+                vectors, top_k=self._dense_depth(top_k), filters=filters
+            )
+            for i, v, h in zip(todo, vectors, hits):
+                results[i] = self._result(cleaned[i], h, top_k, filters, v, version)
+        return results
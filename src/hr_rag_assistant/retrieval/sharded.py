@@ -0,0 +1,262 @@
+from __future__ import annotations
+
+import heapq
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import replace
+from pathlib import Path
+from typing import Any, Dict, List, Mapping, Optional, Sequence, Union
+
+import numpy as np
+
+from hr_rag_assistant.embeddings.embedders import index_embedder
+from hr_rag_assistant.logging import get_logger
+from hr_rag_assistant.retrieval.hot_reload import HotReloadingVectorStore
+from hr_rag_assistant.retrieval.vectorstore import FaissVectorStore, RetrievedChunk
+
+logger = get_logger(__name__)
+
+ShardDirs = Union[Sequence[str], Mapping[str, str]]
+Shard = Union[FaissVectorStore, HotReloadingVectorStore]
+
+
+def _tag(result: Any, name: str) -> Any:
+    """A shard's hits (or per-query hit lists) with `shard` set to `name`."""
+    if result and isinstance(result[0], list):
+        return [_tag(hits, name) for hits in result]
+    return [replace(hit, shard=name) for hit in result]
+
+
+def shard_name(index_dir: str) -> str:
+    """Default shard name: the index directory's basename (e.g. "eu_gmbh")."""
+    return Path(index_dir).resolve().name
+
+
+class ShardedVectorStore:
+    """
+    Searches several FaissVectorStore shards (e.g. one index directory per
+    region or legal entity, each built by build_and_persist_faiss_index) as
+    if they were one index.
+
+    - Each query is fanned out to all shards on a thread pool; FAISS releases
+      the GIL during search, so shards are scanned in parallel and latency
+      follows the slowest shard instead of the total corpus size.
+    - Per-shard top-k lists are merged into one global top-k by score. Since
+      every shard returns its own exact top-k, the merge returns the same
+      hits as one FaissVectorStore over the union of the shards.
+    - Shards can be added or removed at runtime without touching the others.
+
+    - With `reload_interval > 0` every shard follows its own CURRENT pointer
+      (see HotReloadingVectorStore), so re-ingesting one shard is picked up
+      without reopening the others.
+
+    All shards must use the same embedder (backend and model) and dimension.
+    """
+
+    def __init__(
+        self,
+        shard_dirs: ShardDirs,
+        *,
+        load_mode: str = "heap",
+        nprobe: Optional[int] = None,
+        ef_search: Optional[int] = None,
+        rescore_multiplier: int = 4,
+        max_workers: Optional[int] = None,
+        reload_interval: float = 0.0,
+        expected_embedder: Optional[Mapping[str, Any]] = None,
+    ):
+        self._store_kwargs = dict(
+            load_mode=load_mode,
+            nprobe=nprobe,
+            ef_search=ef_search,
+            rescore_multiplier=rescore_multiplier,
+            expected_embedder=expected_embedder,
+        )
+        self._max_workers = max_workers
+        self._reload_interval = reload_interval
+        self._lock = threading.Lock()
+        # Replaced (never mutated) on add/remove, so searches can read it without the lock.
+        self._shards: Dict[str, Shard] = {}
+        self._pool: Optional[ThreadPoolExecutor] = None
+        self._pool_size = 0
+
+        named = (
+            shard_dirs.items()
+            if isinstance(shard_dirs, Mapping)
+            else ((shard_name(d), d) for d in shard_dirs)
+        )
+        for name, index_dir in named:
+            self.add_shard(index_dir, name=name)
+        if not self._shards:
+            raise ValueError("ShardedVectorStore needs at least one shard.")
+
+    @property
+    def shards(self) -> Dict[str, Shard]:
+        return dict(self._shards)
+
+    @property
+    def dimension(self) -> int:
+        return next(iter(self._shards.values())).dimension
+
+    @property
+    def embedding_model(self) -> Optional[str]:
+        return next(iter(self._shards.values())).meta.get("embedding_model")
+
+    @property
+    def version(self) -> Optional[str]:
+        """Versions of all shards ("name=version,..."), or None if any is unversioned."""
+        versions = {name: s.version for name, s in self._shards.items()}
+        if any(v is None for v in versions.values()):
+            return None
+        return ",".join(f"{name}={versions[name]}" for name in sorted(versions))
+
+    def __len__(self) -> int:
+        return sum(len(s.chunks) for s in self._shards.values())
+
+    def add_shard(self, index_dir: str, *, name: Optional[str] = None) -> str:
+        """Opens `index_dir` and makes it searchable; replaces a shard with the same name."""
+        name = name or shard_name(index_dir)
+        store: Shard
+        if self._reload_interval > 0:
+            store = HotReloadingVectorStore(
+                index_dir, poll_interval=self._reload_interval, **self._store_kwargs
+            )
+        else:
+            store = FaissVectorStore(index_dir=index_dir, **self._store_kwargs)
+
+        with self._lock:
+            others = [s for n, s in self._shards.items() if n != name]
+            if others:
+                ref = others[0]
+                if store.dimension != ref.dimension:
+                    raise ValueError(
+                        f"Shard {name!r} has dim {store.dimension}, expected {ref.dimension}"
+                    )
+                if index_embedder(store.meta) != index_embedder(ref.meta):
+                    raise ValueError(
+                        f"Shard {name!r} uses {index_embedder(store.meta)}, "
+                        f"expected {index_embedder(ref.meta)}"
+                    )
+            replaced = self._shards.get(name)
+            self._shards = {**self._shards, name: store}
+            self._resize_pool()
+        if isinstance(replaced, HotReloadingVectorStore):
+            replaced.close()
+
+        logger.info("Shard %s added (%s, %d chunks)", name, index_dir, len(store.chunks))
+        return name
+
+    def remove_shard(self, name: str) -> None:
+        with self._lock:
+            if name not in self._shards:
+                raise KeyError(f"Unknown shard: {name}")
+            if len(self._shards) == 1:
+                raise ValueError("Cannot remove the last shard.")
+            removed = self._shards[name]
+            self._shards = {n: s for n, s in self._shards.items() if n != name}
+            self._resize_pool()
+        if isinstance(removed, HotReloadingVectorStore):
+            removed.close()
+        logger.info("Shard %s removed", name)
+
+    def _resize_pool(self) -> None:
+        # One thread per shard (unless capped): every shard is searched at once.
+        workers = self._max_workers or len(self._shards)
+        if self._pool is not None and self._pool_size == workers:
+            return
+        old = self._pool
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="shard")
+        self._pool_size = workers
+        # Searches already submitted to the old pool still finish; one that
+        # submits to it after this point retries on the new pool (_fan_out).
+        if old is not None:
+            old.shutdown(wait=False)
+
+    def _fan_out(self, method: str, *args, **kwargs) -> List[Any]:
+        """
+        Calls `method` on every shard in parallel; results in shard order, with
+        every hit tagged with its shard (ids are only unique within a shard).
+        """
+        shards = list(self._shards.items())
+        if len(shards) == 1:
+            name, store = shards[0]
+            return [_tag(getattr(store, method)(*args, **kwargs), name)]
+        while True:
+            pool = self._pool
+            try:
+                futures = [pool.submit(getattr(s, method), *args, **kwargs) for _, s in shards]
+                break
+            except RuntimeError:
+                # Shut down by a concurrent add_shard / remove_shard
+                if pool is self._pool:
+                    raise
+        return [_tag(f.result(), name) for (name, _), f in zip(shards, futures)]
+
+    def search(self, query_vector: List[float], top_k: int = 5, **kwargs) -> List[RetrievedChunk]:
+        """Global top-k over all shards; extra kwargs go to FaissVectorStore.search."""
+        if top_k <= 0:
+            raise ValueError("top_k must be > 0")
+
+        per_shard = self._fan_out("search", query_vector, top_k, **kwargs)
+        return heapq.nlargest(
+            top_k, (hit for hits in per_shard for hit in hits), key=lambda h: h.score
+        )
+
+    def search_batch(self, query_vectors, top_k: int = 5, **kwargs) -> List[List[RetrievedChunk]]:
+        """One FaissVectorStore.search_batch per shard (in parallel), merged per query."""
+        if top_k <= 0:
+            raise ValueError("top_k must be > 0")
+
+        per_shard = self._fan_out("search_batch", query_vectors, top_k, **kwargs)
+        return [
+            heapq.nlargest(
+                top_k, (hit for hits in per_query for hit in hits), key=lambda h: h.score
+            )
+            for per_query in zip(*per_shard)
+        ]
+
+    def hit_vectors(self, hits: Sequence[RetrievedChunk]) -> np.ndarray:
+        """Stored vectors of hits (see FaissVectorStore.hit_vectors), each from its own shard."""
+        shards = self._shards
+        out = np.zeros((len(hits), self.dimension), dtype="float32")
+        by_shard: Dict[str, List[int]] = {}
+        for i, hit in enumerate(hits):
+            if hit.shard not in shards:
+                raise KeyError(f"Hit {hit.chunk.id} is not from a current shard ({hit.shard!r})")
+            by_shard.setdefault(hit.shard, []).append(i)
+        for name, rows in by_shard.items():
+            out[rows] = shards[name].hit_vectors([hits[i] for i in rows])
+        return out
+
+    @property
+    def has_lexical(self) -> bool:
+        return all(s.has_lexical for s in self._shards.values())
+
+    def has_terms(self, terms: Sequence[str]) -> bool:
+        """Whether every term occurs in at least one shard."""
+        shards = list(self._shards.values())
+        return all(s.has_lexical for s in shards) and all(
+            any(s.has_terms([t]) for s in shards) for t in terms
+        )
+
+    def search_lexical(self, query: str, top_k: int = 5, **kwargs) -> List[RetrievedChunk]:
+        """
+        BM25 search on every shard, merged by score. Each shard scores with its
+        own term statistics, so scores are comparable as long as the shards
+        are not wildly different in size or vocabulary.
+        """
+        if top_k <= 0:
+            raise ValueError("top_k must be > 0")
+
+        per_shard = self._fan_out("search_lexical", query, top_k, **kwargs)
+        return heapq.nlargest(
+            top_k, (hit for hits in per_shard for hit in hits), key=lambda h: h.score
+        )
+
+    def close(self) -> None:
+        for store in self._shards.values():
+            if isinstance(store, HotReloadingVectorStore):
+                store.close()
+        if self._pool is not None:
+            self._pool.shutdown(wait=True)
+            self._pool = None
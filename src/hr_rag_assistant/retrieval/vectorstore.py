@@ -1,20 +1,118 @@
 from __future__ import annotations
 
 import json
-from dataclasses import dataclass
+import os
+import threading
+import time
+import weakref
+from dataclasses import dataclass, replace
 from pathlib import Path
-from typing import Any, Dict, List, Tuple
+from typing import Any, List, Mapping, Optional, Sequence, Tuple, Union
 
 import faiss
 import numpy as np
 
+from hr_rag_assistant.embeddings.embedders import check_embedder
+from hr_rag_assistant.logging import get_logger
+from hr_rag_assistant.retrieval.chunk_store import (
+    AnyChunkStore,
+    chunk_store_exists,
+    open_chunk_store,
+)
+from hr_rag_assistant.retrieval.exact_vectors import ExactVectors, exact_vectors_exist
+from hr_rag_assistant.retrieval.filters import FilterIndex, FilterLike, as_filter
+from hr_rag_assistant.retrieval.index_spec import IndexSpec
+from hr_rag_assistant.retrieval.lexical import BM25Index, bm25_index_exists, tokenize
+from hr_rag_assistant.retrieval.versioning import acquire_lease, release_lease, resolve_index_dir
 from hr_rag_assistant.types import HRChunk
 
+logger = get_logger(__name__)
+
+LOAD_MODES = ("heap", "mmap")
+
+# Queries rescored together (bounds the queries x candidates x dim gather).
+_RESCORE_BLOCK = 256
+
 
 @dataclass(frozen=True)
 class RetrievedChunk:
     chunk: HRChunk
-    score: float  # cosine similarity (higher is better)
+    # Higher is better: cosine similarity for vector search, BM25 score for
+    # search_lexical, fused rank score for hybrid retrieval (see HRRetriever).
+    score: float
+    # FAISS vector id in the store that returned the hit (-1 = none, e.g. a
+    # merged span); used to fetch the stored vector (see hit_vectors).
+    vector_id: int = -1
+    # Shard of a ShardedVectorStore that returned the hit (None = single
+    # index); vector ids and chunk ids are only unique within one shard.
+    shard: Optional[str] = None
+
+
+@dataclass(frozen=True)
+class IndexLoadStats:
+    load_mode: str  # mode actually used ("mmap" falls back to "heap" if unsupported)
+    load_seconds: float
+    index_file_bytes: int
+    private_rss_delta_bytes: int  # memory this process does not share with other workers
+
+
+def _rss_bytes() -> Tuple[int, int]:
+    """(resident, shared) bytes of this process; (0, 0) where /proc is unavailable."""
+    try:
+        fields = Path("/proc/self/statm").read_text().split()
+    except OSError:
+        return 0, 0
+    page = os.sysconf("SC_PAGE_SIZE")
+    return int(fields[1]) * page, int(fields[2]) * page
+
+
+def read_faiss_index(
+    index_path: Path, load_mode: str = "heap"
+) -> Tuple[faiss.Index, IndexLoadStats]:
+    """
+    Reads a FAISS index either into the process heap or memory-mapped.
+
+    With "mmap" the vector codes stay in the OS page cache, so every worker
+    on a node that maps the same file shares one copy and startup does not
+    read the whole file. The mapped index is read-only; index types that do
+    not support mapping are loaded into the heap instead.
+    """
+    if load_mode not in LOAD_MODES:
+        raise ValueError(f"load_mode must be one of {LOAD_MODES}, got {load_mode!r}")
+
+    rss0, shared0 = _rss_bytes()
+    start = time.perf_counter()
+
+    used_mode = load_mode
+    if load_mode == "mmap":
+        try:
+            index = faiss.read_index(
+                str(index_path), faiss.IO_FLAG_MMAP_IFC | faiss.IO_FLAG_READ_ONLY
+            )
+        except RuntimeError as e:
+            logger.warning("mmap load not supported for %s (%s); loading into heap", index_path, e)
+            used_mode = "heap"
+    if used_mode == "heap":
+        index = faiss.read_index(str(index_path))
+
+    elapsed = time.perf_counter() - start
+    rss1, shared1 = _rss_bytes()
+
+    stats = IndexLoadStats(
+        load_mode=used_mode,
+        load_seconds=elapsed,
+        index_file_bytes=index_path.stat().st_size,
+        private_rss_delta_bytes=max(0, (rss1 - shared1) - (rss0 - shared0)),
+    )
+    logger.info(
+        "Loaded %s (%s, %.1f MB) in %.3fs; private RSS +%.1f MB",
+        index_path,
+        stats.load_mode,
+        stats.index_file_bytes / 1e6,
+        stats.load_seconds,
+        stats.private_rss_delta_bytes / 1e6,
+    )
+    return index, stats
 
 
 class FaissVectorStore:
@@ -23,45 +121,72 @@ class FaissVectorStore:
     and provides similarity search over chunks.
 
     Assumptions:
-    - index is IndexFlatIP
+    - index is IndexIDMap2 over the kind recorded in meta.json["index"]
+      (flat, IVF-Flat, IVF-PQ or HNSW; legacy indexes are a bare IndexFlatIP
+      whose ids are row numbers)
     - vectors were L2-normalized before add
     - queries are L2-normalized before search
+
+    Indexes built with `store_vectors` come with a float16 copy of the
+    vectors: `search` then fetches `top_k * rescore_multiplier` candidates
+    from the (quantized) index and re-ranks them by exact cosine, so scores
+    stay comparable to a float32 flat index.
+
+    `index_dir` is resolved through its CURRENT pointer (see
+    retrieval.versioning); the store then only reads that one snapshot and
+    holds a lease on it until it is garbage-collected.
+
+    Searches can be restricted with a MetadataFilter (see retrieval.filters):
+    the matching vector ids are handed to FAISS as an ID selector, so the
+    index only scores matching chunks instead of over-fetching and dropping.
+
+    With `expected_embedder` (an Embedder.identity()), indexes whose vectors
+    come from another embedder are refused instead of silently returning
+    meaningless neighbours.
+
+    Indexes built with a BM25 index (see retrieval.lexical) also support
+    keyword search over chunk text via `search_lexical`.
     """
 
-    def __init__(self, index_dir: str):
-        self.index_dir = Path(index_dir)
+    def __init__(
+        self,
+        index_dir: str,
+        load_mode: str = "heap",
+        nprobe: Optional[int] = None,
+        ef_search: Optional[int] = None,
+        rescore_multiplier: int = 4,
+        expected_embedder: Optional[Mapping[str, Any]] = None,
+    ):
+        self.root_dir = Path(index_dir)
+        self.index_dir, self.version = self._lease_current(index_dir)
         self.index_path = self.index_dir / "index.faiss"
-        self.chunks_path = self.index_dir / "chunks.jsonl"
         self.meta_path = self.index_dir / "meta.json"
 
         if not self.index_path.exists():
             raise FileNotFoundError(f"Missing FAISS index: {self.index_path}")
-        if not self.chunks_path.exists():
-            raise FileNotFoundError(f"Missing chunks store: {self.chunks_path}")
+        if not chunk_store_exists(str(self.index_dir)):
+            raise FileNotFoundError(f"Missing chunks store in: {self.index_dir}")
         if not self.meta_path.exists():
             raise FileNotFoundError(f"Missing meta file: {self.meta_path}")
 
         self.meta = json.loads(self.meta_path.read_text(encoding="utf-8"))
+        if expected_embedder is not None:
+            check_embedder(self.meta, expected_embedder, self.index_dir)
+
+        # Index type + query-time knobs (nprobe / efSearch) recorded at build time
+        self.index_spec = IndexSpec.from_meta(self.meta)
+        if nprobe is not None:
+            self.index_spec = replace(self.index_spec, nprobe=nprobe)
+        if ef_search is not None:
+            self.index_spec = replace(self.index_spec, ef_search=ef_search)
+        self._search_params = self.index_spec.search_params()
 
-        # Load FAISS index
-        self.index = faiss.read_index(str(self.index_path))
-
-        # Load chunks (order matters: row i corresponds to vector i)
-        self.chunks: List[HRChunk] = []
-        with self.chunks_path.open("r", encoding="utf-8") as f:
-            for line in f:
-                row = json.loads(line)
-                self.chunks.append(
-                    HRChunk(
-                        id=row["id"],
-                        text=row["text"],
-                        metadata=row.get("metadata", {}),
-                        source=row["source"],
-                        chunk_index=int(row["chunk_index"]),
-                        start_char=int(row.get("start_char", 0)),
-                        end_char=int(row.get("end_char", 0)),
-                    )
-                )
+        # Load FAISS index (heap or memory-mapped, see read_faiss_index)
+        self.index, self.load_stats = read_faiss_index(self.index_path, load_mode)
+
+        # Open chunks (memory-mapped); FAISS returns vector ids, which the store
+        # maps to rows. HRChunk objects are only built for returned hits.
+        self.chunks: AnyChunkStore = open_chunk_store(str(self.index_dir))
 
         if len(self.chunks) != self.index.ntotal:
             raise RuntimeError(
@@ -70,26 +195,213 @@ class FaissVectorStore:
 
         self.dimension = int(self.meta.get("dimension", self.index.d))
 
-    def _normalize_query(self, vector: List[float]) -> np.ndarray:
-        x = np.array(vector, dtype="float32").reshape(1, -1)
-        if x.shape[1] != self.dimension:
-            raise ValueError(f"Query dim {x.shape[1]} != index dim {self.dimension}")
+        self.rescore_multiplier = rescore_multiplier
+        self.exact_vectors: Optional[ExactVectors] = None
+        if self.meta.get("exact_vectors") and exact_vectors_exist(str(self.index_dir)):
+            self.exact_vectors = ExactVectors(str(self.index_dir), self.dimension)
+
+        self.lexical: Optional[BM25Index] = None
+        if self.meta.get("lexical") and bm25_index_exists(str(self.index_dir)):
+            self.lexical = BM25Index(str(self.index_dir))
+
+        # Vector ids per document, for filtered search
+        self.filter_index = FilterIndex(*self.chunks.document_groups())
+        self._direct_map_lock = threading.Lock()
+        self._has_direct_map = False
+
+    def _lease_current(self, index_dir: str) -> Tuple[Path, Optional[str]]:
+        # A version can be published and the previous one collected between
+        # reading CURRENT and taking the lease; re-resolve in that case.
+        for _ in range(3):
+            path, version = resolve_index_dir(index_dir)
+            if version is None:
+                return path, None
+            try:
+                lease = acquire_lease(index_dir, version)
+            except FileNotFoundError:
+                continue
+            weakref.finalize(self, release_lease, lease)
+            return path, version
+        raise RuntimeError(f"Index version in {index_dir} kept changing while opening it")
+
+    def _normalize_queries(
+        self, vectors: Union[np.ndarray, Sequence[Sequence[float]]]
+    ) -> np.ndarray:
+        x = np.array(vectors, dtype="float32")
+        if x.ndim == 1:
+            x = x.reshape(1, -1)
+        if x.ndim != 2 or x.shape[1] != self.dimension:
+            raise ValueError(f"Query dim {x.shape[-1]} != index dim {self.dimension}")
         faiss.normalize_L2(x)
         return x
 
-    def search(self, query_vector: List[float], top_k: int = 5) -> List[RetrievedChunk]:
+    def _rescore(self, Q: np.ndarray, I: np.ndarray, top_k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Re-ranks each row of candidate ids by exact cosine against vectors.f16."""
+        D_out = np.full((len(Q), top_k), -np.inf, dtype="float32")
+        I_out = np.full((len(Q), top_k), -1, dtype="int64")
+        # Blocks of queries bound the (queries x candidates x dim) gather.
+        for start in range(0, len(Q), _RESCORE_BLOCK):
+            ids = I[start : start + _RESCORE_BLOCK]
+            valid = ids >= 0
+            vecs = self.exact_vectors.vectors(np.where(valid, ids, 0).ravel()).reshape(
+                *ids.shape, -1
+            )
+            scores = np.einsum("nkd,nd->nk", vecs, Q[start : start + _RESCORE_BLOCK])
+            scores[~valid] = -np.inf
+            order = np.argsort(-scores, axis=1, kind="stable")[:, :top_k]
+            width = order.shape[1]
+            D_out[start : start + len(ids), :width] = np.take_along_axis(scores, order, axis=1)
+            I_out[start : start + len(ids), :width] = np.where(
+                np.isneginf(D_out[start : start + len(ids), :width]),
+                -1,
+                np.take_along_axis(ids, order, axis=1),
+            )
+        return D_out, I_out
+
+    def _vectors_for(self, vector_ids: np.ndarray) -> np.ndarray:
+        if self.exact_vectors is not None:
+            return self.exact_vectors.vectors(vector_ids)
+        ivf = faiss.try_extract_index_ivf(self.index)
+        if ivf is not None and not self._has_direct_map:
+            # IVF lists are not addressable by id until a direct map is built (once).
+            with self._direct_map_lock:
+                if not self._has_direct_map:
+                    ivf.make_direct_map()
+                    self._has_direct_map = True
+        return self.index.reconstruct_batch(vector_ids.astype("int64"))
+
+    def _exact_filtered(
+        self, q: np.ndarray, vector_ids: np.ndarray, top_k: int
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Brute-force top-k of one (dim,) query over the filtered ids. Used when
+        an approximate index cannot find top_k matches (HNSW graph walks and
+        IVF probes can dead-end when few chunks pass a selective filter).
+        """
+        scores = np.concatenate(
+            [
+                self._vectors_for(vector_ids[i : i + 65536]) @ q
+                for i in range(0, len(vector_ids), 65536)
+            ]
+        )
+        order = np.argsort(-scores, kind="stable")[:top_k]
+        return scores[order], vector_ids[order]
+
+    def search(
+        self,
+        query_vector: List[float],
+        top_k: int = 5,
+        rescore_multiplier: Optional[int] = None,
+        filters: Optional[FilterLike] = None,
+    ) -> List[RetrievedChunk]:
+        """
+        `rescore_multiplier` overrides the store default for this query; it
+        only has an effect when exact vectors are available (1 = rescore the
+        top_k hits without fetching extra candidates).
+
+        `filters` (MetadataFilter or dict, e.g. {"source": "leave_policy.md"}
+        or {"path_prefix": "de/"}) restricts hits to matching chunks; at least
+        min(top_k, number of matching chunks) hits are returned.
+        """
+        return self.search_batch(
+            np.asarray(query_vector, dtype="float32").reshape(1, -1),
+            top_k=top_k,
+            rescore_multiplier=rescore_multiplier,
+            filters=filters,
+        )[0]
+
+    def search_batch(
+        self,
+        query_vectors: Union[np.ndarray, Sequence[Sequence[float]]],
+        top_k: int = 5,
+        rescore_multiplier: Optional[int] = None,
+        filters: Optional[FilterLike] = None,
+    ) -> List[List[RetrievedChunk]]:
+        """
+        Searches an (n, dim) matrix of queries with a single FAISS call (which
+        parallelizes over queries internally). Returns one hit list per query;
+        arguments behave as in `search`, and `filters` applies to every query.
+        """
         if top_k <= 0:
             raise ValueError("top_k must be > 0")
+        multiplier = self.rescore_multiplier if rescore_multiplier is None else rescore_multiplier
+        if multiplier < 1:
+            raise ValueError("rescore_multiplier must be >= 1")
 
-        q = self._normalize_query(query_vector)
+        Q = self._normalize_queries(query_vectors)
+        if len(Q) == 0:
+            return []
+        rescore = self.exact_vectors is not None
 
-        # D: similarity scores, I: indices
-        D, I = self.index.search(q, top_k)
+        flt = as_filter(filters)
+        resolved = self.filter_index.resolve(flt) if flt is not None and not flt.is_empty else None
+        if resolved is not None and resolved.count == 0:
+            return [[] for _ in range(len(Q))]
+        params = (
+            self._search_params
+            if resolved is None
+            else self.index_spec.search_params(resolved.selector)
+        )
 
-        results: List[RetrievedChunk] = []
-        for score, idx in zip(D[0].tolist(), I[0].tolist()):
-            if idx < 0:
-                continue
-            results.append(RetrievedChunk(chunk=self.chunks[idx], score=float(score)))
+        # D: similarity scores, I: vector ids (-1 = no hit)
+        D, I = self.index.search(Q, top_k * multiplier if rescore else top_k, params=params)
+        if rescore:
+            D, I = self._rescore(Q, I, top_k)
+
+        if resolved is not None:
+            needed = min(top_k, resolved.count)
+            for row in np.flatnonzero((I >= 0).sum(axis=1) < needed):
+                d, i = self._exact_filtered(Q[row], resolved.vector_ids, top_k)
+                D[row, : len(d)], I[row, : len(i)] = d, i
+
+        return [self._hits(scores, ids) for scores, ids in zip(D.tolist(), I.tolist())]
+
+    def _hits(self, scores: Sequence[float], vector_ids: Sequence[int]) -> List[RetrievedChunk]:
+        return [
+            RetrievedChunk(
+                chunk=self.chunks.get_by_vector_id(idx), score=float(score), vector_id=int(idx)
+            )
+            for score, idx in zip(scores, vector_ids)
+            if idx >= 0
+        ]
+
+    def hit_vectors(self, hits: Sequence[RetrievedChunk]) -> np.ndarray:
+        """
+        Stored vectors of hits returned by this store (row i = hits[i]), e.g.
+        for MMR re-ranking: the float16 copy when the index has one, otherwise
+        reconstructed from the FAISS index (approximate for PQ codes).
+        """
+        ids = np.array([h.vector_id for h in hits], dtype="int64")
+        if len(ids) == 0:
+            return np.zeros((0, self.dimension), dtype="float32")
+        if (ids < 0).any():
+            raise ValueError("Hits without a vector id have no stored vector")
+        return np.asarray(self._vectors_for(ids), dtype="float32")
+
+    @property
+    def has_lexical(self) -> bool:
+        return self.lexical is not None
+
+    def has_terms(self, terms: Sequence[str]) -> bool:
+        """Whether every term occurs in at least one chunk (False without a BM25 index)."""
+        return self.lexical is not None and all(t in self.lexical for t in terms)
+
+    def search_lexical(
+        self, query: str, top_k: int = 5, filters: Optional[FilterLike] = None
+    ) -> List[RetrievedChunk]:
+        """
+        BM25 keyword search over chunk text; scores are BM25 scores. Only
+        chunks sharing at least one (non-stopword) term with `query` are
+        returned, so there may be fewer than top_k hits.
+        """
+        if top_k <= 0:
+            raise ValueError("top_k must be > 0")
+        if self.lexical is None:
+            raise RuntimeError(f"No BM25 index in {self.index_dir}; re-run ingestion.")
 
-        return results
\ No newline at end of file
+        flt = as_filter(filters)
+        allowed = None
+        if flt is not None and not flt.is_empty:
+            allowed = self.filter_index.resolve(flt).vector_ids
+        scores, ids = self.lexical.search(tokenize(query), top_k, allowed=allowed)
+        return self._hits(scores.tolist(), ids.tolist())
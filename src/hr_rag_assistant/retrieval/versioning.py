@@ -0,0 +1,154 @@
+from __future__ import annotations
+
+import os
+import shutil
+import uuid
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+from hr_rag_assistant.logging import get_logger
+
+logger = get_logger(__name__)
+
+# Versioned layout under INDEX_DIR:
+#   CURRENT                 name of the published version (swapped atomically)
+#   versions/<version>/     one complete, immutable snapshot (index.faiss,
+#                           chunk store, meta.json, manifest.json, ...)
+#   versions/<version>/.leases/<pid>-<nonce>
+#                           one file per process that has the version open
+# meta.json is written last, so a version without it is an unfinished (or
+# abandoned) build; builds hold a lease on their version while writing it.
+# Readers resolve CURRENT once and then only touch their own snapshot, so a
+# concurrent ingestion can never hand them a half-written index.
+CURRENT_FILENAME = "CURRENT"
+META_FILENAME = "meta.json"
+VERSIONS_DIRNAME = "versions"
+LEASES_DIRNAME = ".leases"
+
+# Files of the pre-versioning layout (written directly into INDEX_DIR).
+LEGACY_FILENAMES = (
+    "index.faiss",
+    "chunks.jsonl",
+    "chunks.rows",
+    "chunks.txt",
+    "chunks.vidmap",
+    "chunks.tables.json",
+    "vectors.f16",
+    "meta.json",
+    "manifest.json",
+)
+
+
+def current_version(index_dir: str) -> Optional[str]:
+    try:
+        name = (Path(index_dir) / CURRENT_FILENAME).read_text(encoding="utf-8").strip()
+    except FileNotFoundError:
+        return None
+    return name or None
+
+
+def version_dir(index_dir: str, version: str) -> Path:
+    return Path(index_dir) / VERSIONS_DIRNAME / version
+
+
+def resolve_index_dir(index_dir: str) -> Tuple[Path, Optional[str]]:
+    """
+    (directory holding the index files, version). Indexes written before
+    versioning live directly in `index_dir` and have no version.
+    """
+    version = current_version(index_dir)
+    if version is None:
+        return Path(index_dir), None
+    return version_dir(index_dir, version), version
+
+
+def new_version(index_dir: str) -> Tuple[str, Path]:
+    """Creates an empty snapshot directory; names sort by creation time."""
+    version = f"{datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%S%f')}-{uuid.uuid4().hex[:6]}"
+    path = version_dir(index_dir, version)
+    path.mkdir(parents=True)
+    return version, path
+
+
+def publish_version(index_dir: str, version: str) -> None:
+    """Atomically points CURRENT at `version` (readers see the old or the new name, never a mix)."""
+    tmp = Path(index_dir) / f"{CURRENT_FILENAME}.{uuid.uuid4().hex[:6]}.tmp"
+    with tmp.open("w", encoding="utf-8") as f:
+        f.write(version)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, Path(index_dir) / CURRENT_FILENAME)
+    logger.info("Published index version %s", version)
+
+
+def acquire_lease(index_dir: str, version: str) -> Path:
+    """Marks `version` as in use by this process until release_lease()."""
+    leases = version_dir(index_dir, version) / LEASES_DIRNAME
+    leases.mkdir(exist_ok=True)
+    lease = leases / f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+    lease.touch()
+    return lease
+
+
+def release_lease(lease: Path) -> None:
+    lease.unlink(missing_ok=True)
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _has_live_lease(path: Path) -> bool:
+    leases = path / LEASES_DIRNAME
+    if not leases.exists():
+        return False
+    for lease in leases.iterdir():
+        try:
+            pid = int(lease.name.split("-", 1)[0])
+        except ValueError:
+            continue
+        # Leases of crashed processes would otherwise pin a version forever.
+        if _pid_alive(pid):
+            return True
+        lease.unlink(missing_ok=True)
+    return False
+
+
+def collect_garbage(index_dir: str, keep: int = 2) -> List[str]:
+    """
+    Deletes snapshots that are neither CURRENT, among the `keep` newest, nor
+    leased by a running process, plus legacy files superseded by CURRENT.
+    Unfinished builds (no meta.json) do not count towards `keep` and are
+    deleted unless their build is still running (leased). Leases are per
+    host (pid-based), so on shared storage keep >= 2 gives other hosts time
+    to pick up the new version. Returns the removed versions.
+    """
+    current = current_version(index_dir)
+    if current is None:
+        return []
+
+    root = Path(index_dir) / VERSIONS_DIRNAME
+    versions = sorted((p for p in root.iterdir() if p.is_dir()), key=lambda p: p.name)
+    complete = [p for p in versions if (p / META_FILENAME).exists()]
+    protected = {current, *(p.name for p in complete[-keep:] if keep > 0)}
+
+    removed: List[str] = []
+    for path in versions:
+        if path.name in protected or _has_live_lease(path):
+            continue
+        shutil.rmtree(path, ignore_errors=True)
+        removed.append(path.name)
+
+    for name in LEGACY_FILENAMES:
+        (Path(index_dir) / name).unlink(missing_ok=True)
+
+    if removed:
+        logger.info("Removed old index versions: %s", ", ".join(removed))
+    return removed
@@ -9,6 +9,11 @@ class HRDocument:
     text: str
     metadata: Dict[str, Any]
 
+    @property
+    def document(self) -> str:
+        """Path relative to the corpus root (`source` is only the file name)."""
+        return str(self.metadata.get("path") or self.source)
+
 
 @dataclass(frozen=True)
 class HRChunk:
@@ -18,4 +23,12 @@ class HRChunk:
     source: str
     chunk_index: int
     start_char: int
-    end_char: int
\ No newline at end of file
+    end_char: int
+
+    @property
+    def document(self) -> str:
+        """
+        Path of the chunk's document relative to the corpus root. `source`
+        (and so `id`) is only the file name, which several folders may share.
+        """
+        return str(self.metadata.get("path") or self.source)
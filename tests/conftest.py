@@ -0,0 +1,73 @@
+from __future__ import annotations
+
+import hashlib
+import types
+from typing import List
+
+import numpy as np
+import pytest
+
+import hr_rag_assistant.ingestion.index_builder as index_builder
+from hr_rag_assistant.types import HRChunk
+
+
+class _FakeEmbeddings:
+    """Deterministic 16-dim embeddings derived from the text hash."""
+
+    def create(self, model, input, **kwargs):
+        data = []
+        for text in input:
+            seed = int(hashlib.md5(text.encode()).hexdigest()[:8], 16)
+            data.append(types.SimpleNamespace(embedding=np.random.default_rng(seed).standard_normal(16).tolist()))
+        return types.SimpleNamespace(data=data)
+
+
+class FakeOpenAI:
+    def __init__(self, *args, **kwargs):
+        self.embeddings = _FakeEmbeddings()
+
+
+@pytest.fixture
+def fake_openai(monkeypatch):
+    """Lets build_and_persist_faiss_index run without network access."""
+    monkeypatch.setattr(index_builder, "OpenAI", FakeOpenAI)
+    return FakeOpenAI
+
+
+def _make_chunks(path: str, n: int) -> List[HRChunk]:
+    """`n` one-line chunks of the document at `path` (source = its file name)."""
+    source = path.rsplit("/", 1)[-1]
+    return [
+        HRChunk(
+            id=f"{path}::chunk_{i:04d}",
+            text=f"{path} paragraph {i}",
+            metadata={"source": source, "path": path, "ext": ".md", "chunk_index": i},
+            source=source,
+            chunk_index=i,
+            start_char=0,
+            end_char=0,
+        )
+        for i in range(n)
+    ]
+
+
+@pytest.fixture
+def make_chunks():
+    """Factory: make_chunks("de/leave.md", 30) -> 30 chunks of that document."""
+    return _make_chunks
+
+
+@pytest.fixture
+def build_index(fake_openai):
+    """Factory: build_index(index_dir, chunks, **kwargs) with the fake embeddings."""
+
+    def build(index_dir, chunks, **kwargs) -> index_builder.IndexBuildStats:
+        return index_builder.build_and_persist_faiss_index(
+            chunks=chunks,
+            index_dir=str(index_dir),
+            openai_api_key="x",
+            embedding_model="fake",
+            **kwargs,
+        )
+
+    return build
@@ -0,0 +1,176 @@
+from __future__ import annotations
+
+import types
+
+import numpy as np
+
+import hr_rag_assistant.generation.answerer as answerer_module
+from hr_rag_assistant.generation.answer_cache import ExactAnswerCache, SemanticAnswerCache
+from hr_rag_assistant.generation.answerer import HRAnswerer
+from hr_rag_assistant.retrieval.vectorstore import RetrievedChunk
+from hr_rag_assistant.types import HRChunk
+
+
+def _put(cache, question, vector, chunk_ids, version="v1", answer="20 days."):
+    cache.put(
+        scope="s",
+        index_version=version,
+        question=question,
+        vector=vector,
+        chunk_ids=chunk_ids,
+        answer=answer,
+        sources=["leave.md :: chunk_0000"],
+        model="chat",
+        used_context_chars=100,
+    )
+
+
+def _lookup(cache, question, vector, chunk_ids, version="v1"):
+    return cache.lookup(
+        scope="s", index_version=version, question=question, vector=vector, chunk_ids=chunk_ids
+    )
+
+
+def test_semantic_matching_overlap_and_invalidation(tmp_path) -> None:
+    path = str(tmp_path / "answers.sqlite")
+    cache = SemanticAnswerCache(path, threshold=0.9, min_chunk_overlap=0.5)
+    v = np.array([1.0, 0.0, 0.0], dtype="float32")
+    _put(cache, "How many leave days do I get?", v, ["a", "b", "c"])
+
+    paraphrase = np.array([0.95, 0.2, 0.0], dtype="float32")  # cosine ~0.98
+    hit = _lookup(cache, "How many days of leave do I get?", paraphrase, ["a", "b", "d"])
+    assert hit is not None and hit.answer == "20 days."
+    assert hit.question == "How many leave days do I get?" and hit.chunk_overlap == 0.5
+
+    # Same question, different evidence (e.g. another filter): no reuse
+    assert _lookup(cache, "How many leave days do I get?", v, ["x", "y", "z"]) is None
+    # Dissimilar question
+    assert _lookup(cache, "Who is my buddy?", np.array([0, 1, 0], "float32"), ["a", "b"]) is None
+    # Without an embedding (keyword query) only the exact question matches
+    assert _lookup(cache, "how many leave days do i get?", None, ["a", "b", "c"]) is not None
+
+    # Persisted and shared: a second process sees the entry...
+    other = SemanticAnswerCache(path, threshold=0.9)
+    assert _lookup(other, "How many leave days do I get?", v, ["a", "b", "c"]) is not None
+    # ...but not for another index version, and serving a new version does not
+    # delete the answers workers on the old version still use.
+    assert _lookup(other, "How many leave days do I get?", v, ["a", "b", "c"], "v2") is None
+    assert _lookup(cache, "How many leave days do I get?", v, ["a", "b", "c"]) is not None
+
+    stats = cache.stats()
+    assert (stats.hits, stats.misses, stats.entries) == (3, 2, 1)
+
+
+class _FakeChat:
+    def __init__(self, **kwargs):
+        self.calls = 0
+        self.chat = types.SimpleNamespace(completions=self)
+
+    def create(self, **kwargs):
+        self.calls += 1
+        message = types.SimpleNamespace(content=f"answer {self.calls}")
+        return types.SimpleNamespace(choices=[types.SimpleNamespace(message=message)])
+
+
+def test_answerer_reuses_cached_answers(tmp_path, monkeypatch) -> None:
+    monkeypatch.setattr(answerer_module, "OpenAI", _FakeChat)
+    cache = SemanticAnswerCache(str(tmp_path / "answers.sqlite"), threshold=0.9)
+    answerer = HRAnswerer(openai_api_key="test", chat_model="chat", answer_cache=cache)
+
+    chunk = HRChunk(
+        id="leave.md::chunk_0000",
+        text="Employees get 20 days.",
+        metadata={"source": "leave.md"},
+        source="leave.md",
+        chunk_index=0,
+        start_char=0,
+        end_char=22,
+    )
+    hits = [RetrievedChunk(chunk=chunk, score=0.8)]
+    v = np.array([0.6, 0.8], dtype="float32")
+
+    def ask(question, **kwargs):
+        return answerer.answer(question=question, hits=hits, query_vector=v, **kwargs)
+
+    first = ask("How much leave?", index_version="v1")
+    again = ask("How much leave do I get?", index_version="v1")
+    assert first.cached_from is None and first.sources == ["leave.md :: chunk_0000"]
+    assert again.answer == "answer 1" and again.cached_from == "How much leave?"
+    assert again.sources == first.sources
+
+    # Other generation settings, or an unversioned index, are not served from the cache
+    assert ask("How much leave?", index_version="v1", temperature=0.7).cached_from is None
+    assert ask("How much leave?", index_version=None).cached_from is None
+    assert answerer.oai.calls == 3
+
+
+def test_exact_cache_replays_identical_requests_only(tmp_path) -> None:
+    cache = ExactAnswerCache(str(tmp_path / "answers.sqlite"), max_entries=3, ttl_seconds=0)
+    request = dict(scope="chat|t=0", question="How many leave days?", chunk_ids=["a", "b"])
+    cache.put(
+        index_version="v1",
+        answer="20 days.",
+        sources=["leave.md :: chunk_0000"],
+        model="chat",
+        used_context_chars=100,
+        **request,
+    )
+
+    hit = cache.lookup(index_version="v1", **{**request, "question": "  how many LEAVE days? "})
+    assert hit is not None and hit.answer == "20 days."
+    # Shared across processes/restarts through the file
+    reopened = ExactAnswerCache(str(tmp_path / "answers.sqlite"), max_entries=3, ttl_seconds=0)
+    assert reopened.lookup(index_version="v1", **request) is not None
+    # Different evidence order, scope or index version: no hit
+    assert cache.lookup(index_version="v1", **{**request, "chunk_ids": ["b", "a"]}) is None
+    assert cache.lookup(index_version="v1", **{**request, "scope": "chat|t=0.7"}) is None
+    assert cache.lookup(index_version="v2", **request) is None
+    # Serving v2 leaves v1's answers to workers still on it (eviction ages them out)
+    assert reopened.lookup(index_version="v1", **request) is not None
+
+    for i in range(5):
+        cache.put(
+            index_version="v2",
+            answer=f"answer {i}",
+            sources=[],
+            model="chat",
+            used_context_chars=1,
+            **{**request, "question": f"question {i}"},
+        )
+    assert cache.stats().entries <= 3
+    # v1's answer was least recently used
+    assert reopened.lookup(index_version="v1", **request) is None
+
+
+def test_semantic_cache_loads_other_writers_incrementally(tmp_path) -> None:
+    path = str(tmp_path / "answers.sqlite")
+    cache = SemanticAnswerCache(path, threshold=0.9)
+    v = np.array([1.0, 0.0, 0.0], dtype="float32")
+    _put(cache, "How many leave days do I get?", v, ["a"])
+    assert _lookup(cache, "How many leave days do I get?", v, ["a"]) is not None
+    entries = cache._scopes[("s", "v1")]
+
+    # The exact cache shares the file: its writes do not reload the scope...
+    exact = ExactAnswerCache(path)
+    exact.put(
+        scope="s",
+        index_version="v1",
+        question="q",
+        chunk_ids=["a"],
+        answer="x",
+        sources=[],
+        model="chat",
+        used_context_chars=1,
+    )
+    # ...and another worker's answer is appended to it
+    other = SemanticAnswerCache(path, threshold=0.9)
+    w = np.array([0.0, 1.0, 0.0], dtype="float32")
+    _put(other, "Who is my buddy?", w, ["b"], answer="Your manager picks one.")
+    hit = _lookup(cache, "Who is my buddy?", w, ["b"])
+    assert hit is not None and hit.answer == "Your manager picks one."
+    assert cache._scopes[("s", "v1")] is entries and len(entries.row_ids) == 2
+
+    # A delete by any process drops the in-memory entries
+    other.clear()
+    assert _lookup(cache, "Who is my buddy?", w, ["b"]) is None
+    assert cache._scopes[("s", "v1")].row_ids == []
@@ -0,0 +1,71 @@
+from __future__ import annotations
+
+import asyncio
+import types
+
+import hr_rag_assistant.generation.answerer as answerer_module
+import hr_rag_assistant.ingestion.index_builder as index_builder
+from hr_rag_assistant.embeddings.embedders import OpenAIEmbedder
+from hr_rag_assistant.embeddings.query_cache import QueryEmbeddingCache
+from hr_rag_assistant.generation.answerer import HRAnswerer
+from hr_rag_assistant.generation.pipeline import AsyncHRPipeline
+from hr_rag_assistant.retrieval.retriever import HRRetriever
+from hr_rag_assistant.types import HRChunk
+
+
+class _AsyncChat:
+    """Chat completions that take a while, to check requests overlap."""
+
+    def __init__(self):
+        self.chat = types.SimpleNamespace(completions=self)
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def create(self, **kwargs):
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        await asyncio.sleep(0.01)
+        self.in_flight -= 1
+        message = types.SimpleNamespace(content="20 days.")
+        return types.SimpleNamespace(choices=[types.SimpleNamespace(message=message)])
+
+
+def test_async_pipeline_matches_sync_retrieval(tmp_path, fake_openai, monkeypatch) -> None:
+    chunks = [
+        HRChunk(
+            id=f"leave.md::chunk_{i:04d}",
+            text=f"leave paragraph {i}",
+            metadata={"source": "leave.md"},
+            source="leave.md",
+            chunk_index=i,
+            start_char=0,
+            end_char=0,
+        )
+        for i in range(50)
+    ]
+    index_builder.build_and_persist_faiss_index(
+        chunks=chunks, index_dir=str(tmp_path), openai_api_key="x", embedding_model="fake"
+    )
+    monkeypatch.setattr(answerer_module, "OpenAI", lambda **kwargs: None)
+
+    embedder = OpenAIEmbedder(model="fake", client=fake_openai())
+    retriever = HRRetriever(
+        index_dir=str(tmp_path),
+        embedder=embedder,
+        query_cache=QueryEmbeddingCache(),
+        lazy_load=True,
+    )
+    chat = _AsyncChat()
+    answerer = HRAnswerer(openai_api_key="x", chat_model="chat", async_client=chat)
+    pipeline = AsyncHRPipeline(retriever=retriever, answerer=answerer, max_concurrency=8)
+
+    questions = [f"How does leave rule {i} work?" for i in range(20)]
+    assert retriever._store is None
+    results = asyncio.run(pipeline.ask_many(questions))
+
+    assert [r.retrieval.query for r in results] == questions
+    assert chat.max_in_flight == 8  # answered concurrently, bounded by max_concurrency
+    for r in results:
+        sync = retriever.retrieve(r.retrieval.query, top_k=5)
+        assert [h.chunk.id for h in r.retrieval.results] == [h.chunk.id for h in sync.results]
+        assert r.answer.answer == "20 days." and r.answer.sources
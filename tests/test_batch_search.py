@@ -0,0 +1,46 @@
+from __future__ import annotations
+
+import numpy as np
+
+import hr_rag_assistant.retrieval.retriever as retriever_module
+from hr_rag_assistant.retrieval.index_spec import IndexSpec
+from hr_rag_assistant.retrieval.retriever import HRRetriever
+
+
+def _ids(hits):
+    return [(h.chunk.id, round(h.score, 4)) for h in hits]
+
+
+def test_search_batch_matches_single_searches(
+    tmp_path, fake_openai, make_chunks, build_index, monkeypatch
+) -> None:
+    build_index(
+        tmp_path,
+        make_chunks("leave.md", 200) + make_chunks("remote.md", 5),
+        index_spec=IndexSpec(kind="hnsw", hnsw_m=8, quantizer="fp16", store_vectors=True),
+    )
+
+    requests = []
+
+    class CountingOpenAI(fake_openai):
+        def __init__(self, *args, **kwargs):
+            super().__init__()
+            create = self.embeddings.create
+            self.embeddings.create = lambda **kw: requests.append(len(kw["input"])) or create(**kw)
+
+    monkeypatch.setattr(retriever_module, "OpenAI", CountingOpenAI)
+    retriever = HRRetriever(index_dir=str(tmp_path), openai_api_key="x", embedding_model="fake")
+
+    queries = [f"question {i}" for i in range(40)]
+    batch = retriever.retrieve_many(queries, top_k=6)
+    assert requests == [40]
+    assert [r.query for r in batch] == queries
+    for r in batch:
+        assert _ids(r.results) == _ids(retriever.retrieve(r.query, top_k=6).results)
+
+    Q = np.random.default_rng(0).standard_normal((10, 16)).astype("float32")
+    filtered = retriever.store.search_batch(Q, top_k=8, filters={"source": "remote.md"})
+    assert [len(hits) for hits in filtered] == [5] * 10
+    assert _ids(filtered[3]) == _ids(
+        retriever.store.search(Q[3], top_k=8, filters={"source": "remote.md"})
+    )
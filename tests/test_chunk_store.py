@@ -0,0 +1,39 @@
+from __future__ import annotations
+
+from hr_rag_assistant.retrieval.chunk_store import ChunkStore, ChunkStoreWriter, open_chunk_store
+from hr_rag_assistant.types import HRChunk
+
+
+def _chunk(source: str, idx: int, text: str) -> HRChunk:
+    return HRChunk(
+        id=f"{source}::chunk_{idx:04d}",
+        text=text,
+        source=source,
+        chunk_index=idx,
+        start_char=idx * 10,
+        end_char=idx * 10 + len(text),
+        metadata={"source": source, "path": f"eu/{source}", "chunk_index": idx,
+                  "start_char": idx * 10, "end_char": idx * 10 + len(text)},
+    )
+
+
+def test_binary_chunk_store_roundtrip(tmp_path) -> None:
+    chunks = [
+        _chunk("leave.md", 0, "Annual leave — 25 days."),
+        _chunk("leave.md", 1, "Carry over ≤ 5 days."),
+        _chunk("remote.md", 0, "Two remote days per week."),
+    ]
+    vector_ids = [7, 2, 11]
+
+    writer = ChunkStoreWriter(str(tmp_path))
+    for c, vid in zip(chunks, vector_ids):
+        writer.add(c, vid)
+    writer.commit(next_vector_id=12)
+
+    store = open_chunk_store(str(tmp_path))
+    assert isinstance(store, ChunkStore)
+    assert len(store) == 3
+    assert list(store) == chunks
+    assert store.get_by_vector_id(2) == chunks[1]
+    assert store.row_for_vector_id(3) is None
+    assert store.row_for_vector_id(99) is None
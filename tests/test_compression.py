@@ -0,0 +1,46 @@
+from __future__ import annotations
+
+from hr_rag_assistant.generation.citations import unique_sources
+from hr_rag_assistant.generation.compression import GAP, compress_hits
+from hr_rag_assistant.retrieval.vectorstore import RetrievedChunk
+from hr_rag_assistant.types import HRChunk
+
+
+def _hit(i: int, text: str) -> RetrievedChunk:
+    chunk = HRChunk(
+        id=f"policy.md::chunk_{i:04d}",
+        text=text,
+        metadata={"source": "policy.md"},
+        source="policy.md",
+        chunk_index=i,
+        start_char=0,
+        end_char=len(text),
+    )
+    return RetrievedChunk(chunk=chunk, score=1.0 - i / 10)
+
+
+def test_compress_hits_keeps_relevant_sentences_and_neighbours() -> None:
+    filler = [f"Office rule {i} covers desk booking and visitor badges." for i in range(8)]
+    sentences = filler[:4] + [
+        "Parental leave lasts sixteen weeks at full pay.",
+        "It can be split into two blocks.",
+    ] + filler[4:]
+    hits = [
+        _hit(0, " ".join(sentences)),
+        _hit(1, "Expense claims are reimbursed monthly."),
+    ]
+
+    out = compress_hits("How long is parental leave?", hits, neighbors=1)
+
+    text = out[0].chunk.text
+    assert text == (
+        GAP.lstrip() + " ".join(sentences[3:6]) + GAP.rstrip()
+    )
+    assert len(text) < 0.5 * len(hits[0].chunk.text)
+    # Hits without question terms stay whole; ids, scores and citations unchanged
+    assert out[1] == hits[1]
+    assert [h.chunk.id for h in out] == [h.chunk.id for h in hits]
+    assert [h.score for h in out] == [h.score for h in hits]
+    assert unique_sources(out) == unique_sources(hits)
+
+    assert compress_hits("the and of", hits) == hits
@@ -0,0 +1,61 @@
+from __future__ import annotations
+
+import numpy as np
+import pytest
+
+from hr_rag_assistant.embeddings.embedders import HashingEmbedder, create_embedder
+from hr_rag_assistant.ingestion.index_builder import build_and_persist_faiss_index
+from hr_rag_assistant.retrieval.retriever import HRRetriever
+from hr_rag_assistant.retrieval.vectorstore import FaissVectorStore
+from hr_rag_assistant.types import HRChunk
+
+TEXTS = [
+    "Sick leave longer than three days requires a medical certificate.",
+    "The probation period lasts six months.",
+    "Employees may work remotely up to two days per week.",
+]
+
+
+def _chunks():
+    return [
+        HRChunk(
+            id=f"policy.md::chunk_{i:04d}",
+            text=text,
+            metadata={"source": "policy.md"},
+            source="policy.md",
+            chunk_index=i,
+            start_char=0,
+            end_char=len(text),
+        )
+        for i, text in enumerate(TEXTS)
+    ]
+
+
+def test_hashing_embedder_is_deterministic_and_normalized() -> None:
+    embedder = HashingEmbedder(dimension=256)
+    x = embedder.embed(["Medical certificate", "medical  CERTIFICATE", ""])
+    assert x.shape == (3, 256) and x.dtype == np.float32
+    assert np.allclose(x[0], x[1]) and np.isclose(np.linalg.norm(x[0]), 1.0)
+    assert not x[2].any()
+    assert np.allclose(HashingEmbedder(dimension=256).embed(["Medical certificate"])[0], x[0])
+    with pytest.raises(ValueError):
+        create_embedder("word2vec", model="m")
+
+
+def test_offline_ingest_and_retrieve_with_embedder_check(tmp_path) -> None:
+    embedder = HashingEmbedder(dimension=128)
+    build_and_persist_faiss_index(chunks=_chunks(), index_dir=str(tmp_path), embedder=embedder)
+
+    store = FaissVectorStore(str(tmp_path))
+    assert store.meta["embedder"] == embedder.identity()
+    assert store.meta["embedding_model"] == "hashing-v1-128"
+
+    retriever = HRRetriever(index_dir=str(tmp_path), embedder=embedder)
+    hits = retriever.retrieve("Do I need a medical certificate when I'm sick?", top_k=1).results
+    assert hits[0].chunk.id == "policy.md::chunk_0000"
+
+    # Vectors of another embedder (or size) are not comparable: refuse to load
+    with pytest.raises(RuntimeError, match="built with embedder"):
+        HRRetriever(index_dir=str(tmp_path), embedder=HashingEmbedder(dimension=256))
+    with pytest.raises(RuntimeError, match="built with embedder"):
+        HRRetriever(index_dir=str(tmp_path), openai_api_key="x", embedding_model="hashing-v1-128")
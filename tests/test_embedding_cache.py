@@ -0,0 +1,51 @@
+from __future__ import annotations
+
+import numpy as np
+
+from hr_rag_assistant.embeddings.cache import EmbeddingCache, embed_texts
+
+
+class _FakeEmbeddings:
+    def __init__(self) -> None:
+        self.inputs = []
+
+    def create(self, *, model, input):
+        self.inputs.append(list(input))
+        data = [type("E", (), {"embedding": [float(len(t)), 1.0]})() for t in input]
+        return type("R", (), {"data": data})()
+
+
+class _FakeClient:
+    def __init__(self) -> None:
+        self.embeddings = _FakeEmbeddings()
+
+
+def test_embed_texts_only_calls_api_for_misses(tmp_path) -> None:
+    cache = EmbeddingCache(str(tmp_path / "emb.sqlite"), max_entries=100)
+    client = _FakeClient()
+
+    first = embed_texts(client, model="m", texts=["a", "bb"], cache=cache)
+    second = embed_texts(client, model="m", texts=["bb", "ccc", "a"], cache=cache)
+
+    assert client.embeddings.inputs == [["a", "bb"], ["ccc"]]
+    np.testing.assert_allclose(second[0], first[1])
+    np.testing.assert_allclose(second[2], first[0])
+
+    stats = cache.stats()
+    assert (stats.hits, stats.misses, stats.entries) == (2, 3, 3)
+
+
+def test_cache_key_includes_model_and_evicts_lru(tmp_path) -> None:
+    cache = EmbeddingCache(str(tmp_path / "emb.sqlite"), max_entries=2)
+    vec = np.ones((1, 2), dtype="float32")
+
+    cache.put_many("m", None, ["old"], vec)
+    cache.put_many("m", None, ["new"], vec)
+    assert cache.get_many("other-model", None, ["new"]) == [None]
+
+    cache.get_many("m", None, ["new"])
+    cache.put_many("m", None, ["newest"], vec)
+
+    hits = cache.get_many("m", None, ["old", "new", "newest"])
+    assert hits[0] is None
+    assert cache.stats().entries <= 2
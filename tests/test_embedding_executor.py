@@ -0,0 +1,48 @@
+from __future__ import annotations
+
+import random
+import time
+
+import httpx
+import openai
+
+from hr_rag_assistant.embeddings.executor import EmbeddingExecutor, TokenBucket
+
+
+class _FlakyEmbeddings:
+    def __init__(self, failures: int) -> None:
+        self.failures = failures
+        self.calls = 0
+
+    def create(self, *, model, input):
+        self.calls += 1
+        if self.failures > 0:
+            self.failures -= 1
+            raise openai.APIConnectionError(request=httpx.Request("POST", "https://example.invalid"))
+        time.sleep(random.random() / 100)
+        data = [type("E", (), {"embedding": [float(t), 0.0]})() for t in input]
+        return type("R", (), {"data": data})()
+
+
+class _Client:
+    def __init__(self, failures: int = 0) -> None:
+        self.embeddings = _FlakyEmbeddings(failures)
+
+
+def test_executor_keeps_batch_order_and_retries() -> None:
+    client = _Client(failures=2)
+    executor = EmbeddingExecutor(client, model="m", max_in_flight=4, backoff_base=0.0)
+
+    batches = [[str(i), str(i + 1)] for i in range(0, 40, 2)]
+    out = list(executor.map(iter(batches)))
+
+    assert [m[:, 0].tolist() for m in out] == [[float(i), float(i + 1)] for i in range(0, 40, 2)]
+    assert client.embeddings.calls == len(batches) + 2
+
+
+def test_token_bucket_unlimited_and_clamped() -> None:
+    TokenBucket(0).acquire(10**9)
+    bucket = TokenBucket(60)
+    start = time.monotonic()
+    bucket.acquire(1000)  # clamped to the full budget, so it does not block forever
+    assert time.monotonic() - start < 0.5
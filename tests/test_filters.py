@@ -0,0 +1,40 @@
+from __future__ import annotations
+
+import numpy as np
+
+from hr_rag_assistant.retrieval.filters import MetadataFilter, as_filter
+from hr_rag_assistant.retrieval.index_spec import IndexSpec
+from hr_rag_assistant.retrieval.vectorstore import FaissVectorStore
+
+
+def test_metadata_filter_normalization() -> None:
+    assert as_filter({"source": "a.md", "ext": ".md"}) == MetadataFilter(
+        sources=["a.md"], equals={"ext": ".md"}
+    )
+    assert MetadataFilter().is_empty
+    assert MetadataFilter(path_prefixes="de/").matches("x.md", {"path": "de\\x.md"})
+    assert not MetadataFilter(sources="a.md").matches("b.md", {})
+
+
+def test_filtered_search_returns_only_matching_chunks(tmp_path, make_chunks, build_index) -> None:
+    chunks = (
+        make_chunks("de/remote_work_policy.md", 3)
+        + make_chunks("de/leave_policy.md", 30)
+        + make_chunks("fr/leave.md", 300)
+    )
+    build_index(tmp_path, chunks, index_spec=IndexSpec(kind="hnsw", hnsw_m=4, ef_search=4))
+    store = FaissVectorStore(str(tmp_path))
+    q = np.random.default_rng(0).standard_normal(16).tolist()
+
+    hits = store.search(q, top_k=5, filters={"source": "remote_work_policy.md"})
+    assert len(hits) == 3 and {h.chunk.source for h in hits} == {"remote_work_policy.md"}
+
+    hits = store.search(q, top_k=10, filters=MetadataFilter(path_prefixes="de/"))
+    assert len(hits) == 10 and all(h.chunk.metadata["path"].startswith("de/") for h in hits)
+    # Exact ranking over the matching chunks (fresh build: vector id == chunk position)
+    qv = np.array(q, dtype="float32") / np.linalg.norm(q)
+    matching = [i for i, c in enumerate(chunks) if c.metadata["path"].startswith("de/")]
+    expected = sorted(matching, key=lambda i: -float(store.index.reconstruct(i) @ qv))[:10]
+    assert [h.chunk.id for h in hits] == [chunks[i].id for i in expected]
+
+    assert store.search(q, top_k=5, filters={"source": "missing.md"}) == []
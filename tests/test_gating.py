@@ -0,0 +1,67 @@
+from __future__ import annotations
+
+from hr_rag_assistant.generation.gating import (
+    CalibrationSample,
+    GateThresholds,
+    calibrate_thresholds,
+    gate_retrieval,
+)
+from hr_rag_assistant.retrieval.retriever import RetrievalResult
+from hr_rag_assistant.retrieval.vectorstore import RetrievedChunk
+from hr_rag_assistant.types import HRChunk
+
+
+def _retrieval(similarities, mode="dense") -> RetrievalResult:
+    hits = []
+    for i, sim in enumerate(similarities):
+        chunk = HRChunk(
+            id=f"leave.md::chunk_{i:04d}",
+            text=f"paragraph {i}",
+            metadata={"source": "leave.md"},
+            source="leave.md",
+            chunk_index=i,
+            start_char=0,
+            end_char=0,
+        )
+        hits.append(RetrievedChunk(chunk=chunk, score=sim))
+    sims = {h.chunk.id: h.score for h in hits} if mode != "lexical" else {}
+    return RetrievalResult(query="q", top_k=len(hits), results=hits, mode=mode, similarities=sims)
+
+
+def test_gate_refuses_low_or_flat_scores_and_cuts_weak_hits() -> None:
+    t = GateThresholds(min_score=0.3, min_margin=0.05, confident_score=0.5, relative_cutoff=0.1)
+
+    assert gate_retrieval(_retrieval([]), t).reason == "no hits"
+    low = gate_retrieval(_retrieval([0.22, 0.21, 0.20]), t)
+    assert not low.answer and low.reason == "low similarity" and low.hits == []
+    flat = gate_retrieval(_retrieval([0.40, 0.39, 0.38, 0.38]), t)
+    assert not flat.answer and flat.reason == "no clear best match"
+
+    ok = gate_retrieval(_retrieval([0.62, 0.58, 0.40, 0.35]), t)
+    assert ok.answer
+    assert [h.score for h in ok.hits] == [0.62, 0.58]
+
+    # Keyword retrievals have no similarities: any hit goes to the model
+    lexical = gate_retrieval(_retrieval([7.5, 3.1], mode="lexical"), t)
+    assert lexical.answer and len(lexical.hits) == 2
+
+
+def test_calibrate_thresholds_keeps_recall_and_refuses_out_of_scope() -> None:
+    samples = [
+        CalibrationSample(
+            top_score=0.55 + i / 100, margin=0.08, answerable=True, relevant_drop=0.06
+        )
+        for i in range(20)
+    ] + [
+        CalibrationSample(top_score=0.20 + i / 100, margin=0.01, answerable=False)
+        for i in range(10)
+    ]
+
+    report = calibrate_thresholds(samples, target_recall=1.0)
+
+    assert report.recall == 1.0 and report.refusal_rate == 1.0
+    assert 0.29 < report.thresholds.min_score <= 0.55
+    assert report.thresholds.relative_cutoff == 0.07
+    for sample in samples:
+        r = _retrieval([sample.top_score, sample.top_score - sample.margin])
+        assert gate_retrieval(r, report.thresholds).answer == sample.answerable
@@ -0,0 +1,59 @@
+from __future__ import annotations
+
+import numpy as np
+import pytest
+
+from hr_rag_assistant.retrieval.index_spec import IndexSpec
+
+
+def test_index_spec_adapts_to_small_training_sets() -> None:
+    spec = IndexSpec(kind="ivf_flat", nlist=1024)
+    assert spec.adapted_to(390).nlist == 10
+    assert spec.adapted_to(5).nlist == 1
+    assert IndexSpec(kind="ivf_pq", pq_nbits=8).adapted_to(100).kind == "flat"
+    assert IndexSpec(kind="hnsw").adapted_to(5).kind == "hnsw"
+
+
+def test_index_spec_meta_roundtrip_and_search() -> None:
+    spec = IndexSpec(kind="hnsw", hnsw_m=8, ef_search=32)
+    assert IndexSpec.from_meta({"index": spec.to_meta()}) == spec
+    assert IndexSpec.from_meta({}).kind == "flat"
+    assert spec.build_key() != IndexSpec(kind="hnsw", hnsw_m=16).build_key()
+
+    x = np.random.default_rng(0).standard_normal((200, 16)).astype("float32")
+    x /= np.linalg.norm(x, axis=1, keepdims=True)
+    index = spec.create(16)
+    index.add_with_ids(x, np.arange(200, dtype="int64") * 2)
+    _, I = index.search(x[:1], 1, params=spec.search_params())
+    assert I[0, 0] == 0
+
+    with pytest.raises(ValueError):
+        IndexSpec(kind="annoy")
+
+
+def test_quantized_index_with_exact_rescoring(tmp_path) -> None:
+    from hr_rag_assistant.retrieval.exact_vectors import ExactVectors, ExactVectorWriter
+
+    spec = IndexSpec(kind="flat", quantizer="int8", store_vectors=True)
+    assert spec.needs_training and not spec.is_exact
+    assert IndexSpec().build_key() == {"kind": "flat"}
+    with pytest.raises(ValueError):
+        IndexSpec(kind="ivf_pq", quantizer="fp16")
+
+    x = np.random.default_rng(1).standard_normal((300, 16)).astype("float32")
+    x /= np.linalg.norm(x, axis=1, keepdims=True)
+    index = spec.create(16)
+    index.train(x)
+    index.add_with_ids(x, np.arange(300, dtype="int64"))
+
+    writer = ExactVectorWriter(str(tmp_path))
+    writer.write(np.arange(0, 150, dtype="int64"), x[:150])
+    writer.write(np.arange(150, 300, dtype="int64"), x[150:])
+    writer.commit(300)
+
+    vectors = ExactVectors(str(tmp_path), 16)
+    assert len(vectors) == 300
+    _, I = index.search(x[:1], 10)
+    exact = vectors.scores(x[0], I[0])
+    assert np.allclose(exact, x[I[0]] @ x[0], atol=1e-2)
+    assert int(I[0][np.argmax(exact)]) == 0
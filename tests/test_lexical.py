@@ -0,0 +1,161 @@
+from __future__ import annotations
+
+from dataclasses import replace
+
+import numpy as np
+
+import hr_rag_assistant.ingestion.index_builder as index_builder
+import hr_rag_assistant.retrieval.retriever as retriever_module
+from hr_rag_assistant.retrieval.hybrid import keyword_terms, reciprocal_rank_fusion
+from hr_rag_assistant.retrieval.lexical import BM25Index, BM25Writer
+from hr_rag_assistant.retrieval.retriever import HRRetriever
+from hr_rag_assistant.retrieval.vectorstore import FaissVectorStore, RetrievedChunk
+from hr_rag_assistant.types import HRChunk
+
+TEXTS = {
+    "leave.md": [
+        "Employees accrue PTO monthly; unused PTO carries over up to five days.",
+        "Sick leave longer than three days requires a medical certificate.",
+        "Parental leave is sixteen weeks for the primary caregiver.",
+    ],
+    "onboarding.md": [
+        "The probation period lasts six months and may be extended once.",
+        "New hires receive a laptop on their first day.",
+    ],
+}
+
+
+def _chunks():
+    return [
+        HRChunk(
+            id=f"{source}::chunk_{i:04d}",
+            text=text,
+            metadata={"source": source},
+            source=source,
+            chunk_index=i,
+            start_char=0,
+            end_char=len(text),
+        )
+        for source, texts in TEXTS.items()
+        for i, text in enumerate(texts)
+    ]
+
+
+def _build(index_dir):
+    index_builder.build_and_persist_faiss_index(
+        chunks=_chunks(), index_dir=str(index_dir), openai_api_key="x", embedding_model="fake"
+    )
+
+
+def test_bm25_ranks_exact_terms_and_honours_filters(tmp_path, fake_openai) -> None:
+    _build(tmp_path)
+    store = FaissVectorStore(str(tmp_path))
+    assert store.has_lexical and store.meta["lexical"]["kind"] == "bm25"
+
+    hits = store.search_lexical("medical certificate", top_k=3)
+    assert [h.chunk.id for h in hits] == ["leave.md::chunk_0001"]
+
+    hits = store.search_lexical("PTO leave probation", top_k=5)
+    assert hits[0].chunk.id == "leave.md::chunk_0000"  # "pto" twice
+    assert {h.chunk.source for h in hits} == {"leave.md", "onboarding.md"}
+
+    hits = store.search_lexical("PTO leave probation", top_k=5, filters={"source": "onboarding.md"})
+    assert [h.chunk.id for h in hits] == ["onboarding.md::chunk_0000"]
+    assert store.search_lexical("the of and", top_k=5) == []
+
+
+def test_keyword_fast_path_skips_embedding_and_hybrid_fuses(
+    tmp_path, fake_openai, monkeypatch
+) -> None:
+    _build(tmp_path)
+    requests = []
+
+    class CountingOpenAI(fake_openai):
+        def __init__(self, *args, **kwargs):
+            super().__init__()
+            create = self.embeddings.create
+            self.embeddings.create = lambda **kw: requests.append(kw["input"]) or create(**kw)
+
+    monkeypatch.setattr(retriever_module, "OpenAI", CountingOpenAI)
+    retriever = HRRetriever(
+        index_dir=str(tmp_path),
+        openai_api_key="x",
+        embedding_model="fake",
+        retrieval_mode="hybrid",
+        lexical_fast_path=True,
+    )
+
+    result = retriever.retrieve("Probation", top_k=3)
+    assert result.mode == "lexical" and requests == []
+    assert result.results[0].chunk.id == "onboarding.md::chunk_0000"
+
+    # A sentence, or a keyword the index does not know, goes through the embedding
+    result = retriever.retrieve("How long is the probation period?", top_k=3)
+    assert result.mode == "hybrid" and len(requests) == 1
+    # Whatever the (random) dense ranking, the exact-term chunk is recovered
+    assert "onboarding.md::chunk_0000" in [h.chunk.id for h in result.results]
+    assert retriever.retrieve("sabbatical", top_k=3).mode == "hybrid"
+
+    batch = retriever.retrieve_many(["PTO", "When do I get a laptop?"], top_k=2)
+    assert [r.mode for r in batch] == ["lexical", "hybrid"]
+    assert requests[2:] == [["When do I get a laptop?"]]
+
+
+def test_reciprocal_rank_fusion_and_keyword_detection() -> None:
+    def hit(cid, score):
+        chunk = HRChunk(
+            id=cid, text="", metadata={}, source="", chunk_index=0, start_char=0, end_char=0
+        )
+        return RetrievedChunk(chunk=chunk, score=score)
+
+    dense = [hit("a", 0.9), hit("b", 0.8), hit("c", 0.7)]
+    lexical = [hit("c", 12.0), hit("d", 9.0)]
+    fused = reciprocal_rank_fusion([dense, lexical], top_k=3, k=60)
+    # "b" and "d" tie at rank 2 of one list each; the first list wins ties
+    assert [h.chunk.id for h in fused] == ["c", "a", "b"]
+    assert abs(fused[0].score - (1 / 63 + 1 / 61)) < 1e-12
+
+    # the chunker's ids repeat across folders and shards; those hits stay apart
+    de, fr = hit("leave.md::chunk_0000", 0.9), hit("leave.md::chunk_0000", 0.8)
+    de.chunk.metadata["path"], fr.chunk.metadata["path"] = "de/leave.md", "fr/leave.md"
+    other_shard = replace(de, shard="eu")
+    fused = reciprocal_rank_fusion([[de, fr], [fr, other_shard]], top_k=5, k=60)
+    assert [(h.shard, h.chunk.document) for h in fused] == [
+        (None, "fr/leave.md"),
+        (None, "de/leave.md"),
+        ("eu", "de/leave.md"),
+    ]
+
+    assert keyword_terms("PTO") == ["pto"]
+    assert keyword_terms("medical certificate") == ["medical", "certificate"]
+    assert keyword_terms("How many PTO days?") == []
+    assert keyword_terms("the probation") == []
+
+
+def test_bm25_writer_spills_bounded_runs_and_merges_them(tmp_path) -> None:
+    texts = [text for texts in TEXTS.values() for text in texts] * 20
+    small_dir, big_dir = tmp_path / "small", tmp_path / "big"
+    small_dir.mkdir()
+    big_dir.mkdir()
+
+    # Postings held in memory never reach max_buffered_postings: full
+    # buffers are spilled to sorted run files
+    small = BM25Writer(str(small_dir), max_buffered_postings=16)
+    for vid, text in enumerate(texts):
+        small.add(text, vid)
+        assert small.buffered_postings < 16
+    assert len(list(small_dir.glob("bm25.run*.tmp"))) > 5
+    small.commit()
+    assert list(small_dir.glob("*.tmp")) == []
+
+    big = BM25Writer(str(big_dir))
+    for vid, text in enumerate(texts):
+        big.add(text, vid)
+    big.commit()
+
+    merged, in_memory = BM25Index(str(small_dir)), BM25Index(str(big_dir))
+    for query in (["pto"], ["leave", "probation"], ["medical", "laptop", "days"]):
+        scores_a, ids_a = merged.search(query, top_k=10)
+        scores_b, ids_b = in_memory.search(query, top_k=10)
+        assert np.array_equal(ids_a, ids_b) and np.allclose(scores_a, scores_b)
+        assert merged.idf(query[0]) == in_memory.idf(query[0])
@@ -0,0 +1,87 @@
+from __future__ import annotations
+
+import pytest
+
+from hr_rag_assistant.ingestion.manifest import IndexManifest, ManifestChunk, content_hash
+from hr_rag_assistant.ingestion.pipeline import IngestionStats, iter_corpus_chunks
+from hr_rag_assistant.types import HRChunk, HRDocument
+
+
+def _doc(source: str, text: str) -> HRDocument:
+    return HRDocument(source=source, text=text, metadata={"source": source})
+
+
+def test_manifest_roundtrip_and_document_diff(tmp_path) -> None:
+    manifest = IndexManifest(
+        embedding_model="m",
+        dimension=4,
+        next_vector_id=2,
+        documents={"a.md": content_hash("alpha"), "b.md": content_hash("beta")},
+        chunks={
+            "a.md::chunk_0000": ManifestChunk(
+                hash=content_hash("alpha"), vector_id=0, document="a.md"
+            )
+        },
+    )
+    manifest.save(str(tmp_path))
+    loaded = IndexManifest.load(str(tmp_path))
+    assert loaded == manifest
+
+    diff = loaded.diff_documents(
+        [_doc("a.md", "alpha"), _doc("b.md", "beta v2"), _doc("c.md", "new")]
+    )
+    assert diff.unchanged == ["a.md"]
+    assert diff.changed == ["b.md"]
+    assert diff.added == ["c.md"]
+    assert diff.removed == []
+
+
+def test_reusable_vector_id_requires_same_text() -> None:
+    manifest = IndexManifest(
+        embedding_model="m",
+        dimension=4,
+        chunks={
+            "a.md::chunk_0000": ManifestChunk(
+                hash=content_hash("alpha"), vector_id=7, document="a.md"
+            )
+        },
+    )
+    chunk = HRChunk(
+        id="a.md::chunk_0000",
+        text="alpha",
+        metadata={},
+        source="a.md",
+        chunk_index=0,
+        start_char=0,
+        end_char=5,
+    )
+    assert manifest.reusable_vector_id(chunk, content_hash("alpha")) == 7
+    assert manifest.reusable_vector_id(chunk, content_hash("alpha!")) is None
+
+
+def test_same_file_names_in_two_folders_are_reused(tmp_path, build_index) -> None:
+    raw = tmp_path / "raw"
+    for country in ("de", "fr"):
+        (raw / country).mkdir(parents=True)
+        (raw / country / "leave.md").write_text(
+            f"Leave rules for {country}. " * 30, encoding="utf-8"
+        )
+
+    def ingest():
+        stats = IngestionStats()
+        chunks = iter_corpus_chunks(str(raw), chunk_size=200, chunk_overlap=50, stats=stats)
+        return build_index(tmp_path / "index", chunks, document_hashes=stats.document_hashes)
+
+    first = ingest()
+    manifest = IndexManifest.load(first.output_dir)
+    assert set(manifest.documents) == {"de/leave.md", "fr/leave.md"}
+    assert len(manifest.chunks) == first.num_chunks
+
+    second = ingest()
+    assert (second.embedded, second.reused) == (0, first.num_chunks)
+
+
+def test_duplicate_chunks_are_rejected(tmp_path, build_index, make_chunks) -> None:
+    chunks = make_chunks("de/leave.md", 2)
+    with pytest.raises(ValueError, match="Duplicate chunk"):
+        build_index(tmp_path / "index", chunks + chunks[:1])
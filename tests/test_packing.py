@@ -0,0 +1,57 @@
+from __future__ import annotations
+
+from hr_rag_assistant.generation.packing import TokenCounter, pack_context
+from hr_rag_assistant.retrieval.vectorstore import RetrievedChunk
+from hr_rag_assistant.types import HRChunk
+
+
+def _hit(i: int, text: str, score: float) -> RetrievedChunk:
+    chunk = HRChunk(
+        id=f"leave.md::chunk_{i:04d}",
+        text=text,
+        metadata={"source": "leave.md"},
+        source="leave.md",
+        chunk_index=i,
+        start_char=0,
+        end_char=0,
+    )
+    return RetrievedChunk(chunk=chunk, score=score)
+
+
+def test_pack_context_maximizes_relevance_within_token_budget() -> None:
+    counter = TokenCounter("chat", chars_per_token=4.0)
+    counter._encoding = None  # deterministic estimate, with or without tiktoken
+    long_text = " ".join(f"Sentence {i} about carry-over of unused leave days." for i in range(40))
+    hits = [
+        _hit(0, long_text, 0.90),  # best hit, but too long for the budget
+        _hit(1, "Employees get 20 working days of paid leave per year.", 0.85),
+        _hit(2, "Leave requests go through the HR portal.", 0.80),
+        _hit(3, "Sick leave requires a doctor's note after three days.", 0.40),
+    ]
+
+    packed = pack_context(hits, max_context_tokens=200, counter=counter)
+
+    assert packed.tokens <= 200
+    assert counter.count(packed.text) <= 200
+    assert packed.chunks_used == 4 and packed.chunks_dropped == 0
+    assert packed.chunks_truncated == 1
+    # Whole short blocks kept; the long one is cut after a full sentence
+    for h in hits[1:]:
+        assert h.chunk.text in packed.text
+    assert "carry-over of unused leave days.\n" in packed.text
+    assert long_text not in packed.text
+    # Blocks stay in retrieval order
+    assert packed.text.index("chunk_0000") < packed.text.index("chunk_0001")
+
+    tight = pack_context(hits, max_context_tokens=40, counter=counter)
+    assert tight.tokens <= 40 and tight.chunks_dropped > 0
+    assert "chunk_0001" in tight.text  # highest score among the blocks that fit whole
+
+
+def test_token_counter_calibrates_estimate() -> None:
+    counter = TokenCounter("chat", chars_per_token=4.0)
+    counter._encoding = None
+    for _ in range(50):
+        counter.calibrate(3000, 1000)
+    assert abs(counter.chars_per_token - 3.0) < 0.01
+    assert counter.count("x" * 300) == 100
@@ -0,0 +1,24 @@
+from __future__ import annotations
+
+from hr_rag_assistant.ingestion.pipeline import IngestionStats, iter_corpus_chunks
+
+
+def test_parallel_pipeline_matches_serial(tmp_path) -> None:
+    for i in range(6):
+        (tmp_path / f"policy_{i}.md").write_text(f"Policy {i}.\n\n\n\n" + "word " * (150 + i * 40))
+
+    serial_stats, parallel_stats = IngestionStats(), IngestionStats()
+    serial = list(
+        iter_corpus_chunks(str(tmp_path), chunk_size=200, chunk_overlap=50, stats=serial_stats)
+    )
+    parallel = list(
+        iter_corpus_chunks(
+            str(tmp_path), chunk_size=200, chunk_overlap=50, workers=2, stats=parallel_stats
+        )
+    )
+
+    assert [c.id for c in parallel] == [c.id for c in serial]
+    assert parallel == serial
+    assert parallel_stats.documents == serial_stats.documents == 6
+    assert parallel_stats.document_hashes == serial_stats.document_hashes
+    assert serial_stats.chunks == len(serial)
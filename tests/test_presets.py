@@ -0,0 +1,98 @@
+from __future__ import annotations
+
+import types
+
+import hr_rag_assistant.generation.answerer as answerer_module
+import hr_rag_assistant.ingestion.index_builder as index_builder
+from hr_rag_assistant.embeddings.embedders import OpenAIEmbedder
+from hr_rag_assistant.generation.answer_cache import PresetAnswerStore
+from hr_rag_assistant.generation.answerer import HRAnswerer
+from hr_rag_assistant.generation.gating import REFUSAL, GateThresholds
+from hr_rag_assistant.generation.presets import preset_scope, warm_presets
+from hr_rag_assistant.retrieval.retriever import HRRetriever
+from hr_rag_assistant.types import HRChunk
+
+
+class _Chat:
+    def __init__(self):
+        self.chat = types.SimpleNamespace(completions=self)
+        self.calls = 0
+
+    def create(self, **kwargs):
+        self.calls += 1
+        message = types.SimpleNamespace(content="20 days.")
+        return types.SimpleNamespace(choices=[types.SimpleNamespace(message=message)])
+
+
+def _build(index_dir: str, n: int) -> None:
+    chunks = [
+        HRChunk(
+            id=f"leave.md::chunk_{i:04d}",
+            text=f"leave paragraph {i}",
+            metadata={"source": "leave.md"},
+            source="leave.md",
+            chunk_index=i,
+            start_char=0,
+            end_char=0,
+        )
+        for i in range(n)
+    ]
+    index_builder.build_and_persist_faiss_index(
+        chunks=chunks, index_dir=index_dir, openai_api_key="x", embedding_model="fake"
+    )
+
+
+def test_warm_presets_stores_answers_per_index_version(tmp_path, fake_openai, monkeypatch) -> None:
+    index_dir = str(tmp_path / "index")
+    _build(index_dir, 20)
+    chat = _Chat()
+    monkeypatch.setattr(answerer_module, "OpenAI", lambda **kwargs: chat)
+    retriever = HRRetriever(
+        index_dir=index_dir, embedder=OpenAIEmbedder(model="fake", client=fake_openai())
+    )
+    answerer = HRAnswerer(openai_api_key="x", chat_model="chat")
+    store = PresetAnswerStore(str(tmp_path / "answers.sqlite"))
+    questions = ["How many leave days do I get?", "Can I carry leave over?"]
+
+    report = warm_presets(retriever=retriever, answerer=answerer, store=store, questions=questions)
+
+    version = retriever.index_version
+    assert version is not None and report.index_version == version
+    assert (report.answered, report.refused, chat.calls) == (2, 0, 2)
+    scope = preset_scope(answerer, retriever)
+    hit = store.get(scope=scope, index_version=version, question="how many leave days do I get?")
+    assert hit is not None and hit.answer == "20 days." and hit.sources
+    # Other request, retrieval or gate settings, or index versions, are not
+    # served from the store
+    merging = HRRetriever(
+        index_dir=index_dir,
+        embedder=OpenAIEmbedder(model="fake", client=fake_openai()),
+        merge_overlaps=True,
+    )
+    for other_scope in (
+        preset_scope(answerer, retriever, top_k=3),
+        preset_scope(answerer, merging),
+        preset_scope(answerer, retriever, gate=GateThresholds()),
+    ):
+        assert other_scope != scope
+        assert store.get(scope=other_scope, index_version=version, question=questions[0]) is None
+    assert store.get(scope=scope, index_version="other", question=questions[0]) is None
+
+    # A new index version replaces the stored answers; the gate refuses without a chat call
+    _build(index_dir, 21)
+    retriever = HRRetriever(
+        index_dir=index_dir, embedder=OpenAIEmbedder(model="fake", client=fake_openai())
+    )
+    assert retriever.index_version != version
+    warm_presets(retriever=retriever, answerer=answerer, store=store, questions=questions)
+    assert store.count(scope=scope, index_version=version) == 0
+    assert store.count(scope=scope, index_version=retriever.index_version) == 2
+
+    gate = GateThresholds(min_score=1.1)
+    report = warm_presets(
+        retriever=retriever, answerer=answerer, store=store, questions=questions, gate=gate
+    )
+    assert (report.refused, chat.calls) == (2, 4)
+    gated_scope = preset_scope(answerer, retriever, gate=gate)
+    hit = store.get(scope=gated_scope, index_version=retriever.index_version, question=questions[1])
+    assert hit is not None and hit.answer == REFUSAL and hit.sources == []
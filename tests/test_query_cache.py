@@ -0,0 +1,63 @@
+from __future__ import annotations
+
+import types
+
+import numpy as np
+
+import hr_rag_assistant.embeddings.query_cache as query_cache
+from hr_rag_assistant.embeddings.cache import EmbeddingCache
+from hr_rag_assistant.embeddings.query_cache import QueryEmbeddingCache, normalize_query
+
+
+class _CountingOpenAI:
+    def __init__(self, fake_openai):
+        self._inner = fake_openai()
+        self.requests = 0
+        self.inputs = []
+        self.embeddings = self
+
+    def create(self, model, input, **kwargs):
+        self.requests += 1
+        self.inputs.append(list(input))
+        return self._inner.embeddings.create(model=model, input=input, **kwargs)
+
+
+def test_repeated_queries_skip_the_api(fake_openai, tmp_path) -> None:
+    oai = _CountingOpenAI(fake_openai)
+    cache = QueryEmbeddingCache(max_entries=2, ttl_seconds=0)
+
+    first = cache.embed(oai, model="m", query="How many  PTO days?")
+    again = cache.embed(oai, model="m", query=" how many pto days? ")
+    assert normalize_query("How many  PTO days?") == "how many pto days?"
+    assert np.array_equal(first, again) and oai.requests == 1
+    # Only the key is normalized: the API sees the query as first asked
+    assert oai.inputs[0] == ["How many  PTO days?"]
+
+    cache.embed_many(oai, model="m", queries=["a", "b", "a"])  # one request, evicts the PTO entry
+    assert oai.requests == 2
+    cache.embed(oai, model="m", query="How many PTO days?")
+    assert oai.requests == 3
+
+    stats = cache.stats()
+    assert (stats.hits, stats.misses, stats.entries) == (1, 5, 2)
+
+    # A second worker finds the vector in the shared backend.
+    shared = EmbeddingCache(str(tmp_path / "q.sqlite"))
+    QueryEmbeddingCache(shared=shared).embed(oai, model="m", query="probation period")
+    worker2 = QueryEmbeddingCache(shared=shared)
+    worker2.embed(oai, model="m", query="Probation period")
+    assert oai.requests == 4 and worker2.stats().shared_hits == 1
+
+
+def test_ttl_expires_entries(fake_openai, monkeypatch) -> None:
+    oai = _CountingOpenAI(fake_openai)
+    cache = QueryEmbeddingCache(ttl_seconds=10)
+    clock = [100.0]
+    monkeypatch.setattr(query_cache, "time", types.SimpleNamespace(monotonic=lambda: clock[0]))
+
+    cache.embed(oai, model="m", query="leave")
+    clock[0] += 5
+    cache.embed(oai, model="m", query="leave")
+    clock[0] += 20
+    cache.embed(oai, model="m", query="leave")
+    assert oai.requests == 2
@@ -0,0 +1,103 @@
+from __future__ import annotations
+
+import numpy as np
+
+import hr_rag_assistant.ingestion.index_builder as index_builder
+from hr_rag_assistant.embeddings.embedders import OpenAIEmbedder
+from hr_rag_assistant.generation.citations import unique_sources
+from hr_rag_assistant.ingestion.chunker import chunk_document
+from hr_rag_assistant.retrieval.redundancy import merge_overlapping_hits, mmr_select
+from hr_rag_assistant.retrieval.retriever import HRRetriever
+from hr_rag_assistant.retrieval.vectorstore import RetrievedChunk
+from hr_rag_assistant.types import HRDocument
+
+
+def _doc(source: str, n_words: int) -> HRDocument:
+    text = " ".join(f"{source.split('.')[0]}{i}" for i in range(n_words))
+    return HRDocument(source=source, text=text, metadata={"source": source})
+
+
+def test_merge_overlapping_hits_rebuilds_the_document_span() -> None:
+    leave = _doc("leave.md", 120)
+    chunks = chunk_document(leave, chunk_size=200, chunk_overlap=50)
+    other = chunk_document(_doc("remote.md", 40), chunk_size=200, chunk_overlap=50)
+
+    # Ranked hits: chunks 2, 0 and 1 of leave.md chain together; chunk 4 does not.
+    hits = [
+        RetrievedChunk(chunk=chunks[2], score=0.9),
+        RetrievedChunk(chunk=other[0], score=0.8),
+        RetrievedChunk(chunk=chunks[0], score=0.7),
+        RetrievedChunk(chunk=chunks[4], score=0.6),
+        RetrievedChunk(chunk=chunks[1], score=0.5),
+    ]
+    merged = merge_overlapping_hits(hits)
+
+    assert [h.score for h in merged] == [0.9, 0.8, 0.6]
+    span = merged[0].chunk
+    assert span.text == leave.text[chunks[0].start_char : chunks[2].end_char].strip()
+    assert (span.start_char, span.end_char) == (chunks[0].start_char, chunks[2].end_char)
+    assert merged[1].chunk is other[0] and merged[2].chunk is chunks[4]
+    assert sum(len(h.chunk.text) for h in merged) < sum(len(h.chunk.text) for h in hits)
+    assert unique_sources(merged)[0] == "leave.md :: chunk_0000-0002"
+
+
+def test_merge_keeps_documents_with_the_same_file_name_apart() -> None:
+    # de/leave.md and fr/leave.md: same source (file name), same chunk ids and offsets
+    de, fr = (
+        HRDocument(
+            source="leave.md",
+            text=_doc("leave.md", 120).text.replace("leave", country),
+            metadata={"source": "leave.md", "path": f"{country}/leave.md"},
+        )
+        for country in ("de", "fr")
+    )
+    de_chunks = chunk_document(de, chunk_size=200, chunk_overlap=50)
+    fr_chunks = chunk_document(fr, chunk_size=200, chunk_overlap=50)
+    assert de_chunks[0].id == fr_chunks[0].id
+
+    hits = [
+        RetrievedChunk(chunk=de_chunks[0], score=0.9),
+        RetrievedChunk(chunk=fr_chunks[1], score=0.8),
+        RetrievedChunk(chunk=fr_chunks[0], score=0.7),
+        RetrievedChunk(chunk=de_chunks[1], score=0.6),
+    ]
+    merged = merge_overlapping_hits(hits)
+    assert [h.chunk.document for h in merged] == ["de/leave.md", "fr/leave.md"]
+    assert [h.chunk.text for h in merged] == [
+        de.text[: de_chunks[1].end_char].strip(),
+        fr.text[: fr_chunks[1].end_char].strip(),
+    ]
+
+    # The same path in two shards is two documents as well
+    shards = [
+        RetrievedChunk(chunk=de_chunks[0], score=0.9, shard="eu"),
+        RetrievedChunk(chunk=de_chunks[1], score=0.8, shard="us"),
+    ]
+    assert merge_overlapping_hits(shards) == shards
+
+
+def test_mmr_prefers_distinct_evidence(tmp_path, fake_openai) -> None:
+    q = np.array([1.0, 0.0, 0.0], dtype="float32")
+    vectors = np.array([[0.9, 0.1, 0.0], [0.9, 0.12, 0.0], [0.7, 0.0, 0.7]], dtype="float32")
+    hits = [RetrievedChunk(chunk=c, score=0.0) for c in chunk_document(_doc("a.md", 300), 200, 0)]
+    assert mmr_select(q, hits[:3], vectors, top_k=2, lambda_mult=1.0) == hits[:2]
+    assert mmr_select(q, hits[:3], vectors, top_k=2, lambda_mult=0.5) == [hits[0], hits[2]]
+
+    # End to end: MMR over stored vectors, then merging, never exceeds top_k spans
+    docs = [_doc("leave.md", 300), _doc("remote.md", 300)]
+    index_builder.build_and_persist_faiss_index(
+        chunks=[c for d in docs for c in chunk_document(d, 200, 50)],
+        index_dir=str(tmp_path),
+        openai_api_key="x",
+        embedding_model="fake",
+    )
+    retriever = HRRetriever(
+        index_dir=str(tmp_path),
+        embedder=OpenAIEmbedder(model="fake", client=fake_openai()),
+        merge_overlaps=True,
+        mmr_lambda=0.5,
+        mmr_fetch_k=10,
+    )
+    result = retriever.retrieve("leave12 leave13", top_k=4)
+    assert 0 < len(result.results) <= 4
+    assert len(retriever.store.hit_vectors(retriever.store.search(result.query_vector, 3))) == 3
@@ -0,0 +1,60 @@
+from __future__ import annotations
+
+import numpy as np
+import pytest
+
+from hr_rag_assistant.ingestion.pipeline import iter_corpus_chunks
+from hr_rag_assistant.retrieval.sharded import ShardedVectorStore
+from hr_rag_assistant.retrieval.vectorstore import FaissVectorStore
+
+
+def test_sharded_search_matches_single_index(tmp_path, make_chunks, build_index) -> None:
+    eu, us = make_chunks("eu/leave.md", 40), make_chunks("us/leave.md", 30)
+    build_index(tmp_path / "eu", eu, batch_size=16)
+    build_index(tmp_path / "us", us, batch_size=16)
+    build_index(tmp_path / "all", eu + us, batch_size=16)
+
+    single = FaissVectorStore(str(tmp_path / "all"))
+    sharded = ShardedVectorStore([str(tmp_path / "eu"), str(tmp_path / "us")])
+    assert set(sharded.shards) == {"eu", "us"} and len(sharded) == 70
+
+    rng = np.random.default_rng(0)
+    for _ in range(20):
+        q = rng.standard_normal(16).tolist()
+        expected = [(h.chunk.id, round(h.score, 5)) for h in single.search(q, top_k=8)]
+        assert [(h.chunk.id, round(h.score, 5)) for h in sharded.search(q, top_k=8)] == expected
+
+    pool = sharded._pool
+    sharded.remove_shard("us")
+    with pytest.raises(RuntimeError):  # the replaced pool was shut down
+        pool.submit(len, [])
+    assert all(h.chunk.metadata["path"] == "eu/leave.md" for h in sharded.search(q, top_k=10))
+    sharded.add_shard(str(tmp_path / "us"))
+    assert len(sharded) == 70
+    sharded.close()
+
+
+def test_shards_with_the_same_file_names_stay_apart(tmp_path, build_index) -> None:
+    texts = {
+        "eu": "EU employees receive 30 days of annual leave per year. " * 8,
+        "us": "US employees receive 15 days of paid time off per year. " * 8,
+    }
+    for region, text in texts.items():
+        raw = tmp_path / "raw" / region
+        raw.mkdir(parents=True)
+        (raw / "leave_policy.md").write_text(text, encoding="utf-8")
+        chunks = iter_corpus_chunks(str(raw), chunk_size=200, chunk_overlap=50)
+        build_index(tmp_path / region, chunks)
+
+    sharded = ShardedVectorStore([str(tmp_path / "eu"), str(tmp_path / "us")])
+    hits = sharded.search(np.ones(16).tolist(), top_k=20)
+    # The chunker ids chunks by file name, so both shards hold leave_policy.md::chunk_0000
+    assert len({h.chunk.id for h in hits}) < len(hits) == len(sharded)
+    assert {h.shard for h in hits} == {"eu", "us"}
+    assert all(h.chunk.text in texts[h.shard] for h in hits)
+
+    # Stored vectors come from the shard that returned the hit
+    vectors = sharded.hit_vectors(hits)
+    for hit, vector in zip(hits, vectors):
+        assert np.allclose(vector, sharded.shards[hit.shard].hit_vectors([hit])[0])
+    sharded.close()
@@ -0,0 +1,56 @@
+from __future__ import annotations
+
+import types
+
+import hr_rag_assistant.generation.answerer as answerer_module
+from hr_rag_assistant.generation.answerer import HRAnswerer
+from hr_rag_assistant.retrieval.vectorstore import RetrievedChunk
+from hr_rag_assistant.types import HRChunk
+
+
+def _event(content=None, usage=None):
+    delta = types.SimpleNamespace(content=content)
+    choices = [] if content is None else [types.SimpleNamespace(delta=delta)]
+    return types.SimpleNamespace(choices=choices, usage=usage)
+
+
+class _StreamingChat:
+    def __init__(self):
+        self.chat = types.SimpleNamespace(completions=self)
+        self.calls = []
+
+    def create(self, **kwargs):
+        self.calls.append(kwargs)
+        usage = types.SimpleNamespace(prompt_tokens=120, completion_tokens=4)
+        return iter(
+            [_event(""), _event("\n20"), _event(" working"), _event(" days."), _event(usage=usage)]
+        )
+
+
+def test_stream_answer_yields_deltas_and_final_result(monkeypatch) -> None:
+    chat = _StreamingChat()
+    monkeypatch.setattr(answerer_module, "OpenAI", lambda **kwargs: chat)
+    chunk = HRChunk(
+        id="leave.md::chunk_0000",
+        text="Employees get 20 working days of leave.",
+        metadata={"source": "leave.md"},
+        source="leave.md",
+        chunk_index=0,
+        start_char=0,
+        end_char=0,
+    )
+    answerer = HRAnswerer(openai_api_key="x", chat_model="chat")
+
+    stream = answerer.stream_answer(
+        question="How much leave?", hits=[RetrievedChunk(chunk=chunk, score=0.9)]
+    )
+    assert stream.result is None
+    deltas = list(stream)
+
+    assert deltas == ["20", " working", " days."]
+    assert chat.calls[0]["stream"] is True
+    ans = stream.result
+    assert ans.answer == "20 working days."
+    assert ans.sources == ["leave.md :: chunk_0000"]
+    assert (ans.prompt_tokens, ans.completion_tokens) == (120, 4)
+    assert 0.0 <= ans.ttft_seconds <= ans.generation_seconds
@@ -0,0 +1,77 @@
+from __future__ import annotations
+
+import numpy as np
+import pytest
+
+import hr_rag_assistant.ingestion.index_builder as index_builder
+from hr_rag_assistant.retrieval.hot_reload import HotReloadingVectorStore
+from hr_rag_assistant.retrieval.vectorstore import FaissVectorStore
+from hr_rag_assistant.retrieval.versioning import (
+    VERSIONS_DIRNAME,
+    acquire_lease,
+    collect_garbage,
+    current_version,
+    new_version,
+)
+
+
+def test_versions_are_published_and_collected(tmp_path, make_chunks, build_index) -> None:
+    first = build_index(tmp_path, make_chunks("leave.md", 10))
+    assert current_version(str(tmp_path)) == first.version
+
+    # An open store keeps reading its snapshot and holds a lease on it.
+    old = FaissVectorStore(str(tmp_path))
+    second = build_index(tmp_path, make_chunks("leave.md", 12), keep_versions=1)
+    assert current_version(str(tmp_path)) == second.version
+    assert (tmp_path / VERSIONS_DIRNAME / first.version).exists()
+    assert len(old.chunks) == 10 and old.version == first.version
+
+    del old
+    assert collect_garbage(str(tmp_path), keep=1) == [first.version]
+    assert len(FaissVectorStore(str(tmp_path)).chunks) == 12
+
+
+def test_hot_reload_swaps_store(tmp_path, make_chunks, build_index) -> None:
+    build_index(tmp_path, make_chunks("leave.md", 10))
+    store = HotReloadingVectorStore(str(tmp_path), poll_interval=60)
+    q = np.ones(16).tolist()
+    assert len(store.search(q, top_k=20)) == 10
+
+    assert store.reload() is False
+    built = build_index(tmp_path, make_chunks("leave.md", 15))
+    assert store.reload() is True
+    assert store.version == built.version
+    assert len(store.search(q, top_k=20)) == 15
+    store.close()
+
+
+def test_failed_build_leaves_no_version_and_orphans_do_not_count(
+    tmp_path, make_chunks, build_index, monkeypatch
+) -> None:
+    first = build_index(tmp_path, make_chunks("leave.md", 10))
+    second = build_index(tmp_path, make_chunks("leave.md", 12))
+    versions = tmp_path / VERSIONS_DIRNAME
+
+    # A failure after the embed loop (here: writing BM25) removes the new version
+    def fail(self):
+        raise OSError("disk full")
+
+    with monkeypatch.context() as m:
+        m.setattr(index_builder.BM25Writer, "commit", fail)
+        with pytest.raises(OSError):
+            build_index(tmp_path, make_chunks("leave.md", 14))
+    assert sorted(p.name for p in versions.iterdir()) == [first.version, second.version]
+    assert current_version(str(tmp_path)) == second.version
+
+    # An abandoned build (no meta.json, no live lease) neither evicts the
+    # rollback snapshot nor survives collection
+    orphan = versions / "99999999T000000000000-dead00"
+    orphan.mkdir()
+    (orphan / "index.faiss").write_bytes(b"")
+    assert collect_garbage(str(tmp_path), keep=2) == [orphan.name]
+    assert sorted(p.name for p in versions.iterdir()) == [first.version, second.version]
+
+    # ... unless it is still being written by a running process
+    building, _ = new_version(str(tmp_path))
+    acquire_lease(str(tmp_path), building)
+    assert collect_garbage(str(tmp_path), keep=2) == []